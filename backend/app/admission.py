@@ -0,0 +1,152 @@
+"""
+Admission control / load shedding untuk request HTTP.
+
+Maksimal ``ADMISSION_MAX_CONCURRENCY`` request diproses bersamaan; sisanya
+menunggu di antrean FIFO berukuran ``ADMISSION_MAX_QUEUE``. Jika antrean
+penuh, atau request menunggu lebih dari ``ADMISSION_QUEUE_TIMEOUT`` detik,
+request langsung ditolak dengan 503 + ``Retry-After`` sehingga latensi request
+yang sudah diterima tetap stabil saat lonjakan traffic.
+
+Health check (``/``, ``/health``) dan scrape ``/metrics`` lewat jalur prioritas
+tanpa antrean, supaya container tidak dianggap mati saat sedang sibuk.
+WebSocket tidak dibatasi di sini (koneksi panjang, dihitung di
+``live_scoring_sessions``).
+"""
+
+import asyncio
+import collections
+import json
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# 0 = admission control dimatikan
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+PRIORITY_PATHS = ("/", "/health", "/metrics")
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight_requests", "Request yang sedang diproses (slot terpakai)"
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "Request yang menunggu slot admission control"
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "admission_rejected_total",
+    "Request yang ditolak 503 oleh admission control",
+    ["reason"],
+)
+ADMISSION_QUEUE_WAIT_SECONDS = Histogram(
+    "admission_queue_wait_seconds",
+    "Lama request menunggu slot sebelum diproses",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+class AdmissionControlMiddleware:
+    def __init__(
+        self,
+        app,
+        max_concurrency=ADMISSION_MAX_CONCURRENCY,
+        max_queue=ADMISSION_MAX_QUEUE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+        retry_after=ADMISSION_RETRY_AFTER,
+        priority_paths=PRIORITY_PATHS,
+    ):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.priority_paths = frozenset(priority_paths)
+        self.in_flight = 0
+        self._waiters = collections.deque()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.max_concurrency <= 0
+            or scope["path"] in self.priority_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self._acquire()
+        if reason is not None:
+            ADMISSION_REJECTED_TOTAL.labels(reason).inc()
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        """None jika slot didapat, atau alasan penolakan."""
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self._set_in_flight(self.in_flight + 1)
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Slot baru saja diserahkan bersamaan dengan timeout: lepas lagi
+                self._release()
+            else:
+                waiter.cancel()
+            return "timeout"
+        except asyncio.CancelledError:
+            # Klien putus saat menunggu; kembalikan slot jika sempat diserahkan
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        ADMISSION_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started)
+        return None
+
+    def _release(self):
+        # Slot diserahkan langsung ke waiter terdepan (FIFO), in_flight tetap
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+                return
+        ADMISSION_QUEUE_DEPTH.set(0)
+        self._set_in_flight(self.in_flight - 1)
+
+    def _set_in_flight(self, value):
+        self.in_flight = value
+        ADMISSION_IN_FLIGHT.set(value)
+
+    async def _reject(self, send):
+        body = json.dumps(
+            {"detail": "Server sedang sibuk, coba lagi sebentar lagi."}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,270 @@
+"""
+Audit log prediksi ke Postgres (service ``postgres`` di docker-compose).
+
+Setiap prediksi (fitur input, versi model, cluster, latensi) masuk buffer di
+memori dan ditulis massal dengan ``COPY`` (asyncpg) oleh satu task background,
+saat buffer mencapai ``AUDIT_FLUSH_ROWS`` baris atau tiap
+``AUDIT_FLUSH_INTERVAL`` detik. Request tidak pernah menunggu database.
+
+Buffer dibatasi ``AUDIT_BUFFER_ROWS`` baris. Jika penuh, pemanggil menunggu
+(backpressure) maksimal ``AUDIT_PUT_TIMEOUT`` detik; lewat dari itu baris
+dibuang dan dihitung di ``audit_rows_dropped_total`` agar API tetap melayani
+walau database mati. Sisa buffer di-flush saat shutdown (lifespan).
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+POSTGRES_CONNECT_STRING = os.getenv("POSTGRES_CONNECT_STRING", "")
+# Default aktif jika koneksi Postgres tersedia
+AUDIT_LOG = os.getenv("AUDIT_LOG", "1" if POSTGRES_CONNECT_STRING else "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+AUDIT_TABLE = os.getenv("AUDIT_TABLE", "prediction_audit")
+AUDIT_BUFFER_ROWS = int(os.getenv("AUDIT_BUFFER_ROWS", "50000"))
+AUDIT_FLUSH_ROWS = int(os.getenv("AUDIT_FLUSH_ROWS", "1000"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))
+AUDIT_PUT_TIMEOUT = float(os.getenv("AUDIT_PUT_TIMEOUT", "0.5"))
+# Di atas jumlah baris ini record dibangun di thread, bukan di event loop
+AUDIT_INLINE_ROWS = int(os.getenv("AUDIT_INLINE_ROWS", "64"))
+
+AUDIT_COLUMNS = (
+    "created_at",
+    "endpoint",
+    "model_version",
+    "cluster_id",
+    "cluster_label",
+    "latency_ms",
+    "features",
+)
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL,
+    endpoint TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    cluster_id INTEGER NOT NULL,
+    cluster_label TEXT,
+    latency_ms DOUBLE PRECISION,
+    features JSONB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_created_at_idx ON {table} (created_at);
+"""
+
+AUDIT_ROWS_WRITTEN = Counter(
+    "audit_rows_written_total", "Baris audit prediksi yang tersimpan di Postgres"
+)
+AUDIT_ROWS_DROPPED = Counter(
+    "audit_rows_dropped_total",
+    "Baris audit yang dibuang (buffer penuh / gagal tulis)",
+    ["reason"],
+)
+AUDIT_BUFFER_SIZE = Gauge("audit_buffer_rows", "Baris audit yang menunggu di-flush")
+AUDIT_FLUSH_SECONDS = Histogram(
+    "audit_flush_seconds", "Durasi satu flush audit ke Postgres"
+)
+
+
+def make_records(endpoint, bundle, matrix, cluster_ids, latency_ms=None):
+    """Satu record per baris; fitur baru diubah ke JSON di task writer."""
+    created_at = datetime.now(timezone.utc)
+    feature_names = tuple(bundle.engine.feature_names)
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, len(feature_names))
+    # JSONB menolak NaN / Infinity: satu baris begitu menggagalkan seluruh COPY
+    finite = np.isfinite(matrix).all(axis=1)
+    if not finite.all():
+        AUDIT_ROWS_DROPPED.labels("non_finite").inc(int((~finite).sum()))
+        matrix = matrix[finite]
+        cluster_ids = np.asarray(cluster_ids)[finite]
+    rows = matrix.tolist()
+    return [
+        (
+            created_at,
+            endpoint,
+            bundle.version,
+            int(cluster_id),
+            bundle.label(int(cluster_id)),
+            latency_ms,
+            (feature_names, values),
+        )
+        for values, cluster_id in zip(rows, cluster_ids)
+    ]
+
+
+def encode_records(records):
+    return [(*record[:-1], json.dumps(dict(zip(*record[-1])))) for record in records]
+
+
+class AuditLog:
+    def __init__(
+        self,
+        dsn=POSTGRES_CONNECT_STRING,
+        enabled=AUDIT_LOG,
+        table=AUDIT_TABLE,
+        capacity=AUDIT_BUFFER_ROWS,
+        flush_rows=AUDIT_FLUSH_ROWS,
+        flush_interval=AUDIT_FLUSH_INTERVAL,
+        put_timeout=AUDIT_PUT_TIMEOUT,
+        writer=None,
+    ):
+        self.dsn = dsn
+        self.enabled = enabled
+        self.table = table
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        # writer(records) async; default COPY ke Postgres (bisa diganti di test)
+        self.writer = writer or self._copy_to_postgres
+        self._buffer = []
+        self._cond = None
+        self._loop = None
+        self._task = None
+        self._closing = False
+        self._pool = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._cond = asyncio.Condition()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Audit log prediksi aktif (tabel {self.table})")
+
+    async def stop(self):
+        """Hentikan writer lalu flush sisa buffer (dipanggil dari lifespan)."""
+        if self._task is None:
+            return
+        # Flush yang sedang berjalan tidak dibatalkan; writer keluar setelah
+        # buffer terakhir tertulis
+        async with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        await self._task
+        self._task = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @property
+    def active(self):
+        return self._task is not None and not self._closing
+
+    async def record_scored(
+        self, endpoint, bundle, matrix, cluster_ids, latency_ms=None
+    ):
+        """
+        ``make_records`` + ``record``. Tidak membangun apa pun jika audit mati;
+        batch besar dibangun di thread agar event loop tidak tertahan.
+        """
+        if not self.active or not len(cluster_ids):
+            return False
+        args = (endpoint, bundle, matrix, cluster_ids, latency_ms)
+        if len(cluster_ids) > AUDIT_INLINE_ROWS:
+            records = await asyncio.to_thread(make_records, *args)
+        else:
+            records = make_records(*args)
+        return await self.record(records)
+
+    def record_scored_threadsafe(
+        self, endpoint, bundle, matrix, cluster_ids, latency_ms=None
+    ):
+        """Versi ``record_scored`` untuk handler sync (threadpool)."""
+        if not self.active or not len(cluster_ids):
+            return False
+        return self.record_threadsafe(
+            make_records(endpoint, bundle, matrix, cluster_ids, latency_ms)
+        )
+
+    async def record(self, records):
+        """Masukkan record ke buffer; tunggu jika penuh. False jika dibuang."""
+        if self._task is None or self._closing or not records:
+            return False
+        n = len(records)
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(
+                        lambda: not self._buffer
+                        or len(self._buffer) + n <= self.capacity
+                    ),
+                    self.put_timeout,
+                )
+            except asyncio.TimeoutError:
+                AUDIT_ROWS_DROPPED.labels("buffer_full").inc(n)
+                return False
+            self._buffer.extend(records)
+            AUDIT_BUFFER_SIZE.set(len(self._buffer))
+            if len(self._buffer) >= self.flush_rows:
+                self._cond.notify_all()
+        return True
+
+    def record_threadsafe(self, records):
+        """Versi ``record`` untuk handler sync (threadpool)."""
+        if self._task is None or not records or self._loop.is_closed():
+            return False
+        future = asyncio.run_coroutine_threadsafe(self.record(records), self._loop)
+        return future.result()
+
+    async def _run(self):
+        closing = False
+        while not closing:
+            async with self._cond:
+                try:
+                    await asyncio.wait_for(
+                        self._cond.wait_for(
+                            lambda: self._closing
+                            or len(self._buffer) >= self.flush_rows
+                        ),
+                        self.flush_interval,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                closing = self._closing
+                batch, self._buffer = self._buffer, []
+                AUDIT_BUFFER_SIZE.set(0)
+                # Bangunkan producer yang menunggu buffer kosong
+                self._cond.notify_all()
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            await self.writer(batch)
+        except Exception as e:
+            # Audit best-effort: data dibuang, API tetap jalan
+            AUDIT_ROWS_DROPPED.labels("write_error").inc(len(batch))
+            print(f"⚠️ Warning: gagal menulis {len(batch)} baris audit: {e}")
+            return
+        AUDIT_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        AUDIT_ROWS_WRITTEN.inc(len(batch))
+
+    async def _copy_to_postgres(self, batch):
+        records = await asyncio.to_thread(encode_records, batch)
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                self.table, records=records, columns=AUDIT_COLUMNS
+            )
+
+    async def _get_pool(self):
+        # Koneksi dibuat saat flush pertama: Postgres boleh siap belakangan
+        if self._pool is None:
+            import asyncpg
+
+            pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+            async with pool.acquire() as conn:
+                await conn.execute(CREATE_TABLE_SQL.format(table=self.table))
+            self._pool = pool
+        return self._pool
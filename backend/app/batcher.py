@@ -0,0 +1,102 @@
+"""
+Micro-batching untuk /predict.
+
+Request /predict yang datang bersamaan dikumpulkan selama ``window_ms`` atau
+sampai ``max_batch`` item, lalu di-score dengan satu panggilan engine yang
+sudah tervektorisasi. Tiap pemanggil menerima ``(cluster_id, jarak kuadrat)``
+lewat Future sendiri.
+Aktifkan dengan ``PREDICT_BATCHING=1``.
+"""
+
+import asyncio
+import os
+
+import numpy as np
+from prometheus_client import Histogram
+
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "0").lower() in ("1", "true", "yes")
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2"))
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "64"))
+
+MICROBATCH_SIZE = Histogram(
+    "predict_microbatch_size",
+    "Jumlah request /predict per panggilan engine",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+class MicroBatcher:
+    def __init__(self, max_batch=PREDICT_BATCH_MAX, window_ms=PREDICT_BATCH_WINDOW_MS):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self._pending = []
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Selesaikan request yang masih menunggu sebelum shutdown
+        while self._pending:
+            self._dispatch(self._take_batch())
+
+    async def submit(self, bundle, values):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((bundle, values, future))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    def _take_batch(self):
+        batch = self._pending[: self.max_batch]
+        self._pending = self._pending[self.max_batch :]
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        if not self._pending:
+            self._has_items.clear()
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+            self._dispatch(self._take_batch())
+
+    def _dispatch(self, batch):
+        if not batch:
+            return
+        MICROBATCH_SIZE.observe(len(batch))
+
+        # Saat hot reload bisa ada 2 versi model dalam satu window
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), []).append(item)
+
+        for items in groups.values():
+            engine = items[0][0].engine
+            try:
+                labels, sq_distances = engine.assign(
+                    np.asarray([v for _, v, _ in items])
+                )
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), label, sq_row in zip(items, labels, sq_distances):
+                if not future.done():
+                    future.set_result((int(label), sq_row))
@@ -0,0 +1,96 @@
+"""
+Encoding biner ringkas untuk klien internal bervolume tinggi (block Mage, job).
+
+Request: body berupa float32 little-endian row-major (``n`` baris x ``d``
+kolom), Content-Type ``application/x-float32``. Urutan kolom dideklarasikan
+di header ``X-Feature-Order`` (nama fitur dipisah koma); tanpa header, urutan
+fitur model (``engine.feature_names``) yang dipakai. Kolom di luar fitur model
+diabaikan. Body dibaca zero-copy dengan ``np.frombuffer`` lalu divalidasi
+sekaligus untuk seluruh matriks (bukan per field seperti pydantic).
+
+Response memakai encoding yang sama: ``int32[n]`` cluster_id (-1 = baris
+berisi NaN/Inf), lalu opsional ``float32[n, k]`` jarak kuadrat ke semua
+centroid. Layout dijelaskan di header ``X-Response-Layout``; label cluster
+ada di ``GET /models``.
+"""
+
+import os
+
+import numpy as np
+
+MEDIA_TYPE = "application/x-float32"
+CONTENT_TYPES = (MEDIA_TYPE, "application/octet-stream")
+FEATURE_ORDER_HEADER = "X-Feature-Order"
+LAYOUT_HEADER = "X-Response-Layout"
+REQUEST_DTYPE = np.dtype("<f4")
+ID_DTYPE = np.dtype("<i4")
+DISTANCE_DTYPE = np.dtype("<f4")
+INVALID_CLUSTER_ID = -1
+
+# Batas baris per request biner (lebih longgar dari JSON karena jauh lebih murah)
+BINARY_MAX_ROWS = int(os.getenv("BINARY_MAX_ROWS", "100000"))
+
+
+def is_binary(content_type):
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return media_type in CONTENT_TYPES
+
+
+def parse_feature_order(header, default):
+    if not header:
+        return list(default)
+    return [name.strip() for name in header.split(",") if name.strip()]
+
+
+def decode_matrix(body, declared, feature_names):
+    """
+    Return (matriks float32 [n, d_model] sesuai ``feature_names``, mask baris
+    valid). ValueError jika ukuran body / urutan fitur tidak cocok.
+    """
+    missing = [name for name in feature_names if name not in declared]
+    if missing:
+        raise ValueError(f"{FEATURE_ORDER_HEADER} tidak memuat fitur model: {missing}")
+    if len(set(declared)) != len(declared):
+        raise ValueError(f"{FEATURE_ORDER_HEADER} berisi nama fitur duplikat")
+    row_bytes = REQUEST_DTYPE.itemsize * len(declared)
+    if len(body) % row_bytes:
+        raise ValueError(
+            f"Panjang body ({len(body)} byte) bukan kelipatan {row_bytes} "
+            f"({len(declared)} fitur float32)"
+        )
+    view = np.frombuffer(body, dtype=REQUEST_DTYPE).reshape(-1, len(declared))
+    if declared == list(feature_names):
+        matrix = view
+    else:
+        matrix = view[:, [declared.index(name) for name in feature_names]]
+    return matrix, np.isfinite(matrix).all(axis=1)
+
+
+def encode_response(cluster_ids, sq_distances=None):
+    parts = [np.ascontiguousarray(cluster_ids, dtype=ID_DTYPE).tobytes()]
+    if sq_distances is not None:
+        parts.append(np.ascontiguousarray(sq_distances, dtype=DISTANCE_DTYPE).tobytes())
+    return b"".join(parts)
+
+
+def response_layout(n_rows, n_clusters, with_distances):
+    layout = f"cluster_id:int32[{n_rows}]"
+    if with_distances:
+        layout += f";sq_distances:float32[{n_rows},{n_clusters}]"
+    return layout
+
+
+# --- Helper untuk klien (block Mage / job) ---
+def encode_rows(matrix):
+    """Matriks fitur -> body request (float32 little-endian row-major)."""
+    return np.ascontiguousarray(matrix, dtype=REQUEST_DTYPE).tobytes()
+
+
+def decode_response(body, n_rows, n_clusters=None):
+    """Return (cluster_ids, sq_distances atau None)."""
+    ids_bytes = ID_DTYPE.itemsize * n_rows
+    cluster_ids = np.frombuffer(body, dtype=ID_DTYPE, count=n_rows)
+    if n_clusters is None or len(body) == ids_bytes:
+        return cluster_ids, None
+    distances = np.frombuffer(body, dtype=DISTANCE_DTYPE, offset=ids_bytes)
+    return cluster_ids, distances.reshape(n_rows, n_clusters)
@@ -0,0 +1,97 @@
+"""
+Cache LRU in-process untuk hasil prediksi.
+
+Key = (versi model, vektor fitur yang dikuantisasi). Slider di dashboard
+menghasilkan kombinasi nilai yang sama berulang kali, jadi hasilnya cukup
+dihitung sekali per versi model. Beberapa versi bisa dilayani berdampingan
+(``X-Model-Version``), jadi entry versi lain tetap disimpan dan cukup dibuang
+LRU; entry versi yang sudah tidak dimuat dibersihkan lewat ``retain``.
+
+Catatan: dua input di bucket kuantisasi yang sama berbagi hasil, jadi
+``PREDICTION_CACHE_QUANTUM`` harus jauh lebih kecil dari resolusi fitur.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_QUANTUM = float(os.getenv("PREDICTION_CACHE_QUANTUM", "1e-6"))
+
+CACHE_HITS = Counter("prediction_cache_hits_total", "Prediksi yang dilayani dari cache")
+CACHE_MISSES = Counter(
+    "prediction_cache_misses_total", "Prediksi yang tidak ada di cache"
+)
+CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions_total",
+    "Entry cache yang dibuang karena kapasitas penuh",
+)
+CACHE_INVALIDATIONS = Counter(
+    "prediction_cache_invalidations_total",
+    "Entry cache yang dibuang karena versi modelnya tidak dimuat lagi",
+)
+CACHE_ENTRIES = Gauge("prediction_cache_entries", "Jumlah entry di cache prediksi")
+
+
+class PredictionCache:
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, quantum=PREDICTION_CACHE_QUANTUM):
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self._entries = OrderedDict()
+        self._versions = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def make_key(self, version, values):
+        # Bucket tetap float64: cast ke int64 overflow untuk |fitur| besar
+        # sehingga input berbeda berbagi key. "+ 0.0" menyatukan -0.0 dan 0.0.
+        buckets = np.rint(np.asarray(values, dtype=np.float64) / self.quantum)
+        return version, (buckets + 0.0).tobytes()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+        CACHE_HITS.inc()
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._versions.add(key[0])
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.inc()
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def retain(self, versions):
+        """Buang entry milik versi model yang tidak ada di ``versions``."""
+        versions = set(versions)
+        with self._lock:
+            stale = self._versions - versions
+            if not stale:
+                return
+            for key in [key for key in self._entries if key[0] in stale]:
+                del self._entries[key]
+                CACHE_INVALIDATIONS.inc()
+            self._versions &= versions
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            CACHE_ENTRIES.set(0)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,125 @@
+"""
+Index baca (read API) provinsi, anggota cluster dan profil cluster.
+
+Dibangun sekali per versi artefak saat model dimuat, dari data yang sudah ada
+di bundle: ``PeerIndex`` (``data_labeled.csv``, cluster dihitung ulang model
+aktif), label cluster dan ``cluster_metadata.json``. Fitur dikembalikan ke
+skala asli (mean + scale * nilai ter-scale). Response yang sering dibaca
+(daftar provinsi, anggota per cluster, profil) di-serialize sekali ke bytes.
+
+Isi response hanya bergantung pada versi model, jadi versi itu sekaligus
+dipakai sebagai ETag (lihat ``main.cached_json``).
+"""
+
+import json
+
+import numpy as np
+
+# Key cluster_metadata.json yang ikut ditampilkan di profil cluster
+METADATA_SUMMARY_KEYS = (
+    "n_clusters",
+    "silhouette_score",
+    "davies_bouldin_score",
+    "inertia",
+    "timestamp",
+)
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _round(values):
+    return [round(float(v), 6) for v in values]
+
+
+class Catalog:
+    def __init__(self, bundle, metadata=None):
+        engine, peers = bundle.engine, bundle.peers
+        self.version = bundle.version
+        self.feature_names = list(engine.feature_names)
+        raw = engine.mean + engine.scale * np.asarray(peers.matrix)
+
+        self.provinces = [
+            {
+                "provinsi": name,
+                "cluster_id": int(cluster_id),
+                "cluster_label": bundle.label(int(cluster_id)),
+                "features": dict(zip(self.feature_names, _round(row))),
+            }
+            for name, cluster_id, row in zip(peers.names, peers.cluster_ids, raw)
+        ]
+        self._positions = {
+            name.strip().lower(): i for i, name in enumerate(peers.names)
+        }
+
+        n_total = len(self.provinces)
+        self._members = {}
+        profile = []
+        for cluster_id in range(engine.n_clusters):
+            positions = np.flatnonzero(peers.cluster_ids == cluster_id)
+            self._members[cluster_id] = _dumps(
+                {
+                    "cluster_id": cluster_id,
+                    "cluster_label": bundle.label(cluster_id),
+                    "n_members": len(positions),
+                    "members": [self.provinces[i] for i in positions],
+                    "model_version": self.version,
+                }
+            )
+            centroid = engine.mean + engine.scale * np.asarray(
+                engine.centers[cluster_id]
+            )
+            mean = raw[positions].mean(axis=0) if len(positions) else centroid
+            profile.append(
+                {
+                    "cluster_id": cluster_id,
+                    "cluster_label": bundle.label(cluster_id),
+                    "n_members": len(positions),
+                    "percentage": (
+                        round(100.0 * len(positions) / n_total, 2) if n_total else 0.0
+                    ),
+                    "centroid": dict(zip(self.feature_names, _round(centroid))),
+                    "mean": dict(zip(self.feature_names, _round(mean))),
+                }
+            )
+
+        summary = {
+            key: metadata[key]
+            for key in METADATA_SUMMARY_KEYS
+            if key in (metadata or {})
+        }
+        self.provinces_body = _dumps(
+            {
+                "n_provinces": n_total,
+                "provinces": self.provinces,
+                "model_version": self.version,
+            }
+        )
+        self.profile_body = _dumps(
+            {
+                "clusters": profile,
+                "feature_names": self.feature_names,
+                "metadata": summary,
+                "model_version": self.version,
+            }
+        )
+
+    def province(self, name):
+        position = self._positions.get(name.strip().lower())
+        return None if position is None else self.provinces[position]
+
+    def members_body(self, cluster_id):
+        return self._members.get(cluster_id)
+
+
+def build_catalog(bundle, metadata_path):
+    if bundle.peers is None:
+        return None
+    metadata = None
+    try:
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return Catalog(bundle, metadata)
@@ -0,0 +1,101 @@
+"""
+Scoring kolumnar lewat Apache Arrow IPC stream / Parquet.
+
+Kolom fitur dipetakan langsung ke matriks numpy (tanpa objek Python per baris),
+di-score sekali, lalu hasilnya dikembalikan dalam format yang sama dengan
+request. ``pyarrow`` bersifat opsional: tanpa library ini endpoint membalas 501.
+pyarrow baru di-import saat endpoint pertama kali dipakai agar startup tetap cepat.
+"""
+
+import importlib.util
+import io
+
+import numpy as np
+
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+CONTENT_TYPES = {
+    "application/vnd.apache.arrow.stream": FORMAT_ARROW,
+    "application/vnd.apache.parquet": FORMAT_PARQUET,
+    "application/x-parquet": FORMAT_PARQUET,
+}
+MEDIA_TYPES = {
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def is_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def detect_format(content_type):
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPES.get(media_type)
+
+
+def read_table(body, fmt):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if fmt == FORMAT_PARQUET:
+        return pq.read_table(pa.BufferReader(body))
+    return ipc.open_stream(pa.BufferReader(body)).read_all()
+
+
+def write_table(table, fmt):
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    if fmt == FORMAT_PARQUET:
+        pq.write_table(table, sink)
+    else:
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def table_to_matrix(table, feature_names):
+    """Return (matrix float64 [n, d], mask baris valid)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    missing = [name for name in feature_names if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Kolom tidak lengkap: {missing}")
+
+    matrix = np.empty((table.num_rows, len(feature_names)), dtype=np.float64)
+    valid = np.ones(table.num_rows, dtype=bool)
+    for j, name in enumerate(feature_names):
+        column = pc.cast(table.column(name), pa.float64())
+        if column.null_count:
+            valid &= ~column.is_null().to_numpy(zero_copy_only=False)
+            column = pc.fill_null(column, 0.0)
+        # Satu salinan per kolom langsung ke buffer matriks
+        matrix[:, j] = column.to_numpy()
+    valid &= np.isfinite(matrix).all(axis=1)
+    return matrix, valid
+
+
+def build_result(table, cluster_ids, valid, cluster_labels, id_column="id"):
+    """
+    Tabel hasil dari cluster_id baris valid (urutan = baris ``valid``).
+    cluster_labels: list label per cluster id (index = cluster_id). Baris tidak
+    valid (null / NaN / Inf) mendapat cluster_id & label null.
+    """
+    import pyarrow as pa
+
+    indices = np.zeros(table.num_rows, dtype=np.int32)
+    indices[valid] = cluster_ids
+    indices = pa.array(indices, mask=~valid)
+    columns = {}
+    if id_column in table.column_names:
+        columns[id_column] = table.column(id_column)
+    columns["cluster_id"] = indices
+    # Label sebagai dictionary array: string per cluster hanya disimpan sekali
+    columns["label"] = pa.DictionaryArray.from_arrays(
+        indices, pa.array(cluster_labels, type=pa.string())
+    )
+    return pa.table(columns)
@@ -0,0 +1,127 @@
+"""
+Counterfactual: perubahan fitur terkecil (berbobot) agar provinsi berpindah
+ke cluster dengan kesiapan lebih tinggi.
+
+Semua dihitung di ruang ter-standardisasi memakai centroid KMeans asli. Sel
+Voronoi cluster target adalah irisan half-space ``a_j . z <= b_j``; untuk
+banyak arah kandidat sekaligus dicari langkah terkecil sepanjang arah itu yang
+masuk ke sel target (closed form per arah, tervektorisasi). Kandidat terbaik
+diverifikasi ulang dengan engine supaya hasilnya pasti sesuai model.
+
+Urutan "kesiapan" mengikuti block training: rata-rata nilai centroid.
+"""
+
+import numpy as np
+
+# Jarak minimum ke batas sel (ruang ter-standardisasi) agar tidak jatuh tepat di batas
+BOUNDARY_EPS = 1e-3
+N_RANDOM_DIRECTIONS = 256
+MAX_SPARSE_FEATURES = 3
+
+
+def readiness_rank(centers):
+    """rank[cluster_id]: 0 = kesiapan terendah (sama seperti train_kmeans_clustering)."""
+    rank = np.empty(len(centers), dtype=np.int64)
+    rank[np.argsort(centers.mean(axis=1))] = np.arange(len(centers))
+    return rank
+
+
+def _sparsify(directions, n_keep):
+    # Hanya n_keep komponen terbesar yang dipertahankan (perubahan lebih sedikit fitur)
+    cutoff = -np.sort(-np.abs(directions), axis=1)[:, n_keep - 1 : n_keep]
+    return np.where(np.abs(directions) >= cutoff, directions, 0.0)
+
+
+def candidate_directions(z0, centers, target, weights, mutable, rng):
+    others = np.array([j for j in range(len(centers)) if j != target])
+    A = 2.0 * (centers[others] - centers[target])
+
+    base = [centers[target] - z0]
+    # Arah proyeksi terpendek (metrik berbobot) ke tiap half-space
+    base.extend(-(A / (weights * weights)))
+    base = np.asarray(base) * mutable
+
+    sparse = [_sparsify(base, m) for m in range(1, MAX_SPARSE_FEATURES + 1)]
+    picks = base[rng.integers(0, len(base), size=N_RANDOM_DIRECTIONS)]
+    noise = rng.normal(size=picks.shape) * np.abs(picks).mean(axis=1, keepdims=True)
+    random = (picks + 0.5 * noise) * mutable
+
+    directions = np.vstack([base, *sparse, random])
+    norms = np.linalg.norm(directions * weights, axis=1)
+    directions = directions[norms > 1e-12] / norms[norms > 1e-12, None]
+    return directions
+
+
+def minimal_steps(z0, directions, centers, target):
+    """Langkah s >= 0 terkecil per arah agar z0 + s*d masuk sel target (inf jika tidak bisa)."""
+    others = np.array([j for j in range(len(centers)) if j != target])
+    A = 2.0 * (centers[others] - centers[target])
+    b = (centers[others] ** 2).sum(axis=1) - (centers[target] ** 2).sum()
+    slack = (b - BOUNDARY_EPS) - A @ z0  # (m,)
+    rate = directions @ A.T  # (n, m)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = slack / rate
+    lower = np.where(rate < 0, ratio, -np.inf).max(axis=1)
+    upper = np.where(rate > 0, ratio, np.inf).min(axis=1)
+    blocked = ((rate == 0) & (slack < 0)).any(axis=1)
+
+    steps = np.maximum(lower, 0.0)
+    feasible = (steps <= upper) & ~blocked
+    return np.where(feasible, steps, np.inf)
+
+
+def domain_valid(raw, feature_names):
+    # Fitur persentase harus 0..100, rasio tidak boleh negatif
+    percent = np.array([name.startswith("persen_") for name in feature_names])
+    ok = (raw >= 0).all(axis=1)
+    if percent.any():
+        ok &= (raw[:, percent] <= 100).all(axis=1)
+    return ok
+
+
+def find_paths(engine, centers, values, weights=None, mutable=None, seed=0):
+    """
+    Return (cluster saat ini, list jalur per cluster target yang lebih tinggi).
+    ``weights``: bobot biaya per fitur (satuan standar deviasi), default 1.
+    ``mutable``: mask fitur yang boleh diubah, default semua.
+    """
+    n_features = len(engine.feature_names)
+    weights = np.ones(n_features) if weights is None else np.asarray(weights, float)
+    mutable = np.ones(n_features) if mutable is None else np.asarray(mutable, float)
+    rng = np.random.default_rng(seed)
+
+    x0 = np.asarray(values, dtype=np.float64)
+    z0 = (x0 - engine.mean) / engine.scale
+    current = int(engine.predict(x0.reshape(1, -1))[0])
+    rank = readiness_rank(centers)
+
+    paths = []
+    targets = [t for t in np.argsort(rank) if rank[t] > rank[current]]
+    for target in targets:
+        directions = candidate_directions(z0, centers, target, weights, mutable, rng)
+        steps = minimal_steps(z0, directions, centers, target)
+        finite = np.isfinite(steps)
+        if not finite.any():
+            continue
+
+        deltas_raw = (steps[finite, None] * directions[finite]) * engine.scale
+        candidates = x0 + deltas_raw
+        ok = domain_valid(candidates, engine.feature_names)
+        ok &= engine.predict(candidates) == target
+        if not ok.any():
+            continue
+
+        costs = steps[finite][ok]
+        best = int(np.argmin(costs))
+        delta = deltas_raw[ok][best]
+        delta[np.abs(delta) < 1e-9] = 0.0
+        paths.append(
+            {
+                "target_cluster_id": int(target),
+                "cost": float(costs[best]),
+                "delta": delta,
+                "counterfactual": candidates[ok][best],
+            }
+        )
+    return current, paths
@@ -0,0 +1,178 @@
+"""
+Query async ke Postgres (tabel ``education_features`` + hasil cluster).
+
+Dipakai endpoint ``/db/...`` supaya dashboard / konsumen lain cukup mengambil
+baris yang dibutuhkan, bukan memuat seluruh CSV. Koneksi lewat pool asyncpg
+(dibuat saat query pertama); asyncpg menyiapkan tiap SQL sebagai prepared
+statement dan meng-cache-nya per koneksi, jadi SQL di sini selalu teks tetap
+dengan parameter ``$n`` (nama kolom hanya dari whitelist fitur).
+
+Hasil cluster ditulis block ``train_kmeans_clustering`` ke tabel
+``DB_RESULTS_TABLE`` (provinsi, cluster_id, cluster_label). Paginasi memakai
+keyset (``provinsi > $after``), bukan OFFSET.
+"""
+
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from .audit import POSTGRES_CONNECT_STRING
+
+DB_FEATURES_TABLE = os.getenv("DB_FEATURES_TABLE", "education_features")
+DB_RESULTS_TABLE = os.getenv("DB_RESULTS_TABLE", "education_cluster_results")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Batas tunggu (detik) mendapatkan koneksi dari pool
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "10"))
+DB_PAGE_MAX = 500
+
+DB_POOL_SIZE = Gauge("db_pool_connections", "Koneksi di pool Postgres", ["state"])
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Lama menunggu koneksi dari pool Postgres",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Latensi query Postgres per jenis query",
+    ["query"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total", "Query Postgres yang gagal", ["query"]
+)
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _escape_like(text):
+    # % dan _ dari input user harus cocok literal di pola ILIKE
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class Database:
+    def __init__(
+        self,
+        dsn=POSTGRES_CONNECT_STRING,
+        features_table=DB_FEATURES_TABLE,
+        results_table=DB_RESULTS_TABLE,
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX,
+        pool_timeout=DB_POOL_TIMEOUT,
+    ):
+        self.dsn = dsn
+        self.features_table = features_table
+        self.results_table = results_table
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool_timeout = pool_timeout
+        self._pool = None
+        self._feature_columns = None
+
+    @property
+    def configured(self):
+        return bool(self.dsn)
+
+    async def _get_pool(self):
+        if not self.configured:
+            raise DatabaseUnavailable("POSTGRES_CONNECT_STRING belum di-set.")
+        if self._pool is None:
+            try:
+                import asyncpg
+            except ImportError as e:
+                raise DatabaseUnavailable("asyncpg belum terpasang.") from e
+            try:
+                pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    command_timeout=DB_STATEMENT_TIMEOUT,
+                )
+            except (OSError, asyncpg.PostgresError) as e:
+                raise DatabaseUnavailable(f"Gagal konek ke Postgres: {e}") from e
+            if self._pool is None:
+                self._pool = pool
+                DB_POOL_SIZE.labels("total").set_function(pool.get_size)
+                DB_POOL_SIZE.labels("idle").set_function(pool.get_idle_size)
+            else:
+                await pool.close()
+        return self._pool
+
+    async def fetch(self, query_name, sql, *args):
+        """Jalankan query (prepared statement di-cache asyncpg) -> list dict."""
+        pool = await self._get_pool()
+        started = time.perf_counter()
+        try:
+            async with pool.acquire(timeout=self.pool_timeout) as conn:
+                acquired = time.perf_counter()
+                DB_POOL_WAIT_SECONDS.observe(acquired - started)
+                rows = await conn.fetch(sql, *args)
+        except Exception:
+            DB_QUERY_ERRORS.labels(query_name).inc()
+            raise
+        DB_QUERY_SECONDS.labels(query_name).observe(time.perf_counter() - acquired)
+        return [dict(row) for row in rows]
+
+    async def feature_columns(self, allowed):
+        """Kolom numerik tabel fitur yang juga ada di schema API (whitelist)."""
+        if self._feature_columns is None:
+            rows = await self.fetch(
+                "feature_columns",
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = $1 AND data_type IN "
+                "('double precision', 'real', 'numeric', 'integer', 'bigint') "
+                "ORDER BY ordinal_position",
+                self.features_table,
+            )
+            found = {row["column_name"] for row in rows}
+            columns = [name for name in allowed if name in found]
+            # Tabel belum dibuat pipeline: jangan cache hasil kosong
+            if not columns:
+                return columns
+            self._feature_columns = columns
+        return self._feature_columns
+
+    async def list_features(self, cluster_id=None, province=None, after=None, limit=50):
+        """Baris fitur + cluster, urut provinsi, halaman berikutnya via ``after``."""
+        sql = (
+            f"SELECT f.*, r.cluster_id, r.cluster_label "
+            f"FROM {_quote(self.features_table)} f "
+            f"LEFT JOIN {_quote(self.results_table)} r "
+            f"ON lower(r.provinsi) = lower(f.provinsi) "
+            f"WHERE ($1::int IS NULL OR r.cluster_id = $1) "
+            f"AND ($2::text IS NULL OR f.provinsi ILIKE $2 ESCAPE '\\') "
+            f"AND ($3::text IS NULL OR f.provinsi > $3) "
+            f"ORDER BY f.provinsi LIMIT $4"
+        )
+        pattern = f"%{_escape_like(province)}%" if province else None
+        return await self.fetch("list_features", sql, cluster_id, pattern, after, limit)
+
+    async def cluster_aggregates(self, allowed):
+        """Jumlah provinsi + rata-rata tiap fitur per cluster."""
+        columns = await self.feature_columns(allowed)
+        averages = "".join(
+            f", avg(f.{_quote(name)})::float8 AS {_quote(name)}" for name in columns
+        )
+        sql = (
+            f"SELECT r.cluster_id, r.cluster_label, count(*) AS n_provinces"
+            f"{averages} "
+            f"FROM {_quote(self.features_table)} f "
+            f"JOIN {_quote(self.results_table)} r "
+            f"ON lower(r.provinsi) = lower(f.provinsi) "
+            f"GROUP BY r.cluster_id, r.cluster_label ORDER BY r.cluster_id"
+        )
+        return await self.fetch("cluster_aggregates", sql)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        self._feature_columns = None
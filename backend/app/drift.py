@@ -0,0 +1,290 @@
+"""
+Statistik fitur online + skor drift traffic live.
+
+Drift di pipeline Mage (``generate_drift_report``) hanya dihitung saat
+pipeline jalan. Modul ini menghitung statistik input ``/predict`` secara
+streaming dengan memori konstan per fitur:
+
+- mean/variance Welford (digabung per batch, rumus paralel Chan),
+- sketch kuantil berupa histogram di atas tepi kuantil data training.
+
+Referensi training diambil dari artefak di samping model: mean/std dari
+scaler, kuantil dari ``data_labeled.csv`` (fitur ter-scale dikembalikan ke
+skala asli). Tanpa data berlabel, kuantil didekati distribusi normal.
+
+Skor per fitur diekspor sebagai gauge ``feature_drift_score``:
+``psi`` (Population Stability Index histogram live vs training) dan
+``mean_shift`` (|mean live - mean training| dalam satuan std training).
+Statistik di-reset setiap model aktif berganti versi.
+"""
+
+import os
+import threading
+import time
+from statistics import NormalDist
+
+import numpy as np
+from prometheus_client import Gauge
+
+DRIFT_MONITORING = os.getenv("DRIFT_MONITORING", "1").lower() in ("1", "true", "yes")
+# Jumlah bin sketch kuantil (tepi = kuantil 1/n .. (n-1)/n data training)
+DRIFT_BINS = int(os.getenv("DRIFT_BINS", "10"))
+# Skor baru diekspor setelah sekian observasi (PSI sampel kecil tidak stabil)
+DRIFT_MIN_SAMPLES = int(os.getenv("DRIFT_MIN_SAMPLES", "100"))
+# Bobot efektif maksimum; di atasnya statistik lama dibobot setengah (aging)
+DRIFT_WINDOW = int(os.getenv("DRIFT_WINDOW", "10000"))
+# Interval minimum (detik) antar update gauge
+DRIFT_PUBLISH_INTERVAL = float(os.getenv("DRIFT_PUBLISH_INTERVAL", "5"))
+
+DRIFT_METHODS = ("psi", "mean_shift")
+# Smoothing proporsi bin kosong agar PSI tetap finite
+PSI_EPSILON = 1e-4
+
+FEATURE_DRIFT_SCORE = Gauge(
+    "feature_drift_score",
+    "Skor drift input live vs data training model aktif, per fitur",
+    ["feature", "method"],
+)
+FEATURE_LIVE_MEAN = Gauge(
+    "feature_live_mean", "Mean input live (skala asli) per fitur", ["feature"]
+)
+FEATURE_LIVE_STD = Gauge(
+    "feature_live_std", "Std input live (skala asli) per fitur", ["feature"]
+)
+DRIFT_OBSERVATIONS = Gauge(
+    "feature_drift_observations",
+    "Jumlah observasi efektif di statistik drift (setelah aging)",
+)
+
+
+class FeatureReference:
+    """Distribusi training per fitur: mean, std, tepi bin & proporsi per bin."""
+
+    def __init__(self, feature_names, mean, std, edges, proportions):
+        self.feature_names = list(feature_names)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.proportions = np.asarray(proportions, dtype=np.float64)
+
+    @classmethod
+    def from_bundle(cls, bundle, n_bins=DRIFT_BINS):
+        engine = bundle.engine
+        mean = np.asarray(engine.mean, dtype=np.float64)
+        std = np.asarray(engine.scale, dtype=np.float64)
+        probs = np.arange(1, n_bins) / n_bins
+        peers = bundle.peers
+        if peers is not None and len(peers.matrix) >= n_bins:
+            raw = mean + std * np.asarray(peers.matrix, dtype=np.float64)
+            edges = np.quantile(raw, probs, axis=0).T
+            proportions = np.stack(
+                [histogram(raw[:, j], edges[j]) / len(raw) for j in range(raw.shape[1])]
+            )
+        else:
+            z = np.array([NormalDist().inv_cdf(p) for p in probs])
+            edges = mean[:, None] + std[:, None] * z[None, :]
+            proportions = np.full((len(mean), n_bins), 1.0 / n_bins)
+        return cls(engine.feature_names, mean, std, edges, proportions)
+
+
+def histogram(values, edges):
+    # Bin j = (edges[j-1], edges[j]]; di luar rentang masuk bin pertama/terakhir
+    index = np.searchsorted(edges, values, side="left")
+    return np.bincount(index, minlength=len(edges) + 1).astype(np.float64)
+
+
+def psi(expected, actual, eps=PSI_EPSILON):
+    expected = np.clip(expected, eps, None)
+    actual = np.clip(actual, eps, None)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=-1)
+
+
+class FeatureStats:
+    """Akumulator memori konstan: n, mean, M2 (Welford) + histogram per fitur."""
+
+    def __init__(self, reference, window=DRIFT_WINDOW):
+        self.reference = reference
+        self.window = window
+        n_features = len(reference.feature_names)
+        self.count = 0.0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.counts = np.zeros(reference.proportions.shape)
+
+    def update(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        n_batch = len(matrix)
+        if n_batch == 0:
+            return
+        batch_mean = matrix.mean(axis=0)
+        batch_m2 = ((matrix - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n_batch
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n_batch / total)
+        self.m2 = self.m2 + batch_m2 + delta**2 * (self.count * n_batch / total)
+        self.count = total
+        for j, edges in enumerate(self.reference.edges):
+            self.counts[j] += histogram(matrix[:, j], edges)
+
+        if self.window and self.count > self.window:
+            # Aging: mean/variance tetap, bobot data lama dibagi dua
+            self.count /= 2
+            self.m2 /= 2
+            self.counts /= 2
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return np.sqrt(self.m2 / self.count)
+
+    def quantiles(self, probs=(0.25, 0.5, 0.75)):
+        """Estimasi kuantil live dari sketch (interpolasi linear di dalam bin)."""
+        result = np.full((len(self.mean), len(probs)), np.nan)
+        for j, (edges, counts) in enumerate(zip(self.reference.edges, self.counts)):
+            total = counts.sum()
+            if total == 0:
+                continue
+            cdf = np.cumsum(counts) / total
+            # Bin ujung tidak berbatas: pakai tepi dalam sebagai nilai
+            lower = np.concatenate([[edges[0]], edges])
+            upper = np.concatenate([edges, [edges[-1]]])
+            for k, p in enumerate(probs):
+                b = min(int(np.searchsorted(cdf, p)), len(counts) - 1)
+                below = cdf[b - 1] if b > 0 else 0.0
+                frac = (p - below) / max(cdf[b] - below, 1e-12)
+                result[j, k] = lower[b] + frac * (upper[b] - lower[b])
+        return result
+
+    def scores(self):
+        ref = self.reference
+        live = self.counts / np.maximum(self.counts.sum(axis=1, keepdims=True), 1e-12)
+        std = np.where(ref.std > 0, ref.std, 1.0)
+        return {
+            "psi": psi(ref.proportions, live),
+            "mean_shift": np.abs(self.mean - ref.mean) / std,
+        }
+
+
+class DriftMonitor:
+    """
+    Statistik live untuk model aktif. ``observe`` aman dipanggil dari event
+    loop maupun threadpool; gauge diperbarui paling sering tiap
+    ``DRIFT_PUBLISH_INTERVAL`` detik.
+    """
+
+    def __init__(
+        self,
+        min_samples=DRIFT_MIN_SAMPLES,
+        publish_interval=DRIFT_PUBLISH_INTERVAL,
+        enabled=DRIFT_MONITORING,
+    ):
+        self.min_samples = min_samples
+        self.publish_interval = publish_interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._version = None
+        self._stats = None
+        self._published_at = 0.0
+        self._published_features = []
+
+    def observe(self, bundle, matrix):
+        """``matrix``: baris input (skala asli) sesuai ``engine.feature_names``."""
+        if not self.enabled:
+            return
+        matrix = np.asarray(matrix, dtype=np.float64)
+        matrix = matrix.reshape(-1, len(bundle.engine.feature_names))
+        # Satu NaN / Inf merusak mean & M2 Welford sampai model berganti
+        finite = np.isfinite(matrix).all(axis=1)
+        if not finite.all():
+            matrix = matrix[finite]
+        if not len(matrix):
+            return
+        with self._lock:
+            if bundle.version != self._version:
+                self._reset(bundle)
+            self._stats.update(matrix)
+            now = time.monotonic()
+            if now - self._published_at >= self.publish_interval:
+                self._publish()
+                self._published_at = now
+
+    def _reset(self, bundle):
+        self._version = bundle.version
+        self._stats = FeatureStats(FeatureReference.from_bundle(bundle))
+        self._clear_gauges()
+
+    def publish(self):
+        with self._lock:
+            if self._stats is not None:
+                self._publish()
+
+    def _publish(self):
+        stats = self._stats
+        names = stats.reference.feature_names
+        DRIFT_OBSERVATIONS.set(stats.count)
+        if stats.count < self.min_samples:
+            return
+        scores = stats.scores()
+        std = stats.std
+        for j, name in enumerate(names):
+            for method in DRIFT_METHODS:
+                FEATURE_DRIFT_SCORE.labels(name, method).set(float(scores[method][j]))
+            FEATURE_LIVE_MEAN.labels(name).set(float(stats.mean[j]))
+            FEATURE_LIVE_STD.labels(name).set(float(std[j]))
+        self._published_features = names
+
+    def _clear_gauges(self):
+        # Fitur model lama bisa tidak ada di model baru: hapus series-nya
+        for name in self._published_features:
+            for method in DRIFT_METHODS:
+                try:
+                    FEATURE_DRIFT_SCORE.remove(name, method)
+                except KeyError:
+                    pass
+            for gauge in (FEATURE_LIVE_MEAN, FEATURE_LIVE_STD):
+                try:
+                    gauge.remove(name)
+                except KeyError:
+                    pass
+        self._published_features = []
+        DRIFT_OBSERVATIONS.set(0)
+
+    def snapshot(self):
+        """Ringkasan statistik live vs training untuk endpoint ``/drift``."""
+        with self._lock:
+            stats = self._stats
+            if stats is None:
+                return {"model_version": None, "n_observations": 0, "features": {}}
+            ref = stats.reference
+            scores = stats.scores()
+            std = stats.std
+            quantiles = stats.quantiles()
+            features = {
+                name: {
+                    "live_mean": _finite(stats.mean[j]),
+                    "live_std": _finite(std[j]),
+                    "live_quartiles": [_finite(q) for q in quantiles[j]],
+                    "reference_mean": float(ref.mean[j]),
+                    "reference_std": float(ref.std[j]),
+                    **{m: _finite(scores[m][j]) for m in DRIFT_METHODS},
+                }
+                for j, name in enumerate(ref.feature_names)
+            }
+            return {
+                "model_version": self._version,
+                "n_observations": stats.count,
+                "min_samples": self.min_samples,
+                "features": features,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._clear_gauges()
+            self._version = None
+            self._stats = None
+
+
+def _finite(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
@@ -0,0 +1,270 @@
+"""
+Inference engine untuk model KMeans + StandardScaler.
+
+Dua implementasi dengan interface yang sama (``feature_names``, ``predict``,
+``predict_one``, ``assign`` / ``assign_one`` untuk label + jarak kuadrat):
+
+- ``FusedKMeansEngine``: scaler "dilipat" ke centroid saat load, sehingga
+  prediksi hanya satu perkalian matriks numpy pada data mentah.
+- ``SklearnEngine``: jalur lama (scaler.transform -> kmeans.predict), dipakai
+  sebagai fallback dan referensi.
+
+Pilih engine lewat env ``INFERENCE_ENGINE`` (``fused`` / ``sklearn``).
+``FusedKMeansEngine`` hanya butuh array numpy, jadi bisa dibangun dari artefak
+``.npz`` tanpa meng-import sklearn sama sekali.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+ENGINE_FUSED = "fused"
+ENGINE_SKLEARN = "sklearn"
+
+# Soft membership: softmax(-d^2 / (T * n_fitur)), d^2 di ruang ter-standardisasi
+MEMBERSHIP_TEMPERATURE = float(os.getenv("MEMBERSHIP_TEMPERATURE", "1.0"))
+# "Boundary" jika (d2 - d1) / d2 <= margin untuk dua centroid terdekat
+BOUNDARY_MARGIN = float(os.getenv("BOUNDARY_MARGIN", "0.1"))
+
+
+def resolve_feature_names(scaler, default_names):
+    # Urutan kolom saat fit scaler lebih dipercaya daripada urutan schema API
+    names = getattr(scaler, "feature_names_in_", None)
+    return list(names) if names is not None else list(default_names)
+
+
+def scaler_params(scaler, n_features):
+    # StandardScaler(with_mean=False / with_std=False) menyimpan None
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, np.float64)
+    return mean, scale
+
+
+class SklearnEngine:
+    """Jalur referensi: sama persis dengan pipeline training."""
+
+    name = ENGINE_SKLEARN
+
+    def __init__(self, kmeans, scaler, feature_names):
+        self.kmeans = kmeans
+        self.scaler = scaler
+        self.feature_names = list(feature_names)
+        self.centers = np.asarray(kmeans.cluster_centers_, dtype=np.float64)
+        self.n_clusters = int(self.centers.shape[0])
+        self.mean, self.scale = scaler_params(scaler, len(self.feature_names))
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if getattr(self.scaler, "feature_names_in_", None) is not None:
+            # Scaler di-fit dengan DataFrame -> beri nama kolom agar tidak warning
+            import pandas as pd
+
+            X = pd.DataFrame(X, columns=self.feature_names)
+        return self.scaler.transform(X)
+
+    def predict(self, X):
+        return self.kmeans.predict(self.transform(X)).astype(np.int64)
+
+    def predict_scaled(self, Z):
+        return self.kmeans.predict(np.asarray(Z, dtype=np.float64)).astype(np.int64)
+
+    def predict_one(self, values):
+        return int(self.predict([values])[0])
+
+    def assign(self, X):
+        scaled = self.transform(X)
+        diff = scaled[:, None, :] - self.kmeans.cluster_centers_[None, :, :]
+        sq_distances = (diff * diff).sum(axis=2)
+        return self.kmeans.predict(scaled).astype(np.int64), sq_distances
+
+    def assign_one(self, values):
+        labels, sq_distances = self.assign([values])
+        return int(labels[0]), sq_distances[0]
+
+
+class FusedKMeansEngine:
+    """
+    Jarak di ruang ter-standardisasi ditulis ulang ke ruang data mentah:
+
+        ||(x - mu)/s - c||^2 = sum_j w_j (x_j - c'_j)^2,  w = 1/s^2, c' = mu + s*c
+
+    Suku sum_j w_j x_j^2 sama untuk semua centroid, jadi argmin cukup dari
+    ``x @ W.T + b`` dengan W = -2 * w * c' dan b = sum_j w_j c'_j^2.
+    Baris yang dua skor teratasnya hampir seri dihitung ulang lewat jalur
+    referensi (sklearn jika tersedia, selain itu jarak eksak di ruang
+    ter-standardisasi) agar label selalu identik dengan pipeline training.
+    """
+
+    name = ENGINE_FUSED
+    # Array hasil load yang bisa diganti versi memory-mapped (shared_arrays)
+    ARRAY_FIELDS = (
+        "centers",
+        "mean",
+        "scale",
+        "inv_var",
+        "weights",
+        "bias",
+        "raw_centers",
+    )
+
+    def __init__(
+        self, centers, mean, scale, feature_names, reference=None, tie_tol=1e-9
+    ):
+        centers = np.asarray(centers, dtype=np.float64)
+        n_clusters, n_features = centers.shape
+        if len(feature_names) != n_features:
+            raise ValueError(
+                f"Jumlah fitur ({len(feature_names)}) != dimensi centroid ({n_features})"
+            )
+
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        if mean.shape != (n_features,) or scale.shape != (n_features,):
+            raise ValueError("Dimensi mean/scale scaler tidak cocok dengan centroid")
+        self.centers = centers
+        self.mean = mean
+        self.scale = scale
+        raw_centers = mean + scale * centers
+        self.inv_var = 1.0 / (scale * scale)
+        # Disimpan transpose (d, k) supaya X @ weights langsung (n, k)
+        self.weights = np.ascontiguousarray((-2.0 * self.inv_var * raw_centers).T)
+        self.bias = (self.inv_var * raw_centers * raw_centers).sum(axis=1)
+        self.raw_centers = raw_centers
+
+        self.feature_names = list(feature_names)
+        self.n_clusters = int(n_clusters)
+        self.tie_tol = tie_tol
+        self._reference = reference
+        self._local = threading.local()
+
+    @classmethod
+    def from_sklearn(cls, kmeans, scaler, feature_names, tie_tol=1e-9):
+        n_features = np.shape(kmeans.cluster_centers_)[1]
+        mean, scale = scaler_params(scaler, n_features)
+        return cls(
+            kmeans.cluster_centers_,
+            mean,
+            scale,
+            feature_names,
+            reference=SklearnEngine(kmeans, scaler, feature_names),
+            tie_tol=tie_tol,
+        )
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    def use_arrays(self, arrays):
+        """Ganti array internal dengan array read-only (mis. hasil mmap)."""
+        for name in self.ARRAY_FIELDS:
+            if arrays[name].shape != getattr(self, name).shape:
+                raise ValueError(f"Shape array {name} tidak cocok")
+        for name in self.ARRAY_FIELDS:
+            setattr(self, name, arrays[name])
+
+    def _buffers(self):
+        # Buffer per-thread: handler sync FastAPI jalan paralel di threadpool
+        local = self._local
+        if not hasattr(local, "row"):
+            local.row = np.empty((1, len(self.feature_names)), dtype=np.float64)
+            local.scores = np.empty((1, self.n_clusters), dtype=np.float64)
+        return local.row, local.scores
+
+    def scores(self, X, out=None):
+        """Jarak kuadrat ke tiap centroid dikurangi suku konstan ||x||_w^2."""
+        scores = np.matmul(X, self.weights, out=out)
+        scores += self.bias
+        return scores
+
+    def _resolve(self, X, scores, x_norm):
+        labels = scores.argmin(axis=1)
+        if self.n_clusters > 1:
+            top2 = np.partition(scores, 1, axis=1)[:, :2]
+            margin = top2[:, 1] - top2[:, 0]
+            ambiguous = margin <= self.tie_tol * (x_norm + np.abs(self.bias).max())
+            if ambiguous.any():
+                if self._reference is not None:
+                    labels[ambiguous] = self._reference.predict(X[ambiguous])
+                else:
+                    labels[ambiguous] = self.predict_scaled(
+                        self.transform(X[ambiguous])
+                    )
+        return labels
+
+    def predict_scaled(self, Z):
+        """Label untuk data yang sudah ter-standardisasi (mis. data_labeled.csv)."""
+        Z = self._as_matrix(Z)
+        diff = Z[:, None, :] - self.centers[None, :, :]
+        return (diff * diff).sum(axis=2).argmin(axis=1).astype(np.int64)
+
+    def transform(self, X):
+        """Standardisasi tanpa sklearn (sama dengan StandardScaler.transform)."""
+        return (self._as_matrix(X) - self.mean) / self.scale
+
+    @staticmethod
+    def _as_matrix(X):
+        X = np.asarray(X, dtype=np.float64)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def assign(self, X):
+        """Label + jarak kuadrat ke semua centroid dari satu perkalian matriks."""
+        X = self._as_matrix(X)
+        scores = self.scores(X)
+        x_norm = (X * X) @ self.inv_var
+        labels = self._resolve(X, scores, x_norm).astype(np.int64)
+        scores += x_norm[:, None]
+        return labels, np.maximum(scores, 0.0, out=scores)
+
+    def assign_one(self, values):
+        row, scores = self._buffers()
+        row[0, :] = values
+        self.scores(row, out=scores)
+        x_norm = (row * row) @ self.inv_var
+        label = int(self._resolve(row, scores, x_norm)[0])
+        return label, np.maximum(scores[0] + x_norm[0], 0.0)
+
+    def predict(self, X):
+        return self.assign(X)[0]
+
+    def predict_one(self, values):
+        return self.assign_one(values)[0]
+
+
+def soft_assignment(
+    sq_distances,
+    n_features,
+    temperature=MEMBERSHIP_TEMPERATURE,
+    boundary_margin=BOUNDARY_MARGIN,
+):
+    """
+    Dari jarak kuadrat (n, k) hasil ``assign``: jarak Euclid, skor keanggotaan
+    softmax (jumlah = 1 per baris) dan flag boundary bila dua centroid terdekat
+    hampir sama jauh.
+    """
+    sq_distances = np.atleast_2d(sq_distances)
+    distances = np.sqrt(sq_distances)
+
+    # Dinormalisasi per fitur agar skala tidak bergantung jumlah fitur model
+    logits = -(sq_distances - sq_distances.min(axis=1, keepdims=True))
+    membership = np.exp(logits / (temperature * max(n_features, 1)))
+    membership /= membership.sum(axis=1, keepdims=True)
+
+    if sq_distances.shape[1] < 2:
+        boundary = np.zeros(len(distances), dtype=bool)
+    else:
+        nearest = np.partition(distances, 1, axis=1)
+        gap = nearest[:, 1] - nearest[:, 0]
+        boundary = gap <= boundary_margin * np.maximum(nearest[:, 1], 1e-12)
+    return distances, membership, boundary
+
+
+def build_engine(kmeans, scaler, default_names, mode=None):
+    mode = (mode or os.getenv("INFERENCE_ENGINE", ENGINE_FUSED)).lower()
+    feature_names = resolve_feature_names(scaler, default_names)
+    if mode == ENGINE_SKLEARN:
+        return SklearnEngine(kmeans, scaler, feature_names)
+    if mode == ENGINE_FUSED:
+        return FusedKMeansEngine.from_sklearn(kmeans, scaler, feature_names)
+    raise ValueError(f"INFERENCE_ENGINE tidak dikenal: {mode}")
@@ -0,0 +1,607 @@
+"""
+Job scoring asinkron untuk dataset yang terlalu besar / lama untuk satu request.
+
+Alur: upload (CSV / NDJSON) di-spool ke disk -> dipecah per ``JOB_CHUNK_ROWS``
+baris (tanpa parsing) -> tiap chunk diparse, divalidasi dan di-score di
+``ProcessPoolExecutor`` -> potongan hasil digabung jadi satu file NDJSON.
+Event loop hanya mengatur jadwal dan progres, jadi API tetap responsif.
+
+Jenis job:
+- ``score``: cluster + label per baris (sama dengan /predict/stream).
+- ``stability``: bootstrap stabilitas cluster. Tiap replikasi me-resample
+  baris, menjalankan Lloyd dari centroid model (korespondensi cluster tetap),
+  lalu mencatat apakah label tiap baris sama dengan label model.
+
+Hasil disimpan di ``SCORING_JOBS_DIR`` selama ``JOB_RESULT_TTL`` detik. Upload
+yang identik (isi + parameter + versi model) memakai hasil yang sudah ada.
+Worker hanya menerima array numpy model, tidak perlu sklearn.
+
+Status job (``<id>/job.json``, ditulis ulang tiap progres) dan index dedup
+(``.keys/<cache_key>`` -> job id) ada di disk, jadi GET /jobs/{id} dan
+dedup tetap benar walau request mendarat di worker uvicorn lain. Direktori job
+yang tidak pernah selesai (worker mati) dihapus setelah ``JOB_STALE_TIMEOUT``
+detik tanpa update.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .engine import FusedKMeansEngine
+from .streaming import FORMAT_CSV, iter_record_chunks, score_chunk, scored_rows
+
+SCORING_JOBS_DIR = os.getenv(
+    "SCORING_JOBS_DIR", os.path.join(tempfile.gettempdir(), "scoring_jobs")
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(min(4, os.cpu_count() or 1))))
+JOB_CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", "50000"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))
+# Job queued / running tanpa update selama ini dianggap yatim (worker mati)
+JOB_STALE_TIMEOUT = float(os.getenv("JOB_STALE_TIMEOUT", "3600"))
+JOB_MAX_BOOTSTRAP = 1000
+STABILITY_MAX_ITER = 50
+
+KIND_SCORE = "score"
+KIND_STABILITY = "stability"
+JOB_KINDS = (KIND_SCORE, KIND_STABILITY)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+INPUT_FILENAME = "input"
+RESULT_FILENAME = "result.ndjson"
+JOB_FILENAME = "job.json"
+KEYS_DIRNAME = ".keys"
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+# --- Fungsi worker (dijalankan di proses lain, argumen harus picklable) ---
+_engines = {}
+
+
+def _worker_engine(model):
+    # Engine dibangun sekali per proses per versi model
+    engine = _engines.get(model["version"])
+    if engine is None:
+        engine = FusedKMeansEngine(
+            model["centers"], model["mean"], model["scale"], model["feature_names"]
+        )
+        _engines.clear()
+        _engines[model["version"]] = engine
+    return engine
+
+
+def _label(model, cluster_id):
+    labels = model["labels"]
+    return labels[cluster_id] if 0 <= cluster_id < len(labels) else "Unknown"
+
+
+def score_chunk_file(
+    model, input_path, fmt, output_path, id_column, index_offset, collect=False
+):
+    """
+    Parse + score satu chunk, tulis NDJSON. Return (n_baris, n_gagal, counts,
+    scored) dengan ``scored`` = (matriks, cluster_id) baris valid jika
+    ``collect`` (untuk audit log di proses utama), selain itu None.
+    """
+    engine = _worker_engine(model)
+    n_rows = n_failed = 0
+    counts = np.zeros(len(model["labels"]), dtype=np.int64)
+    scored = []
+    with open(input_path, "rb") as src, open(output_path, "w") as out:
+        chunks = iter_record_chunks(
+            src,
+            fmt,
+            engine.feature_names,
+            id_column,
+            JOB_CHUNK_ROWS,
+            index_offset,
+        )
+        for chunk in chunks:
+            results = score_chunk(engine, chunk, lambda c: _label(model, c))
+            if collect:
+                scored.append(scored_rows(chunk, results))
+            for result in results:
+                if "cluster_id" in result:
+                    counts[result["cluster_id"]] += 1
+                else:
+                    n_failed += 1
+                out.write(json.dumps(result, default=str) + "\n")
+            n_rows += len(results)
+    if collect and scored:
+        matrix = np.concatenate(
+            [m.reshape(-1, len(engine.feature_names)) for m, _ in scored]
+        )
+        scored = (matrix, np.concatenate([ids for _, ids in scored]))
+    else:
+        scored = None
+    return n_rows, n_failed, counts.tolist(), scored
+
+
+def parse_to_arrays(model, input_path, fmt, output_dir, id_column):
+    """Parse seluruh input ke matrix.npy (baris valid) + rows.json (index/id/error)."""
+    engine = _worker_engine(model)
+    rows, values = [], []
+    with open(input_path, "rb") as src:
+        for chunk in iter_record_chunks(
+            src, fmt, engine.feature_names, id_column, JOB_CHUNK_ROWS
+        ):
+            for index, row_id, row_values, error in chunk:
+                if error is None and not np.isfinite(row_values).all():
+                    error = "Nilai fitur harus finite"
+                rows.append({"index": index, "id": row_id, "error": error})
+                if error is None:
+                    values.append(row_values)
+    matrix = np.asarray(values, dtype=np.float64).reshape(
+        len(values), len(engine.feature_names)
+    )
+    np.save(os.path.join(output_dir, "matrix.npy"), matrix)
+    with open(os.path.join(output_dir, "rows.json"), "w") as f:
+        json.dump(rows, f, default=str)
+    return len(rows), len(rows) - len(values)
+
+
+def _nearest(X, centers):
+    # ||x - c||^2 tanpa tensor (n, k, d): cukup satu perkalian matriks
+    d2 = (centers * centers).sum(axis=1) - 2.0 * (X @ centers.T)
+    return d2.argmin(axis=1)
+
+
+def lloyd(scaled, centers, max_iter=STABILITY_MAX_ITER):
+    centers = np.array(centers, dtype=np.float64)
+    for _ in range(max_iter):
+        labels = _nearest(scaled, centers)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, scaled)
+        # Cluster kosong mempertahankan centroid lamanya
+        updated = np.where(
+            counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers
+        )
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+    return centers
+
+
+def bootstrap_replicates(model, matrix_path, seeds):
+    """Return jumlah replikasi di mana label tiap baris sama dengan label model."""
+    engine = _worker_engine(model)
+    scaled = engine.transform(np.load(matrix_path, mmap_mode="r"))
+    reference = _nearest(scaled, engine.centers)
+    agree = np.zeros(len(scaled), dtype=np.int64)
+    for seed in seeds:
+        rng = np.random.default_rng(int(seed))
+        sample = scaled[rng.integers(0, len(scaled), size=len(scaled))]
+        centers = lloyd(sample, engine.centers)
+        agree += _nearest(scaled, centers) == reference
+    return agree
+
+
+# --- Manajemen job (event loop) ---
+def split_input(input_path, fmt, chunk_dir, chunk_rows):
+    """Pecah file per ``chunk_rows`` baris tanpa parsing. Return [(path, offset)]."""
+    chunks = []
+    header = b""
+    with open(input_path, "rb") as src:
+        if fmt == FORMAT_CSV:
+            header = src.readline()
+        buffer, offset = [], 0
+
+        def flush():
+            path = os.path.join(chunk_dir, f"chunk-{len(chunks):05d}")
+            with open(path, "wb") as out:
+                out.write(header)
+                out.writelines(buffer)
+            chunks.append((path, offset))
+
+        for line in src:
+            if not line.strip():
+                continue
+            buffer.append(line)
+            if len(buffer) >= chunk_rows:
+                flush()
+                offset += len(buffer)
+                buffer = []
+        if buffer or not chunks:
+            flush()
+    return chunks
+
+
+def model_payload(bundle):
+    engine = bundle.engine
+    return {
+        "version": bundle.version,
+        # Salinan biasa (bukan memmap) agar bisa di-pickle ke proses worker
+        "centers": np.array(engine.centers),
+        "mean": np.array(engine.mean),
+        "scale": np.array(engine.scale),
+        "feature_names": list(engine.feature_names),
+        "labels": list(bundle.labels),
+    }
+
+
+class JobManager:
+    def __init__(
+        self,
+        jobs_dir=SCORING_JOBS_DIR,
+        max_workers=JOB_WORKERS,
+        chunk_rows=JOB_CHUNK_ROWS,
+        ttl=JOB_RESULT_TTL,
+        stale_timeout=JOB_STALE_TIMEOUT,
+        on_scored=None,
+    ):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.chunk_rows = chunk_rows
+        self.ttl = ttl
+        self.stale_timeout = stale_timeout
+        # async on_scored(endpoint, bundle, matrix, cluster_ids): audit log
+        self.on_scored = on_scored
+        self._executor = None
+        # Job yang sedang dijalankan proses ini; selebihnya dibaca dari disk
+        self._jobs = {}
+        self._tasks = set()
+        self._janitor = None
+
+    def _ensure_started(self):
+        # Pool dibuat saat job pertama (tidak memperlambat startup backend)
+        if self._executor is None:
+            import multiprocessing
+
+            os.makedirs(os.path.join(self.jobs_dir, KEYS_DIRNAME), exist_ok=True)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._janitor = asyncio.create_task(self._expire_loop())
+
+    async def shutdown(self):
+        for task in list(self._tasks) + [self._janitor]:
+            if task is not None:
+                task.cancel()
+        for task in list(self._tasks):
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._janitor = None
+        self._jobs = {}
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _key_path(self, cache_key):
+        return os.path.join(self.jobs_dir, KEYS_DIRNAME, cache_key)
+
+    def _save(self, job):
+        job["updated_at"] = time.time()
+        path = os.path.join(self._job_dir(job["job_id"]), JOB_FILENAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(job, f)
+        os.replace(path + ".tmp", path)
+
+    def _load(self, job_id):
+        if not isinstance(job_id, str) or not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(os.path.join(self._job_dir(job_id), JOB_FILENAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _expired(self, job):
+        finished = job.get("finished_at")
+        return finished is not None and time.time() - finished > self.ttl
+
+    def _stale(self, job):
+        if job.get("finished_at") is not None:
+            return self._expired(job)
+        updated = job.get("updated_at", job.get("created_at", 0))
+        return time.time() - updated > self.stale_timeout
+
+    def expire(self):
+        """Hapus job kedaluwarsa, job yatim, dan key dedup yang tidak berlaku."""
+        try:
+            entries = list(os.scandir(self.jobs_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            if entry.name in self._jobs:
+                continue
+            job = self._load(entry.name)
+            if job is None:
+                # job.json tidak pernah ditulis (proses mati saat submit)
+                with contextlib.suppress(OSError):
+                    stale = time.time() - entry.stat().st_mtime > self.stale_timeout
+                    if stale:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+            elif self._stale(job):
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+        keys_dir = os.path.join(self.jobs_dir, KEYS_DIRNAME)
+        with contextlib.suppress(FileNotFoundError):
+            for entry in os.scandir(keys_dir):
+                if "." in entry.name:
+                    continue
+                with contextlib.suppress(OSError):
+                    with open(entry.path) as f:
+                        job_id = f.read().strip()
+                    if not os.path.isdir(self._job_dir(job_id)):
+                        os.remove(entry.path)
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, min(self.ttl, self.stale_timeout, 60.0)))
+            try:
+                await asyncio.to_thread(self.expire)
+            except Exception as e:
+                print(f"❌ Job janitor error: {e}")
+
+    def get(self, job_id):
+        # Job milik proses ini paling baru; selain itu job.json (worker lain)
+        job = self._jobs.get(job_id) or self._load(job_id)
+        if job is None or self._expired(job):
+            return None
+        return job
+
+    def result_path(self, job_id):
+        return os.path.join(self._job_dir(job_id), RESULT_FILENAME)
+
+    def _cached_job(self, cache_key):
+        """Job untuk ``cache_key`` dari index di disk (None jika gagal / hilang)."""
+        path = self._key_path(cache_key)
+        try:
+            with open(path) as f:
+                job_id = f.read().strip()
+        except OSError:
+            return None
+        job = self.get(job_id)
+        if job is None or job["status"] == STATUS_FAILED:
+            # Hasil lama gagal / kedaluwarsa: key boleh diklaim ulang
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+        return job
+
+    def _claim_key(self, cache_key, job_id):
+        # link() atomik & gagal jika key sudah ada: isi file selalu lengkap
+        path = self._key_path(cache_key)
+        tmp = f"{path}.{job_id}.tmp"
+        with open(tmp, "w") as f:
+            f.write(job_id)
+        try:
+            os.link(tmp, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp)
+
+    async def submit(self, spool, input_hash, fmt, bundle, kind, params):
+        """``spool``: file upload (sudah di disk); return record job."""
+        self._ensure_started()
+        cache_key = hashlib.sha256(
+            json.dumps(
+                [input_hash, fmt, kind, params, bundle.version], sort_keys=True
+            ).encode()
+        ).hexdigest()
+        cached = self._cached_job(cache_key)
+        if cached is not None:
+            spool.close()
+            return {**cached, "cached": True}
+
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id))
+        input_path = os.path.join(self._job_dir(job_id), INPUT_FILENAME)
+        await asyncio.to_thread(_copy_and_close, spool, input_path)
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "params": params,
+            "status": STATUS_QUEUED,
+            "model_version": bundle.version,
+            "cache_key": cache_key,
+            "created_at": time.time(),
+            "finished_at": None,
+            "progress": 0.0,
+            "n_rows": 0,
+            "n_failed": 0,
+            "summary": None,
+            "error": None,
+        }
+        self._save(job)
+        if not self._claim_key(cache_key, job_id):
+            # Worker lain baru saja menerima upload yang sama
+            cached = self._cached_job(cache_key)
+            if cached is not None:
+                shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+                return {**cached, "cached": True}
+            self._claim_key(cache_key, job_id)
+        self._jobs[job_id] = job
+
+        runner = self._run_score if kind == KIND_SCORE else self._run_stability
+        task = asyncio.create_task(self._run(job, runner, input_path, fmt, bundle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return {**job, "cached": False}
+
+    def _progress(self, job, progress):
+        # Disimpan ke disk agar worker lain melihat progres terbaru
+        job["progress"] = progress
+        self._save(job)
+
+    async def _run(self, job, runner, input_path, fmt, bundle):
+        job["status"] = STATUS_RUNNING
+        self._save(job)
+        try:
+            await runner(job, input_path, fmt, bundle)
+            job["status"] = STATUS_DONE
+            job["progress"] = 1.0
+        except asyncio.CancelledError:
+            job["status"] = STATUS_FAILED
+            job["error"] = "Job dibatalkan (backend shutdown)."
+            raise
+        except Exception as e:
+            job["status"] = STATUS_FAILED
+            job["error"] = str(e)
+            print(f"❌ Job {job['job_id']} gagal: {e}")
+        finally:
+            job["finished_at"] = time.time()
+            if os.path.isdir(self._job_dir(job["job_id"])):
+                self._save(job)
+            if os.path.exists(input_path):
+                os.remove(input_path)
+            self._jobs.pop(job["job_id"], None)
+
+    async def _audit(self, job, bundle, matrix, cluster_ids):
+        if self.on_scored is not None and len(cluster_ids):
+            await self.on_scored(f"job_{job['kind']}", bundle, matrix, cluster_ids)
+
+    async def _run_score(self, job, input_path, fmt, bundle):
+        model = model_payload(bundle)
+        loop = asyncio.get_running_loop()
+        job_dir = self._job_dir(job["job_id"])
+        chunks = await asyncio.to_thread(
+            split_input, input_path, fmt, job_dir, self.chunk_rows
+        )
+        parts = [path + ".ndjson" for path, _ in chunks]
+        futures = [
+            loop.run_in_executor(
+                self._executor,
+                score_chunk_file,
+                model,
+                path,
+                fmt,
+                part,
+                job["params"]["id_column"],
+                offset,
+                self.on_scored is not None,
+            )
+            for (path, offset), part in zip(chunks, parts)
+        ]
+        counts = np.zeros(len(model["labels"]), dtype=np.int64)
+        for done, future in enumerate(asyncio.as_completed(futures), start=1):
+            n_rows, n_failed, chunk_counts, scored = await future
+            if scored is not None:
+                await self._audit(job, bundle, *scored)
+            job["n_rows"] += n_rows
+            job["n_failed"] += n_failed
+            counts += chunk_counts
+            self._progress(job, done / len(futures))
+
+        await asyncio.to_thread(
+            _concat, parts, self.result_path(job["job_id"]), [p for p, _ in chunks]
+        )
+        job["summary"] = {
+            "cluster_counts": {
+                label: int(n) for label, n in zip(model["labels"], counts)
+            }
+        }
+
+    async def _run_stability(self, job, input_path, fmt, bundle):
+        model = model_payload(bundle)
+        loop = asyncio.get_running_loop()
+        job_dir = self._job_dir(job["job_id"])
+        n_rows, n_failed = await loop.run_in_executor(
+            self._executor,
+            parse_to_arrays,
+            model,
+            input_path,
+            fmt,
+            job_dir,
+            job["params"]["id_column"],
+        )
+        job["n_rows"], job["n_failed"] = n_rows, n_failed
+        self._save(job)
+        matrix_path = os.path.join(job_dir, "matrix.npy")
+        n_bootstrap = job["params"]["n_bootstrap"]
+        seeds = np.array_split(np.arange(n_bootstrap), self.max_workers)
+        futures = [
+            loop.run_in_executor(
+                self._executor, bootstrap_replicates, model, matrix_path, group
+            )
+            for group in seeds
+            if len(group) and n_rows > n_failed
+        ]
+        agree = None
+        for done, future in enumerate(asyncio.as_completed(futures), start=1):
+            counts = await future
+            agree = counts if agree is None else agree + counts
+            self._progress(job, done / (len(futures) + 1))
+
+        summary, scored = await asyncio.to_thread(
+            _write_stability, job_dir, model, agree, n_bootstrap, RESULT_FILENAME
+        )
+        job["summary"] = summary
+        await self._audit(job, bundle, *scored)
+
+
+def _copy_and_close(spool, path):
+    with open(path, "wb") as out:
+        shutil.copyfileobj(spool, out, 1 << 20)
+    spool.close()
+
+
+def _concat(parts, output_path, cleanup):
+    with open(output_path + ".tmp", "wb") as out:
+        for part in parts:
+            with open(part, "rb") as src:
+                shutil.copyfileobj(src, out, 1 << 20)
+    os.replace(output_path + ".tmp", output_path)
+    for path in list(parts) + list(cleanup):
+        os.remove(path)
+
+
+def _write_stability(job_dir, model, agree, n_bootstrap, result_filename):
+    engine = _worker_engine(model)
+    matrix = np.load(os.path.join(job_dir, "matrix.npy"))
+    with open(os.path.join(job_dir, "rows.json")) as f:
+        rows = json.load(f)
+    cluster_ids = engine.predict(matrix) if len(matrix) else []
+    stability = agree / n_bootstrap if agree is not None else []
+
+    per_cluster = {}
+    scored = iter(zip(cluster_ids, stability))
+    with open(os.path.join(job_dir, result_filename), "w") as out:
+        for row in rows:
+            result = {"index": row["index"], "id": row["id"]}
+            if row["error"] is not None:
+                result["error"] = row["error"]
+            else:
+                cluster_id, score = next(scored)
+                label = _label(model, int(cluster_id))
+                result.update(
+                    cluster_id=int(cluster_id),
+                    label=label,
+                    stability=round(float(score), 6),
+                )
+                per_cluster.setdefault(label, []).append(float(score))
+            out.write(json.dumps(result, default=str) + "\n")
+    os.remove(os.path.join(job_dir, "matrix.npy"))
+    os.remove(os.path.join(job_dir, "rows.json"))
+    summary = {
+        "n_bootstrap": n_bootstrap,
+        "mean_stability": {
+            label: round(float(np.mean(scores)), 6)
+            for label, scores in sorted(per_cluster.items())
+        },
+    }
+    return summary, (matrix, np.asarray(cluster_ids, dtype=np.int64))
@@ -1,12 +1,69 @@
+import asyncio
+import hashlib
+import json
+import math
 import os
-import joblib
-import pandas as pd
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from prometheus_fastapi_instrumentator import Instrumentator
 from contextlib import asynccontextmanager
 
+from . import binary, columnar, tracing
+from .admission import AdmissionControlMiddleware
+from .audit import AuditLog
+from .batcher import PREDICT_BATCHING, MicroBatcher
+from .cache import PredictionCache
+from .counterfactual import find_paths
+from .database import DB_PAGE_MAX, Database, DatabaseUnavailable
+from .drift import DriftMonitor
+from .engine import soft_assignment
+from .explain import explain
+from .jobs import (
+    JOB_KINDS,
+    JOB_MAX_BOOTSTRAP,
+    KIND_STABILITY,
+    STATUS_DONE,
+    JobManager,
+)
+from .metrics import (
+    LIVE_SESSIONS,
+    RequestStartMiddleware,
+    count_predictions,
+    elapsed_ms,
+    observe_since_received,
+    observe_stage,
+    stage_timer,
+)
+from .model_registry import (
+    ACTIVE_MODEL_NAME,
+    MODEL_VERSION_HEADER,
+    MODEL_VERSION_PARAM,
+    SHADOW_MODEL,
+    ModelRegistry,
+    ShadowScorer,
+)
+from .model_store import MODEL_RELOAD_INTERVAL, ModelStore
+from .streaming import (
+    STREAM_CHUNK_ROWS,
+    detect_format,
+    iter_ndjson_predictions,
+    spool_request_body,
+)
+from .tracing import TracingMiddleware
 
 load_dotenv()
 
@@ -48,84 +105,992 @@ class ProvinceFeatures(BaseModel):
     persen_guru_kualifikasi_s1_sma: float
 
 
+# Urutan kolom default (mengikuti urutan field schema di atas)
+FEATURE_COLUMNS = list(ProvinceFeatures.__annotations__)
+
+
+class BatchPredictRequest(BaseModel):
+    # Tiap baris berisi fitur ProvinceFeatures + optional "id" (mis. nama provinsi)
+    rows: List[Dict[str, Any]]
+
+
+class CounterfactualRequest(BaseModel):
+    features: ProvinceFeatures
+    # Bobot biaya perubahan per fitur (default 1 = satu standar deviasi)
+    feature_weights: Dict[str, float] = {}
+    # Fitur yang tidak bisa diintervensi kebijakan (tidak boleh berubah)
+    immutable_features: List[str] = []
+
+
 # --- 2. Global Variables untuk Model ---
-ml_models = {}
+# Satu-satunya sumber model aktif; di-swap atomik oleh watcher hot reload
+model_store = ModelStore(FEATURE_COLUMNS)
+# Versi lain (ARTIFACTS_DIR/versions/<nama>) untuk routing & shadow scoring
+model_registry = ModelRegistry(model_store)
+
+# Shadow scorer (dibuat di lifespan jika SHADOW_MODEL di-set)
+shadow_scorer = {}
+
+# Statistik fitur live + skor drift vs data training model aktif
+drift_monitor = DriftMonitor()
+
+# Audit log prediksi ke Postgres (buffer + COPY di background)
+audit_log = AuditLog()
+
+# Query Postgres (education_features + hasil cluster), pool dibuat saat dipakai
+database = Database()
+
+# Job scoring asinkron (process pool dibuat saat job pertama masuk)
+# Hasil job ikut dicatat audit log, per chunk yang selesai di-score
+job_manager = JobManager(
+    on_scored=audit_log.record_scored if audit_log.enabled else None
+)
+
+# Cache hasil /predict (slider dashboard sering mengirim input yang sama)
+prediction_cache = PredictionCache()
+
+# Micro-batcher /predict (dibuat di lifespan karena butuh event loop)
+micro_batcher = {}
+
+# Tracing OpenTelemetry (aktif jika TRACE_FILE / OTEL_EXPORTER_OTLP_ENDPOINT)
+tracing.configure()
+
+# Batas jumlah baris per request batch (hindari request raksasa di memori)
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
 
 
 # --- 3. Lifespan (Load Model saat Startup) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load model saat aplikasi mulai
-    model_path = "/app/artifacts/kmeans_model.pkl"
-    scaler_path = "/app/artifacts/standard_scaler.pkl"
+    model_store.reload_if_changed(force=True)
+    model_registry.discover()
 
-    try:
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
-            ml_models["kmeans"] = joblib.load(model_path)
-            ml_models["scaler"] = joblib.load(scaler_path)
-            print(f"✅ Model loaded successfully from {model_path}")
-        else:
-            print(
-                "⚠️ Warning: Model artifacts not found. Please run Mage pipeline first."
+    # Watcher: deteksi artefak baru dari pipeline Mage tanpa restart container
+    watcher = None
+    if MODEL_RELOAD_INTERVAL > 0:
+        # Cache hasil versi yang sudah dilepas dibersihkan tiap polling
+        watcher = asyncio.create_task(
+            model_registry.watch(
+                MODEL_RELOAD_INTERVAL, on_refresh=prediction_cache.retain
             )
-    except Exception as e:
-        print(f"❌ Error loading models: {e}")
+        )
+
+    if PREDICT_BATCHING:
+        micro_batcher["instance"] = MicroBatcher()
+        micro_batcher["instance"].start()
+
+    if SHADOW_MODEL:
+        shadow_scorer["instance"] = ShadowScorer(model_registry, SHADOW_MODEL)
+        shadow_scorer["instance"].start()
+
+    audit_log.start()
 
     yield
     # (Code after yield runs on shutdown - clean up if needed)
-    ml_models.clear()
+    await audit_log.stop()
+    await database.close()
+    if "instance" in micro_batcher:
+        await micro_batcher.pop("instance").stop()
+    if "instance" in shadow_scorer:
+        await shadow_scorer.pop("instance").stop()
+    await job_manager.shutdown()
+    if watcher is not None:
+        watcher.cancel()
+        try:
+            await watcher
+        except asyncio.CancelledError:
+            pass
+    model_registry.clear()
+    model_store.clear()
+    drift_monitor.clear()
+    prediction_cache.clear()
+    tracing.force_flush()
 
 
 app = FastAPI(title="Education Cluster API", lifespan=lifespan)
+app.add_middleware(RequestStartMiddleware)
 Instrumentator().instrument(app).expose(app)
+# Di luar app: request yang ditolak (503) tidak sempat masuk antrean threadpool
+app.add_middleware(AdmissionControlMiddleware)
+# Di luar admission control: waktu tunggu antrean & penolakan 503 ikut ter-trace
+app.add_middleware(TracingMiddleware)
 
 
-# --- 4. Helper: Mapping Cluster ID ke Label ---
-def get_cluster_label(cluster_id):
-    # BERDASARKAN HASIL TRAINING ANDA (Interpreted from Cluster Centers):
-    # Cluster 1 (Centroid Positif ~0.7) -> Kesiapan TINGGI
-    # Cluster 0 (Centroid Negatif Infrastruktur ~-2.0) -> Kesiapan RENDAH
-    # Cluster 2 (Centroid ~-0.5) -> Kesiapan SEDANG
-    # (Anda bisa sesuaikan mapping ini nanti jika label tertukar di Frontend)
-    mapping = {
-        1: "Tinggi (High Readiness)",
-        2: "Sedang (Medium Readiness)",
-        0: "Rendah (Low Readiness)",
+# --- 4. Helper ---
+def get_active_bundle(request=None):
+    # Ambil snapshot sekali per request agar scaler & KMeans selalu sepasang.
+    # Versi lain bisa dipilih lewat header X-Model-Version / query model_version.
+    selector = None
+    if request is not None:
+        selector = request.headers.get(
+            MODEL_VERSION_HEADER
+        ) or request.query_params.get(MODEL_VERSION_PARAM)
+    bundle = model_registry.resolve(selector)
+    if bundle is None and selector and selector != ACTIVE_MODEL_NAME:
+        raise HTTPException(
+            status_code=404, detail=f"Versi model '{selector}' tidak ditemukan."
+        )
+    if bundle is None:
+        raise HTTPException(
+            status_code=503, detail="Model belum siap. Jalankan pipeline training dulu."
+        )
+    return bundle
+
+
+def submit_shadow(bundle, matrix, cluster_ids):
+    # Hanya traffic model aktif yang di-score ulang model kandidat (di background)
+    scorer = shadow_scorer.get("instance")
+    if scorer is not None and bundle is model_store.current:
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(len(cluster_ids), -1)
+        scorer.submit(bundle, matrix, np.asarray(cluster_ids))
+
+
+def observe_drift(bundle, matrix):
+    # Statistik drift hanya untuk traffic model aktif (versi lain = eksperimen)
+    if bundle is model_store.current:
+        drift_monitor.observe(bundle, matrix)
+
+
+def soft_fields(bundle, sq_distances):
+    """Jarak ke semua centroid, membership & flag boundary (index = cluster_id)."""
+    distances, membership, boundary = soft_assignment(
+        sq_distances, len(bundle.engine.feature_names)
+    )
+    return [
+        {
+            "distances": [round(float(d), 6) for d in dist_row],
+            "membership": [round(float(m), 6) for m in member_row],
+            "is_boundary": bool(is_boundary),
+        }
+        for dist_row, member_row, is_boundary in zip(distances, membership, boundary)
+    ]
+
+
+def cached_json(request, bundle, render):
+    """
+    Response read API dengan ETag = versi model. Jika klien mengirim
+    If-None-Match yang cocok, balas 304 tanpa membangun body sama sekali.
+    """
+    etag = f'"{bundle.version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": MODEL_VERSION_HEADER,
+        "X-Model-Version": bundle.version,
     }
-    return mapping.get(cluster_id, "Unknown")
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    return Response(content=render(), media_type="application/json", headers=headers)
+
+
+def get_catalog(bundle):
+    if bundle.catalog is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Data berlabel (data_labeled.csv) belum tersedia.",
+        )
+    return bundle.catalog
+
+
+def require_finite(feature_names, values):
+    # NaN / Inf lolos validasi pydantic, sedangkan engine tidak menolaknya
+    # (argmin diam-diam jatuh ke cluster 0): tolak sebelum scoring & pencatatan
+    invalid = [
+        name for name, value in zip(feature_names, values) if not math.isfinite(value)
+    ]
+    if invalid:
+        raise HTTPException(
+            status_code=422, detail=f"Nilai fitur harus finite: {invalid}"
+        )
+
+
+def _validation_errors(exc):
+    return [
+        {"loc": list(err.get("loc", ())), "msg": err.get("msg", "")}
+        for err in exc.errors()
+    ]
 
 
 # --- 5. Endpoints ---
 @app.get("/")
 def read_root():
-    model_status = "Loaded" if "kmeans" in ml_models else "Not Loaded"
-    return {"status": "active", "model_status": model_status}
+    bundle = model_store.current
+    model_status = "Loaded" if bundle is not None else "Not Loaded"
+    response = {"status": "active", "model_status": model_status}
+    if bundle is not None:
+        response.update(bundle.info())
+    return response
+
+
+@app.get("/health")
+def health():
+    """Health check ringan (jalur prioritas admission control)."""
+    bundle = model_store.current
+    return {
+        "status": "ok",
+        "model_loaded": bundle is not None,
+        "model_version": bundle.version if bundle is not None else None,
+    }
+
+
+@app.get("/models")
+def list_models():
+    """Model aktif, versi lain yang bisa dipilih per request, dan model shadow."""
+    bundle = model_store.current
+    return {
+        "active": bundle.info() if bundle is not None else None,
+        "versions": model_registry.describe(),
+        "shadow_model": SHADOW_MODEL or None,
+        "routing": {"header": MODEL_VERSION_HEADER, "query": MODEL_VERSION_PARAM},
+    }
+
+
+@app.get("/drift")
+def drift_status():
+    """Statistik input live vs data training (sama dengan gauge Prometheus)."""
+    return drift_monitor.snapshot()
+
+
+def _predict_one_cached(bundle, values):
+    # Jalur tanpa micro-batching (dijalankan di threadpool)
+    with stage_timer("predict", "inference"):
+        assignment = bundle.engine.assign_one(values)
+    if prediction_cache.enabled:
+        prediction_cache.put(
+            prediction_cache.make_key(bundle.version, values), assignment
+        )
+    return assignment
 
 
 @app.post("/predict")
-def predict_cluster(features: ProvinceFeatures):
-    if "kmeans" not in ml_models or "scaler" not in ml_models:
+async def predict_cluster(features: ProvinceFeatures, request: Request):
+    # Body sudah diparse & divalidasi pydantic sebelum handler dipanggil
+    observe_since_received(request, "predict")
+    bundle = get_active_bundle(request)
+
+    # 1. Ambil nilai fitur sesuai urutan training (tanpa DataFrame)
+    with stage_timer("predict", "feature_extraction"):
+        values = [getattr(features, col) for col in bundle.engine.feature_names]
+    require_finite(bundle.engine.feature_names, values)
+
+    try:
+
+        # 2. Cek cache (key: versi model + fitur terkuantisasi)
+        assignment = None
+        if prediction_cache.enabled:
+            with stage_timer("predict", "cache_lookup"):
+                cache_key = prediction_cache.make_key(bundle.version, values)
+                assignment = prediction_cache.get(cache_key)
+
+        # 3. Standardisasi + prediksi: digabung micro-batch jika aktif.
+        #    Hasilnya (cluster_id, jarak kuadrat ke semua centroid).
+        if assignment is None:
+            batcher = micro_batcher.get("instance")
+            if batcher is not None:
+                with stage_timer("predict", "microbatch_wait"):
+                    assignment = await batcher.submit(bundle, values)
+                if prediction_cache.enabled:
+                    prediction_cache.put(cache_key, assignment)
+            else:
+                assignment = await run_in_threadpool(
+                    _predict_one_cached, bundle, values
+                )
+        cluster_id, sq_distances = assignment
+
+        with stage_timer("predict", "postprocess"):
+            response = {
+                "cluster_id": int(cluster_id),
+                "label": bundle.label(cluster_id),
+                **soft_fields(bundle, sq_distances)[0],
+                "model_version": bundle.version,
+                "message": "Prediksi berhasil",
+            }
+        count_predictions(bundle, [cluster_id])
+        submit_shadow(bundle, [values], [cluster_id])
+        observe_drift(bundle, [values])
+        await audit_log.record_scored(
+            "predict", bundle, [values], [cluster_id], elapsed_ms(request)
+        )
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _validate_rows(rows, feature_order):
+    """Return (results per baris, index baris valid, matriks fitur baris valid)."""
+    results = []
+    valid_index = []
+    valid_rows = []
+    for i, row in enumerate(rows):
+        row_id = row.get("id", i)
+        try:
+            features = ProvinceFeatures(**row)
+        except ValidationError as e:
+            results.append({"index": i, "id": row_id, "errors": _validation_errors(e)})
+            continue
+        results.append({"index": i, "id": row_id})
+        valid_index.append(i)
+        valid_rows.append([getattr(features, col) for col in feature_order])
+
+    matrix = np.asarray(valid_rows, dtype=np.float64).reshape(
+        len(valid_rows), len(feature_order)
+    )
+    # NaN / Inf lolos validasi pydantic, tapi tidak bisa diproses scaler
+    finite = np.isfinite(matrix).all(axis=1)
+    for i in np.asarray(valid_index, dtype=np.int64)[~finite]:
+        results[i]["errors"] = [{"loc": [], "msg": "Nilai fitur harus finite"}]
+    valid_index = [i for i, ok in zip(valid_index, finite) if ok]
+    return results, valid_index, matrix[finite]
+
+
+@app.post("/predict/batch")
+def predict_batch(payload: BatchPredictRequest, request: Request):
+    observe_since_received(request, "predict_batch")
+    bundle = get_active_bundle(request)
+    if len(payload.rows) > MAX_BATCH_ROWS:
         raise HTTPException(
-            status_code=503, detail="Model belum siap. Jalankan pipeline training dulu."
+            status_code=413,
+            detail=f"Maksimal {MAX_BATCH_ROWS} baris per request batch.",
         )
 
+    # 1. Validasi per baris: baris yang gagal dicatat, sisanya tetap diproses
+    validation_started = time.perf_counter()
+    results, valid_index, matrix = _validate_rows(
+        payload.rows, bundle.engine.feature_names
+    )
+    observe_stage(
+        "predict_batch", "validation", time.perf_counter() - validation_started
+    )
+
+    if valid_index:
+        try:
+            # 2. Satu kali standardisasi + predict untuk seluruh matriks
+            with stage_timer("predict_batch", "inference"):
+                cluster_ids, sq_distances = bundle.engine.assign(matrix)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        with stage_timer("predict_batch", "postprocess"):
+            soft = soft_fields(bundle, sq_distances)
+            for i, cluster_id, extra in zip(valid_index, cluster_ids, soft):
+                results[i]["cluster_id"] = int(cluster_id)
+                results[i]["label"] = bundle.label(int(cluster_id))
+                results[i].update(extra)
+        count_predictions(bundle, cluster_ids)
+        submit_shadow(bundle, matrix, cluster_ids)
+        observe_drift(bundle, matrix)
+        audit_log.record_scored_threadsafe(
+            "predict_batch", bundle, matrix, cluster_ids, elapsed_ms(request)
+        )
+
+    n_success = len(valid_index)
+    return {
+        "results": results,
+        "n_success": n_success,
+        "n_failed": len(results) - n_success,
+        "model_version": bundle.version,
+        "message": "Prediksi batch selesai",
+    }
+
+
+def _assign_timed(engine, matrix, endpoint):
+    with stage_timer(endpoint, "inference"):
+        return engine.assign(matrix)
+
+
+@app.post("/predict/binary")
+async def predict_binary(request: Request, distances: bool = False):
+    """
+    Scoring dengan encoding biner ringkas (float32 little-endian, lihat
+    ``binary.py``). Satu baris atau banyak baris memakai route yang sama.
+    ``?distances=true`` menambahkan jarak kuadrat ke semua centroid.
+    """
+    if not binary.is_binary(request.headers.get("content-type")):
+        raise HTTPException(
+            status_code=415, detail=f"Gunakan Content-Type {binary.MEDIA_TYPE}."
+        )
+    bundle = get_active_bundle(request)
+    feature_names = bundle.engine.feature_names
+    declared = binary.parse_feature_order(
+        request.headers.get(binary.FEATURE_ORDER_HEADER), feature_names
+    )
+
+    body = await request.body()
+    if len(body) > binary.BINARY_MAX_ROWS * 4 * max(len(declared), 1):
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maksimal {binary.BINARY_MAX_ROWS} baris per request biner.",
+        )
     try:
-        # 1. Konversi Input ke DataFrame (sesuai urutan training)
-        input_data = pd.DataFrame(
-            [features.dict().values()], columns=features.dict().keys()
+        with stage_timer("predict_binary", "parse"):
+            matrix, valid = binary.decode_matrix(body, declared, feature_names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    n_rows, n_clusters = len(matrix), bundle.engine.n_clusters
+    cluster_ids = np.full(n_rows, binary.INVALID_CLUSTER_ID, dtype=np.int32)
+    sq_distances = np.full((n_rows, n_clusters), np.nan) if distances else None
+    if valid.any():
+        X = matrix if valid.all() else matrix[valid]
+        ids, sq = await run_in_threadpool(
+            _assign_timed, bundle.engine, X, "predict_binary"
+        )
+        cluster_ids[valid] = ids
+        if distances:
+            sq_distances[valid] = sq
+        count_predictions(bundle, ids)
+        submit_shadow(bundle, X, ids)
+        observe_drift(bundle, X)
+        await audit_log.record_scored(
+            "predict_binary", bundle, X, ids, elapsed_ms(request)
+        )
+
+    with stage_timer("predict_binary", "serialize"):
+        content = binary.encode_response(cluster_ids, sq_distances)
+    return Response(
+        content=content,
+        media_type=binary.MEDIA_TYPE,
+        headers={
+            "X-Model-Version": bundle.version,
+            binary.FEATURE_ORDER_HEADER: ",".join(feature_names),
+            binary.LAYOUT_HEADER: binary.response_layout(n_rows, n_clusters, distances),
+        },
+    )
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request, id_column: str = "id"):
+    """
+    Bulk scoring untuk file besar. Body berupa CSV (Content-Type: text/csv)
+    atau NDJSON (application/x-ndjson); hasil dikirim bertahap sebagai NDJSON.
+    """
+    fmt = detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Gunakan Content-Type text/csv atau application/x-ndjson.",
+        )
+    bundle = get_active_bundle(request)
+
+    body = await spool_request_body(request)
+
+    def audit_chunk(matrix, cluster_ids):
+        # Generator jalan di threadpool: audit dicatat per chunk
+        audit_log.record_scored_threadsafe(
+            "predict_stream", bundle, matrix, cluster_ids
         )
 
-        # 2. Standardisasi Data (pakai scaler yang sama dengan training)
-        scaled_data = ml_models["scaler"].transform(input_data)
+    return StreamingResponse(
+        iter_ndjson_predictions(
+            body,
+            fmt,
+            bundle,
+            bundle.label,
+            id_column,
+            STREAM_CHUNK_ROWS,
+            # Tanpa audit, baris hasil per chunk tidak perlu dikumpulkan
+            on_scored=audit_chunk if audit_log.active else None,
+        ),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": bundle.version},
+    )
 
-        # 3. Prediksi
-        cluster_id = ml_models["kmeans"].predict(scaled_data)[0]
-        label = get_cluster_label(cluster_id)
 
+def _score_arrow(body, fmt, bundle, id_column):
+    """
+    Parse + score + serialize (dijalankan di threadpool: payload bulk bisa
+    besar dan pyarrow/numpy tidak boleh memblok event loop).
+    Return (body response, matriks baris valid, cluster_id baris valid).
+    """
+    try:
+        with stage_timer("predict_arrow", "parse"):
+            table = columnar.read_table(body, fmt)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Body tidak valid: {e}")
+
+    try:
+        with stage_timer("predict_arrow", "inference"):
+            matrix, valid = columnar.table_to_matrix(table, bundle.engine.feature_names)
+            X = matrix[valid]
+            cluster_ids = bundle.engine.predict(X) if len(X) else np.empty(0, int)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    with stage_timer("predict_arrow", "serialize"):
+        result = columnar.build_result(
+            table, cluster_ids, valid, bundle.labels, id_column
+        )
+        content = columnar.write_table(result, fmt)
+    return content, X, cluster_ids
+
+
+@app.post("/predict/arrow")
+async def predict_arrow(request: Request, id_column: str = "id"):
+    """
+    Scoring kolumnar: body berupa Arrow IPC stream atau Parquet dengan kolom
+    sesuai ProvinceFeatures. Response memakai format yang sama dengan request.
+    """
+    if not columnar.is_available():
+        raise HTTPException(status_code=501, detail="pyarrow belum terpasang.")
+    fmt = columnar.detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Gunakan Content-Type application/vnd.apache.arrow.stream "
+            "atau application/vnd.apache.parquet.",
+        )
+    bundle = get_active_bundle(request)
+
+    body = await request.body()
+    content, X, cluster_ids = await run_in_threadpool(
+        _score_arrow, body, fmt, bundle, id_column
+    )
+    if len(cluster_ids):
+        count_predictions(bundle, cluster_ids)
+        submit_shadow(bundle, X, cluster_ids)
+        observe_drift(bundle, X)
+        await audit_log.record_scored(
+            "predict_arrow", bundle, X, cluster_ids, elapsed_ms(request)
+        )
+    return Response(
+        content=content,
+        media_type=columnar.MEDIA_TYPES[fmt],
+        headers={"X-Model-Version": bundle.version},
+    )
+
+
+def _live_update(state, message, selector, scored=None):
+    """
+    Gabungkan update parsial ke ``state`` lalu score; return pesan balasan.
+    Prediksi yang berhasil ditambahkan ke ``scored`` sebagai (bundle, nilai, id).
+    """
+    if not isinstance(message, dict):
+        return {"error": "Pesan harus objek JSON."}
+    seq = message.get("seq")
+    if message.get("reset"):
+        state.clear()
+    updates = message.get("features") or {}
+    if not isinstance(updates, dict):
+        return {"seq": seq, "error": "'features' harus objek {nama_fitur: nilai}."}
+
+    unknown = [name for name in updates if name not in FEATURE_COLUMNS]
+    invalid = [
+        name
+        for name, value in updates.items()
+        if isinstance(value, bool)
+        or not isinstance(value, (int, float))
+        or not math.isfinite(value)
+    ]
+    if unknown or invalid:
         return {
-            "cluster_id": int(cluster_id),
-            "label": label,
-            "message": "Prediksi berhasil",
+            "seq": seq,
+            "error": "Fitur tidak valid.",
+            "unknown": unknown,
+            "invalid": invalid,
         }
+    state.update({name: float(value) for name, value in updates.items()})
+
+    bundle = model_registry.resolve(selector)
+    if bundle is None:
+        return {"seq": seq, "error": "Model belum siap."}
+    feature_names = bundle.engine.feature_names
+    missing = [name for name in feature_names if name not in state]
+    if missing:
+        return {"seq": seq, "status": "incomplete", "missing": missing}
+
+    values = [state[name] for name in feature_names]
+    with stage_timer("predict_ws", "inference"):
+        cluster_id, sq_distances = bundle.engine.assign_one(values)
+    count_predictions(bundle, [cluster_id])
+    if scored is not None:
+        scored.append((bundle, values, cluster_id))
+    return {
+        "seq": seq,
+        "cluster_id": int(cluster_id),
+        "label": bundle.label(cluster_id),
+        **soft_fields(bundle, sq_distances)[0],
+        "model_version": bundle.version,
+    }
+
+
+@app.websocket("/ws/predict")
+async def live_predict(websocket: WebSocket):
+    """
+    Live scoring untuk slider dashboard: satu koneksi per sesi. Tiap pesan
+    ``{"features": {...}, "seq": n}`` cukup berisi field yang berubah; server
+    menyimpan state fitur terakhir dan langsung membalas cluster, jarak dan
+    membership terbaru. ``{"reset": true}`` mengosongkan state.
+    """
+    # Prioritas sama dengan get_active_bundle: header dulu, lalu query param
+    selector = websocket.headers.get(
+        MODEL_VERSION_HEADER
+    ) or websocket.query_params.get(MODEL_VERSION_PARAM)
+    await websocket.accept()
+    LIVE_SESSIONS.inc()
+    state = {}
+    try:
+        while True:
+            text = await websocket.receive_text()
+            received_at = time.perf_counter()
+            try:
+                message = json.loads(text)
+            except json.JSONDecodeError as e:
+                await websocket.send_json({"error": f"JSON tidak valid: {e.msg}"})
+                continue
+            scored = []
+            with tracing.message_span("WS /ws/predict", websocket.headers, message):
+                reply = _live_update(state, message, selector, scored)
+            await websocket.send_json(reply)
+            latency_ms = (time.perf_counter() - received_at) * 1000
+            for bundle, values, cluster_id in scored:
+                observe_drift(bundle, [values])
+                await audit_log.record_scored(
+                    "predict_ws", bundle, [values], [cluster_id], latency_ms
+                )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        LIVE_SESSIONS.dec()
+
+
+@app.get("/provinces")
+def list_provinces(request: Request):
+    """Semua provinsi di data berlabel beserta cluster & fitur (skala asli)."""
+    bundle = get_active_bundle(request)
+    return cached_json(request, bundle, lambda: get_catalog(bundle).provinces_body)
+
+
+@app.get("/provinces/{name}")
+def get_province(name: str, request: Request):
+    bundle = get_active_bundle(request)
+    province = get_catalog(bundle).province(name)
+    if province is None:
+        raise HTTPException(
+            status_code=404, detail=f"Provinsi '{name}' tidak ditemukan."
+        )
+    return cached_json(
+        request,
+        bundle,
+        lambda: json.dumps({**province, "model_version": bundle.version}).encode(),
+    )
+
+
+@app.get("/clusters/profile")
+def cluster_profile(request: Request):
+    """Jumlah anggota, centroid & rata-rata fitur per cluster + skor kualitas."""
+    bundle = get_active_bundle(request)
+    return cached_json(request, bundle, lambda: get_catalog(bundle).profile_body)
+
+
+@app.get("/clusters/{cluster_id}/members")
+def cluster_members(cluster_id: int, request: Request):
+    bundle = get_active_bundle(request)
+    body = get_catalog(bundle).members_body(cluster_id)
+    if body is None:
+        raise HTTPException(
+            status_code=404, detail=f"Cluster {cluster_id} tidak ditemukan."
+        )
+    return cached_json(request, bundle, lambda: body)
+
+
+def _explanation(bundle, cluster_id, runner_up, contributions):
+    return {
+        "cluster_id": int(cluster_id),
+        "label": bundle.label(int(cluster_id)),
+        "runner_up_cluster_id": int(runner_up),
+        "runner_up_label": bundle.label(int(runner_up)),
+        # Selisih jarak kuadrat runner-up - pemenang (= jumlah kontribusi)
+        "margin": round(float(contributions.sum()), 6),
+    }
+
+
+@app.post("/explain")
+def explain_prediction(features: ProvinceFeatures, request: Request):
+    """
+    Kenapa input masuk cluster ini: kontribusi tiap fitur ke selisih jarak
+    kuadrat (ruang ter-standardisasi) antara runner-up dan cluster pemenang.
+    Positif = fitur mendukung cluster pemenang.
+    """
+    bundle = get_active_bundle(request)
+    feature_names = bundle.engine.feature_names
+    values = [getattr(features, col) for col in feature_names]
+    require_finite(feature_names, values)
+    with stage_timer("explain", "inference"):
+        cluster_ids, runner_up, contrib, to_winner, to_runner_up = explain(
+            bundle.engine, [values]
+        )
+    audit_log.record_scored_threadsafe(
+        "explain", bundle, [values], cluster_ids, elapsed_ms(request)
+    )
+    order = np.argsort(-contrib[0], kind="stable")
+    return {
+        **_explanation(bundle, cluster_ids[0], runner_up[0], contrib[0]),
+        "contributions": [
+            {
+                "feature": feature_names[j],
+                "contribution": round(float(contrib[0, j]), 6),
+                "sq_distance_winner": round(float(to_winner[0, j]), 6),
+                "sq_distance_runner_up": round(float(to_runner_up[0, j]), 6),
+            }
+            for j in order
+        ],
+        "model_version": bundle.version,
+    }
+
+
+@app.post("/explain/batch")
+def explain_batch(payload: BatchPredictRequest, request: Request):
+    """Seperti /explain untuk banyak baris; kontribusi mengikuti ``feature_names``."""
+    bundle = get_active_bundle(request)
+    if len(payload.rows) > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maksimal {MAX_BATCH_ROWS} baris per request batch.",
+        )
+    feature_names = bundle.engine.feature_names
+    results, valid_index, matrix = _validate_rows(payload.rows, feature_names)
+
+    if valid_index:
+        with stage_timer("explain_batch", "inference"):
+            cluster_ids, runner_up, contrib, _, _ = explain(bundle.engine, matrix)
+        audit_log.record_scored_threadsafe(
+            "explain_batch", bundle, matrix, cluster_ids, elapsed_ms(request)
+        )
+        rounded = np.round(contrib, 6).tolist()
+        for k, i in enumerate(valid_index):
+            results[i].update(
+                _explanation(bundle, cluster_ids[k], runner_up[k], contrib[k])
+            )
+            results[i]["contributions"] = rounded[k]
+
+    n_success = len(valid_index)
+    return {
+        "feature_names": list(feature_names),
+        "results": results,
+        "n_success": n_success,
+        "n_failed": len(results) - n_success,
+        "model_version": bundle.version,
+    }
+
+
+async def _db_query(coro):
+    try:
+        return await coro
+    except DatabaseUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Query database gagal: {e}")
+
+
+@app.get("/db/provinces")
+async def db_provinces(
+    cluster_id: Optional[int] = None,
+    province: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=DB_PAGE_MAX),
+):
+    """
+    Baris ``education_features`` + cluster dari Postgres. Filter cluster /
+    nama provinsi (substring); halaman berikutnya: ``after=<next_after>``.
+    """
+    rows = await _db_query(database.list_features(cluster_id, province, after, limit))
+    return {
+        "rows": rows,
+        "limit": limit,
+        "next_after": rows[-1]["provinsi"] if len(rows) == limit else None,
+    }
+
+
+@app.get("/db/clusters/aggregate")
+async def db_cluster_aggregate():
+    """Jumlah provinsi & rata-rata tiap fitur per cluster (dihitung di Postgres)."""
+    rows = await _db_query(database.cluster_aggregates(FEATURE_COLUMNS))
+    return {"clusters": rows}
+
+
+def _peer_results(bundle, pairs):
+    peers = bundle.peers
+    return [
+        {
+            "provinsi": peers.names[pos],
+            "distance": round(distance, 6),
+            "cluster_id": int(peers.cluster_ids[pos]),
+            "label": bundle.label(int(peers.cluster_ids[pos])),
+        }
+        for pos, distance in pairs
+    ]
+
+
+def get_peer_index(bundle):
+    if bundle.peers is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Data berlabel (data_labeled.csv) belum tersedia.",
+        )
+    return bundle.peers
+
+
+@app.get("/similar")
+def similar_provinces(province: str, request: Request, k: int = Query(5, ge=1, le=100)):
+    """Provinsi paling mirip dengan provinsi yang ada di data berlabel."""
+    bundle = get_active_bundle(request)
+    peers = get_peer_index(bundle)
+    position = peers.position(province)
+    if position is None:
+        raise HTTPException(
+            status_code=404, detail=f"Provinsi '{province}' tidak ditemukan."
+        )
+
+    pairs = peers.query(peers.matrix[position], k, exclude=position)
+    return {
+        "provinsi": peers.names[position],
+        "cluster_id": int(peers.cluster_ids[position]),
+        "neighbors": _peer_results(bundle, pairs),
+        "model_version": bundle.version,
+    }
+
+
+@app.post("/similar")
+def similar_to_features(
+    features: ProvinceFeatures, request: Request, k: int = Query(5, ge=1, le=100)
+):
+    """Provinsi paling mirip dengan vektor fitur mentah (belum di-scale)."""
+    bundle = get_active_bundle(request)
+    peers = get_peer_index(bundle)
+    values = [getattr(features, col) for col in bundle.engine.feature_names]
+    require_finite(bundle.engine.feature_names, values)
+    scaled = bundle.engine.transform([values])[0]
+
+    pairs = peers.query(scaled, k)
+    return {
+        "neighbors": _peer_results(bundle, pairs),
+        "model_version": bundle.version,
+    }
+
+
+@app.post("/counterfactual")
+def counterfactual_paths(payload: CounterfactualRequest, request: Request):
+    """
+    Perubahan fitur terkecil (berbobot) agar provinsi masuk ke cluster dengan
+    kesiapan lebih tinggi, dihitung dari centroid model yang sedang aktif.
+    """
+    bundle = get_active_bundle(request)
+    feature_names = bundle.engine.feature_names
+    unknown = [
+        name
+        for name in list(payload.feature_weights) + payload.immutable_features
+        if name not in feature_names
+    ]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Fitur tidak dikenal: {unknown}")
+    if any(w <= 0 for w in payload.feature_weights.values()):
+        raise HTTPException(status_code=422, detail="Bobot fitur harus > 0.")
+
+    values = [getattr(payload.features, col) for col in feature_names]
+    require_finite(feature_names, values)
+    weights = [payload.feature_weights.get(col, 1.0) for col in feature_names]
+    mutable = [col not in payload.immutable_features for col in feature_names]
+    current, paths = find_paths(
+        bundle.engine, bundle.engine.centers, values, weights, mutable
+    )
+
+    return {
+        "current_cluster_id": current,
+        "current_label": bundle.label(current),
+        "paths": [
+            {
+                "target_cluster_id": path["target_cluster_id"],
+                "target_label": bundle.label(path["target_cluster_id"]),
+                "cost": round(path["cost"], 6),
+                "changes": [
+                    {
+                        "feature": feature_names[j],
+                        "from": values[j],
+                        "to": round(float(path["counterfactual"][j]), 6),
+                        "delta": round(float(path["delta"][j]), 6),
+                    }
+                    for j in np.argsort(-np.abs(path["delta"]))
+                    if path["delta"][j] != 0
+                ],
+            }
+            for path in paths
+        ],
+        "model_version": bundle.version,
+    }
+
+
+def _job_response(job, cached=False):
+    public = {k: v for k, v in job.items() if k != "cache_key"}
+    job_id = job["job_id"]
+    public.update(
+        cached=cached,
+        expires_at=(
+            job["finished_at"] + job_manager.ttl if job["finished_at"] else None
+        ),
+        status_url=f"/jobs/{job_id}",
+        result_url=f"/jobs/{job_id}/result" if job["status"] == STATUS_DONE else None,
+    )
+    return public
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: Request,
+    kind: str = "score",
+    id_column: str = "id",
+    n_bootstrap: int = Query(100, ge=1, le=JOB_MAX_BOOTSTRAP),
+):
+    """
+    Job scoring di background untuk dataset besar (CSV / NDJSON). Return job id;
+    pantau lewat GET /jobs/{job_id}, unduh hasil NDJSON di /jobs/{job_id}/result.
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(
+            status_code=422, detail=f"Jenis job harus salah satu dari {JOB_KINDS}."
+        )
+    fmt = detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Gunakan Content-Type text/csv atau application/x-ndjson.",
+        )
+    bundle = get_active_bundle(request)
+
+    digest = hashlib.sha256()
+    body = await spool_request_body(request, digest)
+    params = {"id_column": id_column}
+    if kind == KIND_STABILITY:
+        params["n_bootstrap"] = n_bootstrap
+    job = await job_manager.submit(body, digest.hexdigest(), fmt, bundle, kind, params)
+    return _job_response(job, cached=job["cached"])
+
+
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404, detail=f"Job '{job_id}' tidak ditemukan / kedaluwarsa."
+        )
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _job_response(get_job(job_id))
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = get_job(job_id)
+    if job["status"] != STATUS_DONE:
+        raise HTTPException(
+            status_code=409, detail=f"Job belum selesai (status: {job['status']})."
+        )
+    return FileResponse(
+        job_manager.result_path(job_id),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": job["model_version"]},
+    )
@@ -0,0 +1,159 @@
+"""
+Metrik Prometheus khusus model (di luar metrik HTTP dari Instrumentator).
+
+Semua metrik terdaftar di registry default prometheus_client, jadi otomatis
+ikut ter-expose di ``/metrics`` yang di-scrape ``monitoring/prometheus``.
+"""
+
+import contextlib
+import time
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from . import tracing
+
+STAGE_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.5,
+)
+
+INFERENCE_STAGE_SECONDS = Histogram(
+    "inference_stage_seconds",
+    "Latensi per tahap inference",
+    ["endpoint", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+PREDICTIONS_TOTAL = Counter(
+    "predictions_total",
+    "Jumlah prediksi per cluster yang dilayani",
+    ["cluster_id", "cluster_label"],
+)
+MODEL_AGE_SECONDS = Gauge(
+    "model_age_seconds", "Umur artefak model aktif (sejak file model ditulis)"
+)
+MODEL_LOADED_TIMESTAMP = Gauge(
+    "model_loaded_timestamp_seconds", "Waktu model aktif dimuat (unix epoch)"
+)
+MODEL_INFO = Gauge(
+    "model_artifact_info",
+    "Selalu 1; label berisi hash artefak dan engine model aktif",
+    ["model_version", "engine", "n_clusters"],
+)
+
+LIVE_SESSIONS = Gauge(
+    "live_scoring_sessions", "Koneksi WebSocket live scoring yang sedang terbuka"
+)
+
+_active = {}
+
+
+class RequestStartMiddleware:
+    """
+    ASGI middleware ringan: catat waktu request diterima agar handler bisa
+    mengukur tahap parsing body + validasi pydantic (terjadi sebelum handler).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["received_at"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+def observe_since_received(request, endpoint, stage="request_parse"):
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is not None:
+        observe_stage(endpoint, stage, time.perf_counter() - received_at)
+
+
+def elapsed_ms(request):
+    """Milidetik sejak request diterima (None jika middleware tidak aktif)."""
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is None:
+        return None
+    return (time.perf_counter() - received_at) * 1000
+
+
+def stage_timer(endpoint, stage):
+    """Context manager: ``with stage_timer("predict", "inference"): ...``"""
+    timer = INFERENCE_STAGE_SECONDS.labels(endpoint, stage).time()
+    if not tracing.enabled():
+        return timer
+    return _traced_stage(timer, endpoint, stage)
+
+
+@contextlib.contextmanager
+def _traced_stage(timer, endpoint, stage):
+    # Tahap yang sama juga jadi span anak dari request yang sedang di-trace
+    with tracing.span(f"{endpoint}.{stage}", _stage_attributes(endpoint, stage)):
+        with timer:
+            yield
+
+
+def _stage_attributes(endpoint, stage):
+    return {"inference.endpoint": endpoint, "inference.stage": stage}
+
+
+def observe_stage(endpoint, stage, seconds):
+    INFERENCE_STAGE_SECONDS.labels(endpoint, stage).observe(seconds)
+    if tracing.enabled():
+        tracing.record_span(
+            f"{endpoint}.{stage}", seconds, _stage_attributes(endpoint, stage)
+        )
+
+
+def count_predictions(bundle, cluster_ids):
+    cluster_ids = np.asarray(cluster_ids, dtype=np.int64).ravel()
+    if cluster_ids.size == 0:
+        return
+    counts = np.bincount(cluster_ids, minlength=bundle.engine.n_clusters)
+    for cluster_id in np.flatnonzero(counts):
+        PREDICTIONS_TOTAL.labels(str(cluster_id), bundle.label(int(cluster_id))).inc(
+            int(counts[cluster_id])
+        )
+
+
+def _model_age():
+    bundle = _active.get("bundle")
+    if bundle is None or bundle.trained_at is None:
+        return float("nan")
+    return time.time() - bundle.trained_at
+
+
+MODEL_AGE_SECONDS.set_function(_model_age)
+
+
+def observe_model(bundle):
+    """Dipanggil setiap kali model aktif berganti (startup / hot reload)."""
+    previous = _active.get("bundle")
+    if previous is not None:
+        try:
+            MODEL_INFO.remove(
+                previous.version,
+                previous.engine.name,
+                str(previous.engine.n_clusters),
+            )
+        except KeyError:
+            pass
+    _active["bundle"] = bundle
+    if bundle is None:
+        return
+    MODEL_INFO.labels(
+        bundle.version, bundle.engine.name, str(bundle.engine.n_clusters)
+    ).set(1)
+    MODEL_LOADED_TIMESTAMP.set(bundle.loaded_at.timestamp())
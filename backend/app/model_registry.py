@@ -0,0 +1,241 @@
+"""
+Beberapa versi model sekaligus + shadow scoring.
+
+Model aktif tetap artefak di ``ARTIFACTS_DIR``. Versi lain diletakkan di
+``ARTIFACTS_DIR/versions/<nama>/`` dengan isi yang sama (pickle / .npz,
+scaler, metadata, data berlabel); block ``train_kmeans_clustering`` menyalin
+tiap versi registry MLflow ke sana sebagai ``v<nomor versi>``. Tiap versi
+punya ``ModelStore`` sendiri sehingga ikut hot reload.
+
+Versi yang dilayani bisa dibatasi ``MODEL_VERSIONS`` (daftar nama dipisah koma,
+``SHADOW_MODEL`` selalu ikut); kosong = semua direktori di versions/. Block
+training sendiri hanya menyimpan ``MODEL_VERSIONS_KEEP`` snapshot terbaru.
+
+Request memilih versi lewat header ``X-Model-Version`` atau query
+``model_version`` (nama direktori atau hash ``model_version`` di response).
+Jika ``SHADOW_MODEL`` di-set, traffic ke model aktif juga di-score model
+kandidat itu di background; kesepakatan label keduanya diekspor ke Prometheus.
+"""
+
+import asyncio
+import os
+
+from prometheus_client import Counter, Gauge
+
+from .model_store import MODEL_RELOAD_INTERVAL, ModelStore
+
+MODEL_VERSIONS_DIRNAME = "versions"
+MODEL_VERSION_HEADER = "X-Model-Version"
+MODEL_VERSION_PARAM = "model_version"
+ACTIVE_MODEL_NAME = "active"
+
+# Nama versi kandidat (direktori di versions/); kosong = shadow mode mati
+SHADOW_MODEL = os.getenv("SHADOW_MODEL", "")
+# Allow-list versi yang dimuat (tiap versi = ModelStore + memori sendiri)
+MODEL_VERSIONS = [
+    name.strip() for name in os.getenv("MODEL_VERSIONS", "").split(",") if name.strip()
+]
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+SHADOW_MAX_BATCH = int(os.getenv("SHADOW_MAX_BATCH", "256"))
+
+SHADOW_PREDICTIONS_TOTAL = Counter(
+    "shadow_predictions_total",
+    "Prediksi yang di-score ulang model shadow, per hasil perbandingan label",
+    ["active_version", "shadow_version", "agree"],
+)
+SHADOW_AGREEMENT_RATIO = Gauge(
+    "shadow_agreement_ratio",
+    "Proporsi label model shadow yang sama dengan model aktif (sejak start)",
+    ["active_version", "shadow_version"],
+)
+SHADOW_DROPPED_TOTAL = Counter(
+    "shadow_dropped_total", "Request shadow yang dibuang karena antrean penuh"
+)
+SHADOW_ERRORS_TOTAL = Counter(
+    "shadow_errors_total", "Batch shadow yang gagal di-score model kandidat"
+)
+
+
+class ModelRegistry:
+    def __init__(self, active_store, versions_dir=None, allowed=MODEL_VERSIONS):
+        self.active = active_store
+        self._versions_dir = versions_dir
+        # Kosong = semua versi; shadow selalu dimuat agar bisa di-score
+        self.allowed = set(allowed)
+        if self.allowed and SHADOW_MODEL:
+            self.allowed.add(SHADOW_MODEL)
+        self._stores = {}
+
+    @property
+    def versions_dir(self):
+        # Default mengikuti direktori model aktif (bisa diganti saat runtime)
+        return self._versions_dir or os.path.join(
+            self.active.artifacts_dir, MODEL_VERSIONS_DIRNAME
+        )
+
+    @property
+    def names(self):
+        return sorted(self._stores)
+
+    def discover(self):
+        """Muat versi baru di versions/ dan lepas versi yang direktorinya hilang."""
+        try:
+            found = {
+                entry.name
+                for entry in os.scandir(self.versions_dir)
+                if entry.is_dir() and not entry.name.startswith(".")
+            }
+        except FileNotFoundError:
+            found = set()
+        if self.allowed:
+            found &= self.allowed
+
+        for name in set(self._stores) - found:
+            self._stores.pop(name).clear()
+        for name in sorted(found - set(self._stores)):
+            store = ModelStore(
+                self.active.default_feature_names,
+                artifacts_dir=os.path.join(self.versions_dir, name),
+                shared=self.active.shared,
+                publish_metrics=False,
+            )
+            if store.reload_if_changed(force=True):
+                self._stores[name] = store
+
+    def refresh(self, force=False):
+        """Dipanggil dari thread watcher: reload model aktif + semua versi."""
+        self.active.reload_if_changed(force=force)
+        self.discover()
+        for store in list(self._stores.values()):
+            store.reload_if_changed()
+
+    def resolve(self, selector=None):
+        """Bundle untuk nama versi / hash; None jika tidak ditemukan."""
+        if not selector or selector == ACTIVE_MODEL_NAME:
+            return self.active.current
+        store = self._stores.get(selector)
+        if store is not None:
+            return store.current
+        for bundle in [self.active.current] + [
+            s.current for s in self._stores.values()
+        ]:
+            if bundle is not None and bundle.version == selector:
+                return bundle
+        return None
+
+    def versions(self):
+        """Hash versi semua bundle yang sedang dimuat (aktif + versions/)."""
+        bundles = [self.active.current] + [s.current for s in self._stores.values()]
+        return {bundle.version for bundle in bundles if bundle is not None}
+
+    def describe(self):
+        versions = {}
+        for name, store in sorted(self._stores.items()):
+            bundle = store.current
+            versions[name] = bundle.info() if bundle is not None else None
+        return versions
+
+    def clear(self):
+        for store in self._stores.values():
+            store.clear()
+        self._stores = {}
+
+    async def watch(self, interval=MODEL_RELOAD_INTERVAL, on_refresh=None):
+        """``on_refresh(versions)`` dipanggil setelah tiap polling."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+                if on_refresh is not None:
+                    on_refresh(self.versions())
+            except Exception as e:
+                print(f"❌ Model registry watcher error: {e}")
+
+
+class ShadowScorer:
+    """
+    Antrean terbatas + satu task background. ``submit`` tidak pernah menunggu
+    (aman dipanggil dari handler async maupun threadpool); jika antrean penuh,
+    item dibuang dan dihitung di ``shadow_dropped_total``.
+
+    Cluster id antar model tidak sebanding (urutan centroid bisa tertukar),
+    jadi yang dibandingkan adalah label readiness dari metadata masing-masing.
+    """
+
+    def __init__(self, registry, shadow_name, queue_size=SHADOW_QUEUE_SIZE):
+        self.registry = registry
+        self.shadow_name = shadow_name
+        self.queue_size = queue_size
+        self._queue = None
+        self._loop = None
+        self._task = None
+        self._totals = {}
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def submit(self, bundle, matrix, cluster_ids):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._put, (bundle, matrix, cluster_ids))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            SHADOW_DROPPED_TOTAL.inc()
+
+    async def _run(self):
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < SHADOW_MAX_BATCH and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self.score, items)
+            except Exception as e:
+                SHADOW_ERRORS_TOTAL.inc()
+                print(f"⚠️ Warning: shadow scoring gagal: {e}")
+
+    def score(self, items):
+        shadow = self.registry.resolve(self.shadow_name)
+        if shadow is None:
+            return
+        for active, matrix, cluster_ids in items:
+            if active.version == shadow.version:
+                continue
+            # Urutan fitur model kandidat bisa berbeda dari model aktif
+            columns = [
+                active.engine.feature_names.index(name)
+                for name in shadow.engine.feature_names
+            ]
+            shadow_ids = shadow.engine.predict(matrix[:, columns])
+            agree = sum(
+                active.label(int(a)) == shadow.label(int(s))
+                for a, s in zip(cluster_ids, shadow_ids)
+            )
+            self.record(active.version, shadow.version, agree, len(shadow_ids))
+
+    def record(self, active_version, shadow_version, agree, total):
+        SHADOW_PREDICTIONS_TOTAL.labels(active_version, shadow_version, "true").inc(
+            agree
+        )
+        SHADOW_PREDICTIONS_TOTAL.labels(active_version, shadow_version, "false").inc(
+            total - agree
+        )
+        key = (active_version, shadow_version)
+        seen_agree, seen_total = self._totals.get(key, (0, 0))
+        seen_agree, seen_total = seen_agree + agree, seen_total + total
+        self._totals[key] = (seen_agree, seen_total)
+        if seen_total:
+            SHADOW_AGREEMENT_RATIO.labels(*key).set(seen_agree / seen_total)
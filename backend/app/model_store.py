@@ -0,0 +1,462 @@
+"""
+Penyimpanan model aktif + hot reload artefak dari shared volume.
+
+Artefak ditulis oleh pipeline Mage (``transform_standardize`` dan
+``train_kmeans_clustering``) ke ``ARTIFACTS_DIR``. Watcher mem-poll mtime/size
+file; jika berubah dan sudah stabil, pasangan scaler+KMeans dimuat dan
+divalidasi di thread terpisah, lalu ditukar dalam satu assignment. Request
+selalu mengambil satu snapshot ``ModelBundle`` sehingga tidak pernah melihat
+pasangan model yang setengah termuat.
+
+Selain pickle, block training juga menulis ``kmeans_model.npz`` (mean/scale
+scaler, centroid, urutan fitur, label cluster). Format ini dimuat hanya dengan
+numpy, jadi startup tidak perlu meng-import joblib / sklearn / pandas.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import shared_arrays
+from .catalog import build_catalog
+from .engine import ENGINE_SKLEARN, FusedKMeansEngine, SklearnEngine, build_engine
+from .metrics import observe_model
+from .similarity import LABELED_DATA_FILENAME, PeerIndex
+
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "/app/artifacts")
+MODEL_FILENAME = "kmeans_model.pkl"
+SCALER_FILENAME = "standard_scaler.pkl"
+NUMPY_MODEL_FILENAME = "kmeans_model.npz"
+METADATA_FILENAME = "cluster_metadata.json"
+
+FORMAT_AUTO = "auto"
+FORMAT_NUMPY = "npz"
+FORMAT_PICKLE = "pickle"
+# auto = pakai .npz jika ada dan tidak lebih lama dari pickle
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", FORMAT_AUTO).lower()
+# Artefak opsional: ikut menentukan versi, tapi model tetap bisa jalan tanpanya
+OPTIONAL_FILENAMES = (METADATA_FILENAME, LABELED_DATA_FILENAME)
+
+# Interval polling watcher (detik). 0 = hot reload dimatikan.
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "10"))
+
+
+class ModelBundle:
+    """Snapshot immutable dari satu versi model yang siap dipakai."""
+
+    def __init__(
+        self,
+        kmeans,
+        scaler,
+        engine,
+        version,
+        artifacts_dir,
+        labels=None,
+        peers=None,
+        trained_at=None,
+        model_format=FORMAT_PICKLE,
+        shared_path=None,
+    ):
+        self.kmeans = kmeans
+        self.scaler = scaler
+        self.engine = engine
+        self.version = version
+        self.artifacts_dir = artifacts_dir
+        self.labels = labels or [
+            fallback_cluster_label(i) for i in range(engine.n_clusters)
+        ]
+        self.peers = peers
+        # Epoch saat file model ditulis pipeline (untuk metrik umur model)
+        self.trained_at = trained_at
+        self.model_format = model_format
+        # Direktori array mmap bersama antar worker (None = salinan privat)
+        self.shared_path = shared_path
+        # Index read API (/provinces, /clusters/...), dibangun di load_bundle
+        self.catalog = None
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def label(self, cluster_id):
+        if 0 <= cluster_id < len(self.labels):
+            return self.labels[cluster_id]
+        return "Unknown"
+
+    def info(self):
+        return {
+            "model_version": self.version,
+            "engine": self.engine.name,
+            "model_format": self.model_format,
+            "n_clusters": self.engine.n_clusters,
+            "n_features": len(self.engine.feature_names),
+            "cluster_labels": self.labels,
+            "n_reference_rows": len(self.peers) if self.peers is not None else 0,
+            "shared_arrays": self.shared_path is not None,
+            "loaded_at": self.loaded_at.isoformat(),
+        }
+
+
+def fallback_cluster_label(cluster_id):
+    # Dipakai hanya jika cluster_metadata.json tidak ada / tidak cocok dengan model
+    # (interpretasi awal dari cluster centers saat training pertama)
+    mapping = {
+        1: "Tinggi (High Readiness)",
+        2: "Sedang (Medium Readiness)",
+        0: "Rendah (Low Readiness)",
+    }
+    return mapping.get(cluster_id, "Unknown")
+
+
+def load_cluster_labels(metadata_path, centers):
+    """
+    Label per cluster dari ``cluster_mapping`` di metadata training. Metadata
+    hanya dipakai jika centroid-nya sama dengan model yang dimuat, supaya label
+    dari run training lain tidak tertukar.
+    """
+    if not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    mapping = metadata.get("cluster_mapping") or {}
+    stats = metadata.get("cluster_statistics") or {}
+    if int(metadata.get("n_clusters", -1)) != len(centers):
+        print("⚠️ Warning: cluster_metadata.json tidak cocok dengan model (n_clusters)")
+        return None
+    for cluster_id, center in enumerate(centers):
+        centroid = (stats.get(str(cluster_id)) or {}).get("centroid")
+        if centroid is not None and not np.allclose(centroid, center, atol=1e-6):
+            print("⚠️ Warning: cluster_metadata.json berasal dari model lain")
+            return None
+    return [mapping.get(str(i), f"Cluster {i}") for i in range(len(centers))]
+
+
+def artifact_paths(artifacts_dir):
+    return (
+        os.path.join(artifacts_dir, MODEL_FILENAME),
+        os.path.join(artifacts_dir, SCALER_FILENAME),
+    )
+
+
+def resolve_model_format(artifacts_dir, requested=None):
+    """
+    ``npz`` / ``pickle`` sesuai env ``MODEL_FORMAT``. Mode ``auto`` memilih
+    ``.npz`` jika ada dan tidak lebih lama dari pickle (pipeline menulis pickle
+    lebih dulu), kecuali engine sklearn diminta (butuh objek sklearn asli).
+    """
+    requested = (requested or MODEL_FORMAT).lower()
+    if requested in (FORMAT_NUMPY, FORMAT_PICKLE):
+        return requested
+    if requested != FORMAT_AUTO:
+        raise ValueError(f"MODEL_FORMAT tidak dikenal: {requested}")
+    if os.getenv("INFERENCE_ENGINE", "").lower() == ENGINE_SKLEARN:
+        return FORMAT_PICKLE
+    try:
+        npz_mtime = os.stat(os.path.join(artifacts_dir, NUMPY_MODEL_FILENAME)).st_mtime
+    except FileNotFoundError:
+        return FORMAT_PICKLE
+    try:
+        model_mtime = os.stat(os.path.join(artifacts_dir, MODEL_FILENAME)).st_mtime
+    except FileNotFoundError:
+        return FORMAT_NUMPY
+    return FORMAT_NUMPY if npz_mtime >= model_mtime else FORMAT_PICKLE
+
+
+def model_paths(artifacts_dir, model_format):
+    if model_format == FORMAT_NUMPY:
+        return (os.path.join(artifacts_dir, NUMPY_MODEL_FILENAME),)
+    return artifact_paths(artifacts_dir)
+
+
+def artifact_fingerprint(artifacts_dir, require_order=True, model_format=None):
+    """
+    (mtime_ns, size) tiap artefak; None jika belum lengkap.
+
+    Pipeline menulis scaler (transform_standardize) sebelum model
+    (train_kmeans_clustering). Scaler yang lebih baru dari model berarti
+    training sedang berjalan, jadi pasangan itu belum boleh dimuat.
+    """
+    model_format = model_format or resolve_model_format(artifacts_dir)
+    try:
+        stats = [os.stat(p) for p in model_paths(artifacts_dir, model_format)]
+    except FileNotFoundError:
+        return None
+    if model_format == FORMAT_PICKLE:
+        model_stat, scaler_stat = stats
+        if require_order and scaler_stat.st_mtime_ns > model_stat.st_mtime_ns:
+            return None
+    # Artefak opsional (label, data berlabel) juga harus terdeteksi perubahannya
+    optional = []
+    for filename in OPTIONAL_FILENAMES:
+        try:
+            st = os.stat(os.path.join(artifacts_dir, filename))
+            optional.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            optional.append(None)
+    return (
+        model_format,
+        *[(st.st_mtime_ns, st.st_size) for st in stats],
+        *optional,
+    )
+
+
+def content_version(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def validate_bundle(bundle):
+    kmeans, scaler, engine = bundle.kmeans, bundle.scaler, bundle.engine
+    n_features = engine.centers.shape[1]
+    if (
+        scaler is not None
+        and getattr(scaler, "n_features_in_", n_features) != n_features
+    ):
+        raise ValueError(
+            f"Scaler ({scaler.n_features_in_} fitur) tidak cocok dengan "
+            f"KMeans ({n_features} fitur)"
+        )
+    if not (np.isfinite(engine.scale).all() and (engine.scale > 0).all()):
+        raise ValueError("Scale scaler harus positif dan finite")
+
+    # Probe: centroid di ruang data mentah harus diprediksi ke cluster-nya sendiri,
+    # dan engine aktif harus sepakat dengan jalur referensi sklearn (jika ada).
+    probes = engine.mean + engine.scale * engine.centers
+    if not np.isfinite(probes).all():
+        raise ValueError("Centroid model mengandung NaN/Inf")
+    probes = np.vstack([probes, probes.mean(axis=0, keepdims=True)])
+    labels = engine.predict(probes)
+    if not np.array_equal(labels[:-1], np.arange(len(probes) - 1)):
+        raise ValueError("Centroid tidak terprediksi ke cluster-nya sendiri")
+    if kmeans is not None and scaler is not None:
+        reference = SklearnEngine(kmeans, scaler, engine.feature_names)
+        if not np.array_equal(labels, reference.predict(probes)):
+            raise ValueError("Engine tidak konsisten dengan jalur sklearn")
+
+
+def export_numpy_artifact(artifacts_dir, default_feature_names=()):
+    """
+    Tulis ``kmeans_model.npz`` dari pasangan pickle yang ada (format sama
+    dengan yang ditulis block ``train_kmeans_clustering``). Berguna untuk
+    artefak lama yang dibuat sebelum block training mengekspor .npz.
+    """
+    metadata_path = os.path.join(artifacts_dir, METADATA_FILENAME)
+    _, _, engine, labels = _load_pickle(
+        artifacts_dir, default_feature_names, metadata_path
+    )
+    path = os.path.join(artifacts_dir, NUMPY_MODEL_FILENAME)
+    arrays = {
+        "mean": engine.mean,
+        "scale": engine.scale,
+        "centers": engine.centers,
+        "feature_names": np.array(engine.feature_names, dtype=str),
+    }
+    if labels is not None:
+        arrays["cluster_labels"] = np.array(labels, dtype=str)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _load_pickle(artifacts_dir, default_feature_names, metadata_path):
+    import joblib
+
+    model_path, scaler_path = artifact_paths(artifacts_dir)
+    kmeans = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    engine = build_engine(kmeans, scaler, default_feature_names)
+    labels = load_cluster_labels(metadata_path, engine.centers)
+    return kmeans, scaler, engine, labels
+
+
+def _load_numpy(artifacts_dir, metadata_path):
+    if os.getenv("INFERENCE_ENGINE", "").lower() == ENGINE_SKLEARN:
+        raise ValueError("INFERENCE_ENGINE=sklearn butuh MODEL_FORMAT=pickle")
+    path = os.path.join(artifacts_dir, NUMPY_MODEL_FILENAME)
+    with np.load(path, allow_pickle=False) as data:
+        engine = FusedKMeansEngine(
+            data["centers"],
+            data["mean"],
+            data["scale"],
+            [str(name) for name in data["feature_names"]],
+        )
+        labels = None
+        if "cluster_labels" in data.files:
+            labels = [str(label) for label in data["cluster_labels"]]
+    if labels is None or len(labels) != engine.n_clusters:
+        labels = load_cluster_labels(metadata_path, engine.centers)
+    return engine, labels
+
+
+def share_arrays(artifacts_dir, version, engine, peers):
+    """
+    Publikasikan array engine + data referensi sekali per versi lalu ganti
+    dengan versi mmap read-only. Return (peers, path direktori bersama).
+    """
+    arrays = {}
+    if isinstance(engine, FusedKMeansEngine):
+        arrays.update({f"engine_{k}": v for k, v in engine.arrays().items()})
+    if peers is not None:
+        arrays["peer_matrix"] = peers.matrix
+        arrays["peer_cluster_ids"] = peers.cluster_ids
+    if not arrays:
+        return peers, None
+
+    meta = {"peer_names": peers.names if peers is not None else []}
+    path, mapped, meta = shared_arrays.publish_and_attach(
+        artifacts_dir, version, arrays, meta
+    )
+    if isinstance(engine, FusedKMeansEngine):
+        engine.use_arrays(
+            {name: mapped[f"engine_{name}"] for name in engine.ARRAY_FIELDS}
+        )
+    if peers is not None:
+        peers = PeerIndex(
+            meta["peer_names"],
+            mapped["peer_matrix"],
+            mapped["peer_cluster_ids"],
+            leaf_size=peers.leaf_size,
+        )
+    return peers, path
+
+
+def load_bundle(artifacts_dir, default_feature_names, model_format=None, shared=None):
+    model_format = model_format or resolve_model_format(artifacts_dir)
+    metadata_path = os.path.join(artifacts_dir, METADATA_FILENAME)
+    labeled_path = os.path.join(artifacts_dir, LABELED_DATA_FILENAME)
+    paths = list(model_paths(artifacts_dir, model_format))
+    paths += [p for p in (metadata_path, labeled_path) if os.path.exists(p)]
+    version = content_version(paths)
+    if model_format == FORMAT_NUMPY:
+        kmeans = scaler = None
+        engine, labels = _load_numpy(artifacts_dir, metadata_path)
+    else:
+        kmeans, scaler, engine, labels = _load_pickle(
+            artifacts_dir, default_feature_names, metadata_path
+        )
+
+    peers = None
+    if os.path.exists(labeled_path):
+        try:
+            peers = PeerIndex.from_csv(labeled_path, engine.feature_names, engine)
+        except Exception as e:
+            # Index peer opsional: model tetap dipasang walau data berlabel rusak
+            print(f"⚠️ Warning: peer index tidak dibangun: {e}")
+
+    shared_path = None
+    if shared_arrays.SHARED_MODEL_ARRAYS if shared is None else shared:
+        try:
+            peers, shared_path = share_arrays(artifacts_dir, version, engine, peers)
+        except (OSError, ValueError) as e:
+            # Tetap jalan dengan salinan privat (mis. volume read-only)
+            print(f"⚠️ Warning: shared arrays tidak dipakai: {e}")
+
+    bundle = ModelBundle(
+        kmeans,
+        scaler,
+        engine,
+        version,
+        artifacts_dir,
+        labels,
+        peers,
+        trained_at=os.stat(paths[0]).st_mtime,
+        model_format=model_format,
+        shared_path=shared_path,
+    )
+    validate_bundle(bundle)
+    try:
+        bundle.catalog = build_catalog(bundle, metadata_path)
+    except Exception as e:
+        print(f"⚠️ Warning: index read API tidak dibangun: {e}")
+    return bundle
+
+
+class ModelStore:
+    def __init__(
+        self,
+        default_feature_names,
+        artifacts_dir=ARTIFACTS_DIR,
+        shared=None,
+        publish_metrics=True,
+    ):
+        self.default_feature_names = list(default_feature_names)
+        self.artifacts_dir = artifacts_dir
+        self.shared = shared
+        # Hanya model aktif yang mengisi gauge model_* (versi lain lewat /models)
+        self.publish_metrics = publish_metrics
+        self._bundle = None
+        self._fingerprint = None
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        # Satu baca atribut = satu snapshot konsisten (swap dilakukan atomik)
+        return self._bundle
+
+    def set_bundle(self, bundle):
+        self._bundle = bundle
+        if self.publish_metrics:
+            observe_model(bundle)
+
+    def clear(self):
+        self._bundle = None
+        if self.publish_metrics:
+            observe_model(None)
+        self._fingerprint = None
+        self._pending = None
+
+    def reload_if_changed(self, force=False):
+        """
+        Dipanggil dari thread watcher. Return True jika model baru dipasang.
+        Perubahan baru diproses setelah fingerprint stabil di dua polling
+        berturut-turut, supaya file yang sedang ditulis tidak ikut termuat.
+        """
+        with self._lock:
+            # Saat startup (force) urutan mtime diabaikan: tidak ada model lain
+            fingerprint = artifact_fingerprint(
+                self.artifacts_dir, require_order=not force
+            )
+            if fingerprint is None:
+                if force:
+                    print(
+                        "⚠️ Warning: Model artifacts not found. "
+                        "Please run Mage pipeline first."
+                    )
+                return False
+            if fingerprint == self._fingerprint and not force:
+                return False
+            if not force and fingerprint != self._pending:
+                self._pending = fingerprint
+                return False
+
+            self._pending = None
+            self._fingerprint = fingerprint
+            try:
+                bundle = load_bundle(
+                    self.artifacts_dir,
+                    self.default_feature_names,
+                    model_format=fingerprint[0],
+                    shared=self.shared,
+                )
+            except Exception as e:
+                # Model lama tetap dipakai; fingerprint diingat agar tidak retry terus
+                print(f"❌ Error loading models: {e}")
+                return False
+
+            current = self._bundle
+            if current is not None and current.version == bundle.version:
+                return False
+            self.set_bundle(bundle)
+            print(
+                f"✅ Model {bundle.version} loaded from {self.artifacts_dir} "
+                f"(engine: {bundle.engine.name}, format: {bundle.model_format})"
+            )
+            return True
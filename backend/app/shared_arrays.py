@@ -0,0 +1,98 @@
+"""
+Array model + data referensi yang dipakai bersama oleh semua worker.
+
+Dengan beberapa worker uvicorn/gunicorn, tiap proses biasanya punya salinan
+sendiri. Jika ``SHARED_MODEL_ARRAYS=1``, array dipublikasikan sekali per versi
+artefak sebagai file ``.npy`` di ``<ARTIFACTS_DIR>/.shared/<versi>/``, lalu
+setiap worker memetakannya read-only (``np.load(mmap_mode="r")``). Page cache
+OS dibagi antar proses, jadi memori hampir tidak bertambah per worker.
+
+Publikasi atomik: ditulis ke direktori sementara lalu di-rename. Jika worker
+lain lebih dulu mem-publish versi yang sama, hasil milik worker itu yang
+dipakai. Versi lama dihapus; mapping yang masih aktif tetap valid (POSIX).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+SHARED_MODEL_ARRAYS = os.getenv("SHARED_MODEL_ARRAYS", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SHARED_DIRNAME = ".shared"
+# Jumlah versi yang disimpan (versi sebelumnya bisa masih dipakai worker lain)
+SHARED_KEEP_VERSIONS = int(os.getenv("SHARED_KEEP_VERSIONS", "2"))
+META_FILENAME = "meta.json"
+
+
+def shared_root(artifacts_dir):
+    return os.path.join(artifacts_dir, SHARED_DIRNAME)
+
+
+def publish(artifacts_dir, version, arrays, meta=None):
+    """Tulis ``arrays`` (dict nama -> ndarray) untuk ``version`` jika belum ada."""
+    root = shared_root(artifacts_dir)
+    target = os.path.join(root, version)
+    if os.path.exists(os.path.join(target, META_FILENAME)):
+        return target
+
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=root)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        # meta.json ditulis terakhir: penanda publikasi lengkap
+        with open(os.path.join(tmp_dir, META_FILENAME), "w") as f:
+            json.dump({"version": version, "arrays": sorted(arrays), **(meta or {})}, f)
+        os.rename(tmp_dir, target)
+    except OSError:
+        # Worker lain sudah mem-publish versi ini lebih dulu
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(target, META_FILENAME)):
+            raise
+    prune(artifacts_dir, keep=version)
+    return target
+
+
+def attach(artifacts_dir, version):
+    """Map read-only semua array milik ``version``. Return (arrays, meta)."""
+    target = os.path.join(shared_root(artifacts_dir), version)
+    with open(os.path.join(target, META_FILENAME)) as f:
+        meta = json.load(f)
+    if meta.get("version") != version:
+        raise ValueError(f"Shared arrays {target} bukan versi {version}")
+    arrays = {
+        name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r")
+        for name in meta["arrays"]
+    }
+    return arrays, meta
+
+
+def publish_and_attach(artifacts_dir, version, arrays, meta=None):
+    """Return (path, arrays mmap, meta)."""
+    try:
+        path = publish(artifacts_dir, version, arrays, meta)
+        return (path, *attach(artifacts_dir, version))
+    except FileNotFoundError:
+        # Versi baru saja di-prune worker lain di antara publish dan attach
+        path = publish(artifacts_dir, version, arrays, meta)
+        return (path, *attach(artifacts_dir, version))
+
+
+def prune(artifacts_dir, keep, max_versions=None):
+    max_versions = SHARED_KEEP_VERSIONS if max_versions is None else max_versions
+    root = shared_root(artifacts_dir)
+    versions = [
+        entry
+        for entry in os.scandir(root)
+        if entry.is_dir() and not entry.name.startswith(".")
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in versions[max(max_versions, 1) :]:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
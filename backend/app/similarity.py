@@ -0,0 +1,74 @@
+"""
+Index provinsi "paling mirip" di ruang fitur ter-standardisasi.
+
+Dibangun sekali per versi artefak dari ``data_labeled.csv`` (output block
+``train_kmeans_clustering`` yang fiturnya sudah di-scale), memakai BallTree
+sehingga query k tetangga terdekat tidak perlu scan seluruh data. CSV dibaca
+dengan modul ``csv`` dan BallTree baru dibangun saat query pertama, supaya
+startup backend tidak perlu meng-import pandas / sklearn.
+"""
+
+import csv
+import threading
+
+import numpy as np
+
+LABELED_DATA_FILENAME = "data_labeled.csv"
+
+
+class PeerIndex:
+    def __init__(self, names, scaled_matrix, cluster_ids, leaf_size=16):
+        self.names = list(names)
+        self.matrix = np.ascontiguousarray(scaled_matrix, dtype=np.float64)
+        self.cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        self.leaf_size = leaf_size
+        self._tree = None
+        self._tree_lock = threading.Lock()
+        self._positions = {name.strip().lower(): i for i, name in enumerate(names)}
+
+    @classmethod
+    def from_csv(cls, path, feature_names, engine, name_column="provinsi"):
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            rows = list(reader)
+        columns = {name: i for i, name in enumerate(header)}
+        missing = [c for c in list(feature_names) + [name_column] if c not in columns]
+        if missing:
+            raise ValueError(f"Kolom {LABELED_DATA_FILENAME} tidak lengkap: {missing}")
+        indices = [columns[name] for name in feature_names]
+        scaled = np.array(
+            [[float(row[i]) for i in indices] for row in rows], dtype=np.float64
+        ).reshape(len(rows), len(indices))
+        names = [row[columns[name_column]] for row in rows]
+        # Cluster dihitung ulang dengan model aktif agar selalu konsisten
+        cluster_ids = engine.predict_scaled(scaled)
+        return cls(names, scaled, cluster_ids)
+
+    def _get_tree(self):
+        if self._tree is None:
+            with self._tree_lock:
+                if self._tree is None:
+                    from sklearn.neighbors import BallTree
+
+                    self._tree = BallTree(self.matrix, leaf_size=self.leaf_size)
+        return self._tree
+
+    def __len__(self):
+        return len(self.names)
+
+    def position(self, name):
+        return self._positions.get(name.strip().lower())
+
+    def query(self, scaled_vector, k, exclude=None):
+        """Return list (posisi, jarak) untuk k tetangga terdekat."""
+        n_query = min(k + (exclude is not None), len(self))
+        distances, positions = self._get_tree().query(
+            np.asarray(scaled_vector, dtype=np.float64).reshape(1, -1), k=n_query
+        )
+        pairs = [
+            (int(pos), float(dist))
+            for pos, dist in zip(positions[0], distances[0])
+            if pos != exclude
+        ]
+        return pairs[:k]
@@ -0,0 +1,189 @@
+"""
+Parsing + scoring bertahap untuk upload besar (CSV / NDJSON).
+
+Body request di-spool ke ``SpooledTemporaryFile`` (pindah ke disk jika besar),
+lalu dibaca ulang per ``chunk_rows`` baris. Tiap chunk di-score sekali secara
+vektor dan hasilnya dikirim sebagai NDJSON, sehingga memori tidak bergantung
+pada ukuran input.
+"""
+
+import codecs
+import csv
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .metrics import count_predictions, stage_timer
+
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+# Body <= batas ini disimpan di memori, sisanya di file sementara
+STREAM_SPOOL_BYTES = int(os.getenv("STREAM_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+CONTENT_TYPES = {
+    "text/csv": FORMAT_CSV,
+    "application/csv": FORMAT_CSV,
+    "application/x-ndjson": FORMAT_NDJSON,
+    "application/ndjson": FORMAT_NDJSON,
+    "application/jsonl": FORMAT_NDJSON,
+}
+
+
+def detect_format(content_type):
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPES.get(media_type)
+
+
+async def spool_request_body(request, digest=None):
+    """``digest``: objek hashlib opsional, di-update dengan seluruh isi body."""
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+    spool.seek(0)
+    return spool
+
+
+def _to_float(value):
+    if value is None or value == "":
+        raise ValueError("nilai kosong")
+    return float(value)
+
+
+def _iter_csv_records(text, feature_names, id_column, index_offset=0):
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [h.strip() for h in header]
+    missing = [name for name in feature_names if name not in header]
+    if missing:
+        raise ValueError(f"Kolom CSV tidak lengkap: {missing}")
+    positions = [header.index(name) for name in feature_names]
+    id_pos = header.index(id_column) if id_column in header else None
+
+    for index, row in enumerate(reader, start=index_offset):
+        row_id = row[id_pos] if id_pos is not None and id_pos < len(row) else index
+        try:
+            values = [_to_float(row[pos]) for pos in positions]
+        except (IndexError, ValueError) as e:
+            yield index, row_id, None, f"Baris tidak valid: {e}"
+            continue
+        yield index, row_id, values, None
+
+
+def _iter_ndjson_records(text, feature_names, id_column, index_offset=0):
+    index = index_offset
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            row_id = record.get(id_column, index)
+            values = [_to_float(record[name]) for name in feature_names]
+        except json.JSONDecodeError as e:
+            yield index, index, None, f"JSON tidak valid: {e.msg}"
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            row_id = record.get(id_column, index) if isinstance(record, dict) else index
+            yield index, row_id, None, f"Baris tidak valid: {e!r}"
+        else:
+            yield index, row_id, values, None
+        index += 1
+
+
+def iter_record_chunks(
+    fileobj, fmt, feature_names, id_column, chunk_rows, index_offset=0
+):
+    # codecs reader: SpooledTemporaryFile di Python 3.9 belum bisa dibungkus TextIOWrapper
+    text = codecs.getreader("utf-8")(fileobj)
+    if fmt == FORMAT_CSV:
+        records = _iter_csv_records(text, feature_names, id_column, index_offset)
+    else:
+        records = _iter_ndjson_records(text, feature_names, id_column, index_offset)
+
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_chunk(engine, chunk, label_fn):
+    """Score satu chunk sekaligus; return list hasil sesuai urutan input."""
+    results = [
+        (
+            {"index": index, "id": row_id}
+            if error is None
+            else {"index": index, "id": row_id, "error": error}
+        )
+        for index, row_id, _, error in chunk
+    ]
+    positions = [pos for pos, record in enumerate(chunk) if record[3] is None]
+    if not positions:
+        return results
+
+    matrix = np.asarray([chunk[pos][2] for pos in positions], dtype=np.float64)
+    finite = np.isfinite(matrix).all(axis=1)
+    cluster_ids = engine.predict(matrix[finite]) if finite.any() else []
+
+    scored = iter(cluster_ids)
+    for pos, ok in zip(positions, finite):
+        if not ok:
+            results[pos]["error"] = "Nilai fitur harus finite"
+            continue
+        cluster_id = int(next(scored))
+        results[pos]["cluster_id"] = cluster_id
+        results[pos]["label"] = label_fn(cluster_id)
+    return results
+
+
+def scored_rows(chunk, results):
+    """(matriks fitur, cluster_id) untuk baris yang berhasil di-score."""
+    pairs = [
+        (record[2], result["cluster_id"])
+        for record, result in zip(chunk, results)
+        if "cluster_id" in result
+    ]
+    matrix = np.asarray([values for values, _ in pairs], dtype=np.float64)
+    return matrix, np.asarray([cluster_id for _, cluster_id in pairs], dtype=np.int64)
+
+
+def iter_ndjson_predictions(
+    fileobj,
+    fmt,
+    bundle,
+    label_fn,
+    id_column="id",
+    chunk_rows=STREAM_CHUNK_ROWS,
+    on_scored=None,
+):
+    """
+    Generator sync (dijalankan StreamingResponse di threadpool).
+    ``on_scored(matrix, cluster_ids)`` dipanggil per chunk (mis. audit log).
+    """
+    try:
+        chunks = iter_record_chunks(
+            fileobj, fmt, bundle.engine.feature_names, id_column, chunk_rows
+        )
+        for chunk in chunks:
+            with stage_timer("predict_stream", "inference"):
+                results = score_chunk(bundle.engine, chunk, label_fn)
+            matrix, cluster_ids = scored_rows(chunk, results)
+            count_predictions(bundle, cluster_ids)
+            if on_scored is not None and len(cluster_ids):
+                on_scored(matrix, cluster_ids)
+            lines = [json.dumps(result, default=str) for result in results]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+    except ValueError as e:
+        # Error struktural (mis. header CSV kurang) dikirim sebagai baris terakhir
+        yield (json.dumps({"error": str(e)}) + "\n").encode("utf-8")
+    finally:
+        fileobj.close()
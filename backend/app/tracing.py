@@ -0,0 +1,221 @@
+"""
+Tracing request end-to-end (OpenTelemetry, opsional).
+
+Frontend Streamlit mengirim header W3C ``traceparent`` saat memanggil backend;
+``TracingMiddleware`` melanjutkan trace itu sebagai span server, dan setiap
+``stage_timer`` / ``observe_stage`` di ``metrics`` menjadi span anak per tahap
+inference. Jadi satu interaksi dashboard yang lambat bisa diurai: render
+Streamlit -> HTTP -> parsing -> inference -> serialize. Untuk ``/ws/predict``
+konteks trace dikirim sebagai field ``traceparent`` di tiap pesan, lalu
+``message_span`` menjadikannya parent span per pesan.
+
+Export span (tanpa SaaS):
+- ``TRACE_FILE``: satu baris JSON OTLP per batch span (format yang sama dengan
+  receiver ``otlpjsonfile`` / exporter ``file`` OpenTelemetry Collector).
+- ``OTEL_EXPORTER_OTLP_ENDPOINT``: kirim OTLP/HTTP ke collector lokal.
+
+Tracing aktif jika salah satunya di-set (atau ``TRACING_ENABLED=1``) dan paket
+``opentelemetry-sdk`` terpasang; selain itu semua helper di sini no-op.
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+TRACING_ENABLED = os.getenv(
+    "TRACING_ENABLED", "1" if (TRACE_FILE or OTEL_EXPORTER_OTLP_ENDPOINT) else "0"
+).lower() in ("1", "true", "yes")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "education-backend")
+
+# Field W3C trace context yang ikut dikirim di pesan WebSocket
+PROPAGATION_FIELDS = ("traceparent", "tracestate")
+
+_state = {"provider": None, "tracer": None}
+
+
+class FileSpanExporter:
+    """Span -> file JSON lines berformat OTLP (append, aman antar thread)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        from google.protobuf.json_format import MessageToJson
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+            encode_spans,
+        )
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        line = MessageToJson(encode_spans(spans), indent=None)
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"⚠️ Gagal menulis trace ke {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis=30000):
+        return True
+
+
+def configure(exporter=None, service_name=OTEL_SERVICE_NAME, batch=True):
+    """
+    Siapkan tracer. Tanpa ``exporter`` eksplisit, exporter dipilih dari env
+    (``TRACE_FILE`` / ``OTEL_EXPORTER_OTLP_ENDPOINT``). Return True jika aktif.
+    """
+    if exporter is None and not TRACING_ENABLED:
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            SimpleSpanProcessor,
+        )
+    except ImportError:
+        print("⚠️ TRACING_ENABLED tapi opentelemetry-sdk belum terpasang.")
+        return False
+
+    exporters = [exporter] if exporter is not None else []
+    if exporter is None and TRACE_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+        exporters.append(FileSpanExporter(TRACE_FILE))
+    if exporter is None and OTEL_EXPORTER_OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            print("⚠️ opentelemetry-exporter-otlp-proto-http belum terpasang.")
+        else:
+            # Endpoint & header dibaca exporter dari env OTEL_EXPORTER_OTLP_*
+            exporters.append(OTLPSpanExporter())
+    if not exporters:
+        print("⚠️ Tracing aktif tapi tidak ada exporter (set TRACE_FILE).")
+        return False
+
+    shutdown()
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    processor = BatchSpanProcessor if batch else SimpleSpanProcessor
+    for item in exporters:
+        provider.add_span_processor(processor(item))
+    _state["provider"] = provider
+    _state["tracer"] = provider.get_tracer(__name__)
+    print(f"✅ Tracing aktif ({service_name}): {[type(e).__name__ for e in exporters]}")
+    return True
+
+
+def enabled():
+    return _state["tracer"] is not None
+
+
+def force_flush():
+    if _state["provider"] is not None:
+        _state["provider"].force_flush()
+
+
+def shutdown():
+    provider = _state["provider"]
+    _state["provider"] = _state["tracer"] = None
+    if provider is not None:
+        provider.shutdown()
+
+
+def span(name, attributes=None):
+    """Context manager span anak dari span aktif (no-op jika tracing mati)."""
+    tracer = _state["tracer"]
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def record_span(name, seconds, attributes=None):
+    """Span untuk durasi yang sudah terukur (berakhir sekarang)."""
+    tracer = _state["tracer"]
+    if tracer is None:
+        return
+    end = time.time_ns()
+    started = tracer.start_span(
+        name, start_time=end - int(seconds * 1e9), attributes=attributes
+    )
+    started.end(end_time=end)
+
+
+def message_span(name, headers, message):
+    """
+    Span server untuk satu pesan WebSocket. Konteks trace diambil dari field
+    ``traceparent`` / ``tracestate`` di pesan (satu trace per interaksi),
+    fallback ke header handshake.
+    """
+    tracer = _state["tracer"]
+    if tracer is None:
+        return contextlib.nullcontext()
+    from opentelemetry import propagate, trace
+
+    carrier = dict(headers)
+    if isinstance(message, dict):
+        carrier.update(
+            (key, message[key])
+            for key in PROPAGATION_FIELDS
+            if isinstance(message.get(key), str)
+        )
+    return tracer.start_as_current_span(
+        name, context=propagate.extract(carrier), kind=trace.SpanKind.SERVER
+    )
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: span server per request HTTP, melanjutkan ``traceparent``
+    dari klien. Nama span memakai template route (``POST /predict``), bukan
+    path mentah, agar tidak meledak kardinalitasnya.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tracer = _state["tracer"]
+        if tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from opentelemetry import propagate, trace
+
+        carrier = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope.get("headers", [])
+        }
+        method = scope.get("method", "GET")
+        status = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as current:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    current.update_name(f"{method} {route}")
+                    current.set_attribute("http.route", route)
+                if "code" in status:
+                    current.set_attribute("http.response.status_code", status["code"])
+                    if status["code"] >= 500:
+                        current.set_status(trace.StatusCode.ERROR)
@@ -0,0 +1,129 @@
+"""
+Benchmark cold start backend: waktu import ``backend.app.main``, startup
+(lifespan: load artefak) dan latensi request /predict pertama.
+
+Tiap pengukuran dijalankan di interpreter baru (subprocess) supaya cache
+import tidak ikut terhitung. Jalankan dari root repo:
+    python -m backend.benchmarks.benchmark_cold_start --artifacts mage_pipeline/artifacts
+    python -m backend.benchmarks.benchmark_cold_start --formats pickle npz
+
+Untuk format ``npz``, artefak numpy dibuat dari pickle di direktori sementara
+jika belum ada.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child():
+    """Dijalankan di subprocess: cetak satu baris JSON hasil pengukuran."""
+    t0 = time.perf_counter()
+    from backend.app import main
+
+    t_import = time.perf_counter() - t0
+
+    from fastapi.testclient import TestClient
+
+    payload = {name: 1.0 for name in main.FEATURE_COLUMNS}
+    t1 = time.perf_counter()
+    with TestClient(main.app) as client:
+        t_startup = time.perf_counter() - t1
+        t2 = time.perf_counter()
+        response = client.post("/predict", json=payload)
+        t_first = time.perf_counter() - t2
+        response.raise_for_status()
+        bundle = main.model_store.current
+        heavy = [m for m in ("pandas", "sklearn", "joblib") if m in sys.modules]
+        print(
+            json.dumps(
+                {
+                    "import_ms": t_import * 1000,
+                    "startup_ms": t_startup * 1000,
+                    "first_request_ms": t_first * 1000,
+                    "model_format": bundle.model_format,
+                    "heavy_modules_loaded": heavy,
+                }
+            )
+        )
+
+
+def prepare_npz(artifacts_dir):
+    from backend.app.model_store import NUMPY_MODEL_FILENAME, export_numpy_artifact
+
+    if os.path.exists(os.path.join(artifacts_dir, NUMPY_MODEL_FILENAME)):
+        return artifacts_dir
+    workdir = tempfile.mkdtemp(prefix="coldstart-")
+    for filename in os.listdir(artifacts_dir):
+        path = os.path.join(artifacts_dir, filename)
+        if os.path.isfile(path):
+            shutil.copy2(path, workdir)
+    export_numpy_artifact(workdir)
+    return workdir
+
+
+def run(artifacts_dir, model_format, repeat):
+    env = dict(
+        os.environ,
+        ARTIFACTS_DIR=artifacts_dir,
+        MODEL_FORMAT=model_format,
+        MODEL_RELOAD_INTERVAL="0",
+        PYTHONWARNINGS="ignore",
+    )
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "backend.benchmarks.benchmark_cold_start",
+                "--child",
+            ],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    summary = {
+        key: statistics.median(s[key] for s in samples)
+        for key in ("import_ms", "startup_ms", "first_request_ms")
+    }
+    summary["model_format"] = samples[-1]["model_format"]
+    summary["heavy_modules_loaded"] = samples[-1]["heavy_modules_loaded"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", action="store_true")
+    parser.add_argument(
+        "--artifacts", default=os.getenv("ARTIFACTS_DIR", "/app/artifacts")
+    )
+    parser.add_argument("--formats", nargs="+", default=["pickle", "npz"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    artifacts_dir = os.path.abspath(args.artifacts)
+    report = {}
+    for model_format in args.formats:
+        directory = (
+            prepare_npz(artifacts_dir) if model_format == "npz" else artifacts_dir
+        )
+        report[model_format] = run(directory, model_format, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
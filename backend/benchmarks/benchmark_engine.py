@@ -0,0 +1,91 @@
+"""
+Benchmark: FusedKMeansEngine vs jalur sklearn (scaler.transform -> kmeans.predict).
+
+Jalankan dari root repo:
+    python -m backend.benchmarks.benchmark_engine
+    ARTIFACTS_DIR=mage_pipeline/artifacts python -m backend.benchmarks.benchmark_engine
+
+Jika artefak tidak ditemukan, model sintetis (20 fitur, k=4) dipakai.
+"""
+
+import argparse
+import json
+import os
+import timeit
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from backend.app.engine import build_engine
+from backend.app.main import FEATURE_COLUMNS
+
+
+def load_or_train(artifacts_dir):
+    model_path = os.path.join(artifacts_dir, "kmeans_model.pkl")
+    scaler_path = os.path.join(artifacts_dir, "standard_scaler.pkl")
+    if os.path.exists(model_path) and os.path.exists(scaler_path):
+        print(f"📦 Memakai artefak dari {artifacts_dir}")
+        return joblib.load(model_path), joblib.load(scaler_path)
+
+    print("⚠️ Artefak tidak ditemukan, memakai model sintetis")
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        rng.uniform(0, 100, size=(200, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS
+    )
+    scaler = StandardScaler().fit(df)
+    kmeans = KMeans(n_clusters=4, random_state=42, n_init=10).fit(scaler.transform(df))
+    return kmeans, scaler
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--artifacts", default=os.getenv("ARTIFACTS_DIR", "/app/artifacts")
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--single-calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    kmeans, scaler = load_or_train(args.artifacts)
+    engines = {
+        mode: build_engine(kmeans, scaler, FEATURE_COLUMNS, mode=mode)
+        for mode in ("sklearn", "fused")
+    }
+    n_features = len(engines["fused"].feature_names)
+
+    rng = np.random.default_rng(0)
+    mean = getattr(scaler, "mean_", np.zeros(n_features))
+    scale = getattr(scaler, "scale_", np.ones(n_features))
+    X = mean + scale * rng.normal(size=(args.rows, n_features))
+    row = X[0].tolist()
+
+    labels = {mode: engine.predict(X) for mode, engine in engines.items()}
+    agreement = float((labels["fused"] == labels["sklearn"]).mean())
+
+    report = {"rows": args.rows, "n_features": n_features, "label_agreement": agreement}
+    for mode, engine in engines.items():
+        report[mode] = {
+            "single_us": per_call_us(
+                lambda: engine.predict_one(row), args.single_calls
+            ),
+            "batch_ms": per_call_us(lambda: engine.predict(X), 5) / 1000,
+        }
+    report["speedup_single"] = (
+        report["sklearn"]["single_us"] / report["fused"]["single_us"]
+    )
+    report["speedup_batch"] = (
+        report["sklearn"]["batch_ms"] / report["fused"]["batch_ms"]
+    )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Load test + benchmark latensi backend (p50/p95/p99, RPS, alokasi per request).
+
+Default: app FastAPI dijalankan in-process lewat ``httpx.ASGITransport``
+(lifespan ikut dijalankan, jadi model dimuat seperti di container). Bisa juga
+menembak uvicorn lokal (``--uvicorn``) atau server yang sudah jalan (``--url``).
+
+Jalankan dari root repo:
+    python -m backend.benchmarks.benchmark_load --artifacts mage_pipeline/artifacts
+    python -m backend.benchmarks.benchmark_load --concurrency 32 --requests 5000 \\
+        --mix single=0.4,batch=0.1,cache_hit=0.3,cache_miss=0.2 --output run.json
+    python -m backend.benchmarks.benchmark_load --uvicorn --workers 2
+
+Skenario payload:
+- ``single``     : /predict dengan baris dari pool kecil (campuran hit/miss cache)
+- ``batch``      : /predict/batch dengan ``--batch-rows`` baris acak
+- ``cache_hit``  : /predict dengan satu baris yang selalu sama
+- ``cache_miss`` : /predict dengan baris acak baru (tidak pernah ada di cache)
+
+Hasil berupa JSON (stdout dan ``--output``) supaya run bisa dibandingkan.
+Alokasi diukur terpisah secara sekuensial dengan ``tracemalloc`` (hanya mode
+in-process): puncak memori per request dan blok yang tertahan per request.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+SCENARIOS = ("single", "batch", "cache_hit", "cache_miss")
+DEFAULT_MIX = "single=0.4,batch=0.1,cache_hit=0.3,cache_miss=0.2"
+SINGLE_POOL_SIZE = 64
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Skenario tidak dikenal: {name} (pilihan: {SCENARIOS})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class PayloadFactory:
+    """Payload sesuai schema ProvinceFeatures, disebar di sekitar data training."""
+
+    def __init__(self, feature_columns, engine=None, batch_rows=100, seed=0):
+        self.feature_columns = list(feature_columns)
+        self.batch_rows = batch_rows
+        self.rng = np.random.default_rng(seed)
+        n = len(self.feature_columns)
+        self.mean = np.full(n, 50.0)
+        self.scale = np.full(n, 10.0)
+        if engine is not None:
+            # Fitur model mengikuti mean/std scaler; sisanya (schema saja) default
+            for name, mean, scale in zip(
+                engine.feature_names, engine.mean, engine.scale
+            ):
+                j = self.feature_columns.index(name)
+                self.mean[j], self.scale[j] = mean, scale
+        self.pool = [self.random_row() for _ in range(SINGLE_POOL_SIZE)]
+        self.hot = self.pool[0]
+
+    def random_row(self):
+        values = self.mean + self.scale * self.rng.normal(size=len(self.mean))
+        return dict(zip(self.feature_columns, values.tolist()))
+
+    def request(self, scenario):
+        """Return (method, path, json body)."""
+        if scenario == "batch":
+            rows = [self.random_row() for _ in range(self.batch_rows)]
+            return "POST", "/predict/batch", {"rows": rows}
+        if scenario == "cache_hit":
+            return "POST", "/predict", self.hot
+        if scenario == "cache_miss":
+            return "POST", "/predict", self.random_row()
+        return "POST", "/predict", self.pool[int(self.rng.integers(len(self.pool)))]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return float(np.percentile(sorted_values, q))
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for s in statuses if s >= 400),
+        "status_codes": {
+            str(code): statuses.count(code) for code in sorted(set(statuses))
+        },
+        "rps": len(latencies) / elapsed if elapsed > 0 else None,
+        "latency_ms": {
+            "mean": statistics.fmean(ms) if ms else None,
+            "p50": percentile(ms, 50),
+            "p95": percentile(ms, 95),
+            "p99": percentile(ms, 99),
+            "max": ms[-1] if ms else None,
+        },
+    }
+
+
+async def run_load(client, factory, mix, n_requests, concurrency, warmup, seed):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    chooser = random.Random(seed)
+    plan = chooser.choices(names, weights=weights, k=n_requests)
+    requests = [factory.request(name) for name in plan]
+
+    # Warmup: isi cache / threadpool / import lazy, tidak ikut diukur
+    for _ in range(warmup):
+        for name in names:
+            method, path, body = factory.request(name)
+            await client.request(method, path, json=body)
+
+    results = {name: ([], []) for name in names}
+    cursor = iter(range(n_requests))
+
+    async def worker():
+        for i in cursor:
+            method, path, body = requests[i]
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latency = time.perf_counter() - started
+            latencies, statuses = results[plan[i]]
+            latencies.append(latency)
+            statuses.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [v for lat, _ in results.values() for v in lat]
+    all_statuses = [s for _, st in results.values() for s in st]
+    report = {"overall": summarize(all_latencies, all_statuses, elapsed)}
+    report["overall"]["elapsed_s"] = elapsed
+    for name, (latencies, statuses) in results.items():
+        report[name] = summarize(latencies, statuses, elapsed)
+    return report
+
+
+async def measure_allocations(client, factory, names, n_requests):
+    """Per skenario: puncak alokasi (KiB) & blok tertahan per request, sekuensial."""
+    report = {}
+    for name in names:
+        bodies = [factory.request(name) for _ in range(n_requests)]
+        # Satu request pemanasan agar cache/objek lazy tidak ikut terhitung
+        method, path, body = bodies[0]
+        await client.request(method, path, json=body)
+
+        tracemalloc.start()
+        peaks = []
+        blocks_before = sys.getallocatedblocks()
+        for method, path, body in bodies:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await client.request(method, path, json=body)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        retained = sys.getallocatedblocks() - blocks_before
+        tracemalloc.stop()
+        report[name] = {
+            "peak_kib_per_request": statistics.fmean(peaks) / 1024,
+            "retained_blocks_per_request": retained / n_requests,
+        }
+    return report
+
+
+async def run_in_process(args, mix):
+    if args.artifacts:
+        os.environ["ARTIFACTS_DIR"] = os.path.abspath(args.artifacts)
+    os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+    from backend.app import main
+
+    async with main.lifespan(main.app):
+        bundle = main.model_store.current
+        if bundle is None:
+            raise SystemExit(
+                f"❌ Model tidak ditemukan di {os.getenv('ARTIFACTS_DIR')}"
+            )
+        factory = PayloadFactory(
+            main.FEATURE_COLUMNS, bundle.engine, args.batch_rows, args.seed
+        )
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            report = await run_load(
+                client,
+                factory,
+                mix,
+                args.requests,
+                args.concurrency,
+                args.warmup,
+                args.seed,
+            )
+            if args.alloc_requests > 0:
+                report["allocations"] = await measure_allocations(
+                    client, factory, list(mix), args.alloc_requests
+                )
+        report["model_version"] = bundle.version
+    return report
+
+
+async def run_http(args, mix, base_url):
+    from backend.app.main import FEATURE_COLUMNS
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        info = (await client.get("/")).json()
+        factory = PayloadFactory(FEATURE_COLUMNS, None, args.batch_rows, args.seed)
+        # Tanpa akses ke engine: pakai urutan & default schema
+        report = await run_load(
+            client,
+            factory,
+            mix,
+            args.requests,
+            args.concurrency,
+            args.warmup,
+            args.seed,
+        )
+    report["model_version"] = info.get("model_version")
+    # Alokasi tidak bisa diukur dari luar proses server
+    report["allocations"] = None
+    return report
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(args):
+    port = free_port()
+    env = dict(os.environ, MODEL_RELOAD_INTERVAL="0")
+    if args.artifacts:
+        env["ARTIFACTS_DIR"] = os.path.abspath(args.artifacts)
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.app.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).json().get("model_loaded"):
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("❌ uvicorn tidak siap dalam 60 detik")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--artifacts", default=os.getenv("ARTIFACTS_DIR"))
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-rows", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alloc-requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Server yang sudah jalan (tanpa in-process)")
+    parser.add_argument("--uvicorn", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    process = None
+    if args.uvicorn:
+        process, base_url = start_uvicorn(args)
+        mode = "uvicorn"
+    elif args.url:
+        base_url, mode = args.url, "http"
+    else:
+        base_url, mode = None, "in_process"
+
+    try:
+        if base_url is None:
+            report = asyncio.run(run_in_process(args, mix))
+        else:
+            report = asyncio.run(run_http(args, mix, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report["config"] = {
+        "mode": mode,
+        "mix": mix,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "batch_rows": args.batch_rows,
+        "workers": args.workers if args.uvicorn else None,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
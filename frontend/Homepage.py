@@ -1,6 +1,11 @@
 import streamlit as st
 import streamlit.components.v1 as components
 
+import tracing
+
+# Halaman statis: span hanya mengukur waktu render
+tracing.begin_page("homepage")
+
 # 1. PAGE CONFIG
 st.set_page_config(
     page_title="Homepage",
@@ -340,3 +345,5 @@ with footer_cols[2]:
 st.caption(
     "© 2025 Andiar Rinanda Agastya. Built with ❤️ for Machine Learning Technology Final Project"
 )
+
+tracing.end_page()
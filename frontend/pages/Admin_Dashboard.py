@@ -12,6 +12,11 @@ import plotly.express as px
 import numpy as np
 import secrets
 
+import tracing
+
+# Satu span per eksekusi script; ditutup di akhir halaman (tracing.end_page)
+tracing.begin_page("admin_dashboard")
+
 # ==============================================================================
 # PAGE CONFIGURATION
 # ==============================================================================
@@ -441,7 +446,8 @@ def validate_dataframe(df):
 def get_mage_status():
     """Check Mage engine status"""
     try:
-        res = requests.get(f"{MAGE_HOST}/api/statuses", timeout=5)
+        with tracing.span("mage.statuses"):
+            res = requests.get(f"{MAGE_HOST}/api/statuses", timeout=5)
         if res.status_code == 200:
             return {"status": "online", "code": 200}
         else:
@@ -461,7 +467,8 @@ def trigger_pipeline(variables=None):
     payload = {"pipeline_run": {"variables": variables or {}}}
 
     try:
-        res = requests.post(api_url, headers=headers, json=payload, timeout=10)
+        with tracing.span("mage.trigger_pipeline"):
+            res = requests.post(api_url, headers=headers, json=payload, timeout=10)
         return res
     except requests.exceptions.RequestException as e:
         st.error(f"Connection error: {e}")
@@ -471,11 +478,12 @@ def trigger_pipeline(variables=None):
 def get_pipeline_status(run_id):
     """Fetch pipeline run status"""
     try:
-        res = requests.get(
-            f"{MAGE_HOST}/api/pipeline_runs/{run_id}",
-            headers={"Authorization": f"Bearer {TRIGGER_TOKEN}"},
-            timeout=5,
-        )
+        with tracing.span("mage.pipeline_run", {"mage.run_id": str(run_id)}):
+            res = requests.get(
+                f"{MAGE_HOST}/api/pipeline_runs/{run_id}",
+                headers={"Authorization": f"Bearer {TRIGGER_TOKEN}"},
+                timeout=5,
+            )
         if res.status_code == 200:
             return res.json()
     except:
@@ -830,12 +838,13 @@ with tab1:
                                 }
 
                                 # Request ke Mage
-                                response = requests.post(
-                                    MAGE_API_URL,
-                                    headers=headers,
-                                    json=payload,
-                                    timeout=10,
-                                )
+                                with tracing.span("mage.trigger_seeding"):
+                                    response = requests.post(
+                                        MAGE_API_URL,
+                                        headers=headers,
+                                        json=payload,
+                                        timeout=10,
+                                    )
 
                                 if response.status_code == 200:
                                     run_data = response.json()
@@ -1005,13 +1014,16 @@ with tab2:
                             time.sleep(5)
 
                             try:
-                                status_res = requests.get(
-                                    f"{MAGE_HOST}/api/pipeline_runs/{run_id}",
-                                    headers={
-                                        "Authorization": f"Bearer {TRIGGER_TOKEN}"
-                                    },
-                                    timeout=5,
-                                )
+                                with tracing.span(
+                                    "mage.pipeline_run", {"mage.run_id": str(run_id)}
+                                ):
+                                    status_res = requests.get(
+                                        f"{MAGE_HOST}/api/pipeline_runs/{run_id}",
+                                        headers={
+                                            "Authorization": f"Bearer {TRIGGER_TOKEN}"
+                                        },
+                                        timeout=5,
+                                    )
 
                                 if status_res.status_code == 200:
                                     current_status = (
@@ -1792,3 +1804,5 @@ with footer_cols[2]:
 st.caption(
     "© 2025 Andiar Rinanda Agastya. Built with ❤️ for Machine Learning Technology Final Project"
 )
+
+tracing.end_page()
@@ -10,7 +10,19 @@ from PIL import Image
 # --- IMPORTS FOR MODEL LAB ---
 import mlflow
 import requests
-import time
+
+import tracing
+
+try:
+    # websocket-client (opsional): live scoring lewat /ws/predict
+    import websocket
+except ImportError:
+    websocket = None
+
+BACKEND_WS_URL = os.getenv("BACKEND_WS_URL", "ws://backend:8000/ws/predict")
+
+# Satu span per eksekusi script; ditutup di akhir halaman (tracing.end_page)
+tracing.begin_page("user_dashboard")
 
 # -----------------------------
 
@@ -420,7 +432,7 @@ def load_and_prep_data():
     return df_raw, geojson, cluster_metadata, cluster_profile
 
 
-with st.spinner("📊 Loading dashboard data..."):
+with st.spinner("📊 Loading dashboard data..."), tracing.span("load_data"):
     df, geojson_indo, cluster_metadata, cluster_profile = load_and_prep_data()
 
 # Enhanced Color Map - Dynamic based on metadata
@@ -2378,137 +2390,191 @@ st.markdown(
     "Uji model dengan data input manual untuk melihat prediksi klaster secara real-time."
 )
 
-with st.form("inference_form"):
-    st.markdown("### 📝 Input Features (Manual Entry)")
-
-    # Grid Layout for Inputs (3 Kolom)
-    c_infra, c_guru, c_siswa = st.columns(3, gap="medium")
-
-    with c_infra:
-        st.markdown("#### 📡 Infrastruktur Digital")
-        # Internet
-        p_inet_sd = st.slider("Internet SD (%)", 0, 100, 80)
-        p_inet_smp = st.slider("Internet SMP (%)", 0, 100, 85)
-        p_inet_sma = st.slider("Internet SMA (%)", 0, 100, 90)
-        st.markdown("---")
-        # Listrik (NEW)
-        p_listrik_sd = st.slider("Listrik SD (%)", 0, 100, 95)
-        p_listrik_smp = st.slider("Listrik SMP (%)", 0, 100, 98)
-        p_listrik_sma = st.slider("Listrik SMA (%)", 0, 100, 99)
-        st.markdown("---")
-        # Rasio PC
-        r_pc_sd = st.number_input("Rasio Siswa/PC (SD)", 1.0, 100.0, 30.0)
-        r_pc_smp = st.number_input("Rasio Siswa/PC (SMP)", 1.0, 100.0, 20.0)
-        r_pc_sma = st.number_input("Rasio Siswa/PC (SMA)", 1.0, 100.0, 15.0)
-
-    with c_guru:
-        st.markdown("#### 🎓 Kualitas & Rasio Guru")
-        # Sertifikasi
-        p_cert_sd = st.slider("Sertifikasi Guru SD (%)", 0, 100, 40)
-        p_cert_smp = st.slider("Sertifikasi Guru SMP (%)", 0, 100, 50)
-        p_cert_sma = st.slider("Sertifikasi Guru SMA (%)", 0, 100, 60)
-        st.markdown("---")
-        # Kualifikasi S1 (NEW)
-        p_s1_sd = st.slider("Guru S1 SD (%)", 0, 100, 85)
-        p_s1_smp = st.slider("Guru S1 SMP (%)", 0, 100, 90)
-        p_s1_sma = st.slider("Guru S1 SMA (%)", 0, 100, 95)
-        st.markdown("---")
-        # Rasio Guru
-        r_guru_sd = st.number_input("Rasio Siswa/Guru (SD)", 1.0, 100.0, 20.0)
-        r_guru_smp = st.number_input("Rasio Siswa/Guru (SMP)", 1.0, 100.0, 18.0)
-        r_guru_sma = st.number_input("Rasio Siswa/Guru (SMA)", 1.0, 100.0, 15.0)
-
-    with c_siswa:
-        st.markdown("#### 🧠 Potensi Siswa (AKM)")
-        p_lit = st.slider("Lulus Literasi (%)", 0, 100, 55)
-        p_num = st.slider("Lulus Numerasi (%)", 0, 100, 50)
-        st.markdown("---")
-        st.info(
-            "💡 **Tips:** Geser nilai parameter untuk melihat bagaimana klaster berubah secara dinamis."
-        )
-        st.caption(
-            "Klik tombol di bawah untuk mengirim data ke Backend Inference Service."
-        )
 
-    submitted = st.form_submit_button("⚡ Prediksi Klaster", use_container_width=True)
-
-if submitted:
-    # Construct Payload dengan URUTAN YANG BENAR (Sesuai CSV Training)
-    payload = {
-        # 1. Internet
-        "persen_sekolah_internet_sd": p_inet_sd,
-        "persen_sekolah_internet_smp": p_inet_smp,
-        "persen_sekolah_internet_sma": p_inet_sma,
-        # 2. Sertifikasi (Harus urutan ke-2!)
-        "persen_guru_sertifikasi_sd": p_cert_sd,
-        "persen_guru_sertifikasi_smp": p_cert_smp,
-        "persen_guru_sertifikasi_sma": p_cert_sma,
-        # 3. Rasio Guru
-        "rasio_siswa_guru_sd": r_guru_sd,
-        "rasio_siswa_guru_smp": r_guru_smp,
-        "rasio_siswa_guru_sma": r_guru_sma,
-        # 4. Rasio Komputer
-        "rasio_siswa_komputer_sd": r_pc_sd,
-        "rasio_siswa_komputer_smp": r_pc_smp,
-        "rasio_siswa_komputer_sma": r_pc_sma,
-        # 5. AKM
-        "persen_lulus_akm_literasi": p_lit,
-        "persen_lulus_akm_numerasi": p_num,
-        # 6. Listrik (Urutan Belakang)
-        "persen_sekolah_listrik_sd": p_listrik_sd,
-        "persen_sekolah_listrik_smp": p_listrik_smp,
-        "persen_sekolah_listrik_sma": p_listrik_sma,
-        # 7. Kualifikasi S1 (Urutan Terakhir)
-        "persen_guru_kualifikasi_s1_sd": p_s1_sd,
-        "persen_guru_kualifikasi_s1_smp": p_s1_smp,
-        "persen_guru_kualifikasi_s1_sma": p_s1_sma,
-    }
+def live_predict(payload):
+    """
+    Live scoring lewat /ws/predict: satu koneksi disimpan di session_state dan
+    hanya field yang berubah sejak kiriman terakhir yang dikirim. Return None
+    jika WebSocket tidak tersedia, supaya pemanggil fallback ke HTTP.
+    """
+    if websocket is None:
+        return None
+    ws = st.session_state.get("live_ws")
+    sent = st.session_state.get("live_ws_sent", {})
+    try:
+        if ws is None or not ws.connected:
+            ws = websocket.create_connection(BACKEND_WS_URL, timeout=5)
+            st.session_state["live_ws"] = ws
+            sent = {}
+        changed = {k: v for k, v in payload.items() if sent.get(k) != v}
+        # traceparent per pesan: span inference di backend ikut trace interaksi ini
+        ws.send(json.dumps({"features": changed, **tracing.inject_headers()}))
+        result = json.loads(ws.recv())
+    except Exception:
+        st.session_state.pop("live_ws", None)
+        st.session_state.pop("live_ws_sent", None)
+        return None
+    if "cluster_id" not in result:
+        return None
+    st.session_state["live_ws_sent"] = dict(payload)
+    return result
+
+
+# Panel di luar st.form: tiap geser slider langsung memicu update. Sebagai
+# fragment, rerun hanya panel ini (bukan seluruh dashboard), dan live_predict
+# hanya mengirim fitur yang berubah lewat WebSocket.
+fragment = (
+    getattr(st, "fragment", None)
+    or getattr(st, "experimental_fragment", None)
+    or (lambda func: func)
+)
 
-    st.markdown("### 📊 Prediction Result")
-    with st.spinner("Mengirim data ke model inference..."):
-        try:
-            # Delay simulasi UX
-            time.sleep(0.5)
 
-            # Gunakan host 'backend' sesuai docker-compose network
-            response = requests.post(
-                "http://backend:8000/predict", json=payload, timeout=5
+@fragment
+def inference_panel():
+    with st.container():
+        st.markdown("### 📝 Input Features (Manual Entry)")
+
+        # Grid Layout for Inputs (3 Kolom)
+        c_infra, c_guru, c_siswa = st.columns(3, gap="medium")
+
+        with c_infra:
+            st.markdown("#### 📡 Infrastruktur Digital")
+            # Internet
+            p_inet_sd = st.slider("Internet SD (%)", 0, 100, 80)
+            p_inet_smp = st.slider("Internet SMP (%)", 0, 100, 85)
+            p_inet_sma = st.slider("Internet SMA (%)", 0, 100, 90)
+            st.markdown("---")
+            # Listrik (NEW)
+            p_listrik_sd = st.slider("Listrik SD (%)", 0, 100, 95)
+            p_listrik_smp = st.slider("Listrik SMP (%)", 0, 100, 98)
+            p_listrik_sma = st.slider("Listrik SMA (%)", 0, 100, 99)
+            st.markdown("---")
+            # Rasio PC
+            r_pc_sd = st.number_input("Rasio Siswa/PC (SD)", 1.0, 100.0, 30.0)
+            r_pc_smp = st.number_input("Rasio Siswa/PC (SMP)", 1.0, 100.0, 20.0)
+            r_pc_sma = st.number_input("Rasio Siswa/PC (SMA)", 1.0, 100.0, 15.0)
+
+        with c_guru:
+            st.markdown("#### 🎓 Kualitas & Rasio Guru")
+            # Sertifikasi
+            p_cert_sd = st.slider("Sertifikasi Guru SD (%)", 0, 100, 40)
+            p_cert_smp = st.slider("Sertifikasi Guru SMP (%)", 0, 100, 50)
+            p_cert_sma = st.slider("Sertifikasi Guru SMA (%)", 0, 100, 60)
+            st.markdown("---")
+            # Kualifikasi S1 (NEW)
+            p_s1_sd = st.slider("Guru S1 SD (%)", 0, 100, 85)
+            p_s1_smp = st.slider("Guru S1 SMP (%)", 0, 100, 90)
+            p_s1_sma = st.slider("Guru S1 SMA (%)", 0, 100, 95)
+            st.markdown("---")
+            # Rasio Guru
+            r_guru_sd = st.number_input("Rasio Siswa/Guru (SD)", 1.0, 100.0, 20.0)
+            r_guru_smp = st.number_input("Rasio Siswa/Guru (SMP)", 1.0, 100.0, 18.0)
+            r_guru_sma = st.number_input("Rasio Siswa/Guru (SMA)", 1.0, 100.0, 15.0)
+
+        with c_siswa:
+            st.markdown("#### 🧠 Potensi Siswa (AKM)")
+            p_lit = st.slider("Lulus Literasi (%)", 0, 100, 55)
+            p_num = st.slider("Lulus Numerasi (%)", 0, 100, 50)
+            st.markdown("---")
+            st.info(
+                "💡 **Tips:** Geser nilai parameter untuk melihat bagaimana klaster berubah secara dinamis."
+            )
+            st.caption(
+                "Mode live: setiap perubahan slider langsung dikirim ke Backend Inference Service."
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                cluster_label = result.get("label", "Unknown")
-                cluster_id = result.get("cluster_id", -1)
+        live_mode = st.toggle("⚡ Live update (WebSocket)", value=websocket is not None)
+        submitted = st.button("⚡ Prediksi Klaster", use_container_width=True)
+
+    if live_mode or submitted:
+        # Construct Payload dengan URUTAN YANG BENAR (Sesuai CSV Training)
+        payload = {
+            # 1. Internet
+            "persen_sekolah_internet_sd": p_inet_sd,
+            "persen_sekolah_internet_smp": p_inet_smp,
+            "persen_sekolah_internet_sma": p_inet_sma,
+            # 2. Sertifikasi (Harus urutan ke-2!)
+            "persen_guru_sertifikasi_sd": p_cert_sd,
+            "persen_guru_sertifikasi_smp": p_cert_smp,
+            "persen_guru_sertifikasi_sma": p_cert_sma,
+            # 3. Rasio Guru
+            "rasio_siswa_guru_sd": r_guru_sd,
+            "rasio_siswa_guru_smp": r_guru_smp,
+            "rasio_siswa_guru_sma": r_guru_sma,
+            # 4. Rasio Komputer
+            "rasio_siswa_komputer_sd": r_pc_sd,
+            "rasio_siswa_komputer_smp": r_pc_smp,
+            "rasio_siswa_komputer_sma": r_pc_sma,
+            # 5. AKM
+            "persen_lulus_akm_literasi": p_lit,
+            "persen_lulus_akm_numerasi": p_num,
+            # 6. Listrik (Urutan Belakang)
+            "persen_sekolah_listrik_sd": p_listrik_sd,
+            "persen_sekolah_listrik_smp": p_listrik_smp,
+            "persen_sekolah_listrik_sma": p_listrik_sma,
+            # 7. Kualifikasi S1 (Urutan Terakhir)
+            "persen_guru_kualifikasi_s1_sd": p_s1_sd,
+            "persen_guru_kualifikasi_s1_smp": p_s1_smp,
+            "persen_guru_kualifikasi_s1_sma": p_s1_sma,
+        }
 
-                # Visual Result Container
-                # Pastikan COLOR_MAP tersedia di global scope atau definisikan default
-                # (Asumsi COLOR_MAP sudah ada di awal file Dashboard_Publik.py)
-                color = COLOR_MAP.get(cluster_label, "#888")
+        st.markdown("### 📊 Prediction Result")
+        with st.spinner("Mengirim data ke model inference..."):
+            try:
+                # Jalur cepat: WebSocket per sesi, hanya fitur yang berubah dikirim
+                with tracing.span("backend.predict_ws"):
+                    result = live_predict(payload)
+                response = None
+                if result is None:
+                    # Fallback HTTP. Gunakan host 'backend' sesuai docker-compose network
+                    # traceparent: span /predict di backend jadi anak span ini
+                    with tracing.span("backend.predict"):
+                        response = requests.post(
+                            "http://backend:8000/predict",
+                            json=payload,
+                            headers=tracing.inject_headers(),
+                            timeout=5,
+                        )
+                    if response.status_code == 200:
+                        result = response.json()
+
+                if result is not None:
+                    cluster_label = result.get("label", "Unknown")
+                    cluster_id = result.get("cluster_id", -1)
+
+                    # Visual Result Container
+                    # Pastikan COLOR_MAP tersedia di global scope atau definisikan default
+                    # (Asumsi COLOR_MAP sudah ada di awal file Dashboard_Publik.py)
+                    color = COLOR_MAP.get(cluster_label, "#888")
+
+                    res_col1, res_col2 = st.columns([1, 2])
+                    with res_col1:
+                        st.markdown(
+                            f"""
+                            <div style="background-color: {color}25; padding: 25px; border-radius: 12px; border: 2px solid {color};
+                            text-align: center; height: 100%; display: flex; flex-direction: column; justify-content: center;">
+                                <h3 style="color: {color}; margin: 0; font-size: 1.8rem;">{cluster_label}</h3>
+                                <p style="margin-top: 5px; color: #ccc; font-weight: 500;">Cluster ID: {cluster_id}</p>
+                            </div>
+                            """,
+                            unsafe_allow_html=True,
+                        )
+                    with res_col2:
+                        st.success("✅ Prediksi Berhasil!")
+                        st.json(result)
+                else:
+                    st.error(f"❌ API Error: {response.status_code}")
+                    st.markdown(f"**Detail:** `{response.text}`")
 
-                res_col1, res_col2 = st.columns([1, 2])
-                with res_col1:
-                    st.markdown(
-                        f"""
-                        <div style="background-color: {color}25; padding: 25px; border-radius: 12px; border: 2px solid {color};
-                        text-align: center; height: 100%; display: flex; flex-direction: column; justify-content: center;">
-                            <h3 style="color: {color}; margin: 0; font-size: 1.8rem;">{cluster_label}</h3>
-                            <p style="margin-top: 5px; color: #ccc; font-weight: 500;">Cluster ID: {cluster_id}</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
-                with res_col2:
-                    st.success("✅ Prediksi Berhasil!")
-                    st.json(result)
-            else:
-                st.error(f"❌ API Error: {response.status_code}")
-                st.markdown(f"**Detail:** `{response.text}`")
+            except Exception as e:
+                st.error(f"❌ Connection Error: {str(e)}")
+                st.info(
+                    "Pastikan container 'backend' berjalan dan dapat diakses di http://backend:8000"
+                )
 
-        except Exception as e:
-            st.error(f"❌ Connection Error: {str(e)}")
-            st.info(
-                "Pastikan container 'backend' berjalan dan dapat diakses di http://backend:8000"
-            )
+
+inference_panel()
 
 st.markdown("<br>", unsafe_allow_html=True)
 
@@ -2520,7 +2586,8 @@ try:
     mlflow.set_tracking_uri("http://mlflow:5000")
 
     # Get experiments
-    df_runs = mlflow.search_runs(experiment_names=["project_education_clustering"])
+    with tracing.span("mlflow.search_runs"):
+        df_runs = mlflow.search_runs(experiment_names=["project_education_clustering"])
 
     if not df_runs.empty:
         # Select relevant columns for display
@@ -2641,3 +2708,5 @@ with footer_cols[2]:
 st.caption(
     "© 2025 Andiar Rinanda Agastya. Built with ❤️ for Machine Learning Technology Final Project"
 )
+
+tracing.end_page()
@@ -0,0 +1,105 @@
+"""
+Tracing OpenTelemetry untuk halaman Streamlit (opsional).
+
+Setiap eksekusi script halaman menjadi satu span ``page <nama>``; pemanggilan
+lambat di dalamnya (load data, ``requests.post`` ke backend / API Mage,
+``mlflow.search_runs``) dibungkus ``span(...)`` sebagai anak. Header W3C
+``traceparent`` dari ``inject_headers()`` membuat span backend (``/predict``
+beserta tahap inference-nya) tersambung ke trace yang sama, sehingga sisa
+waktu di span halaman = render Streamlit. Untuk ``/ws/predict`` dict yang sama
+ikut di tiap pesan JSON (field ``traceparent``).
+
+Span dikirim OTLP/HTTP ke collector lokal (``OTEL_EXPORTER_OTLP_ENDPOINT``),
+yang menulisnya ke file. Tanpa endpoint / paket opentelemetry, semua no-op.
+"""
+
+import contextlib
+import os
+import threading
+
+import streamlit as st
+
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+TRACING_ENABLED = os.getenv(
+    "TRACING_ENABLED", "1" if OTEL_EXPORTER_OTLP_ENDPOINT else "0"
+).lower() in ("1", "true", "yes")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "education-frontend")
+
+_PAGE_KEY = "_trace_page_span"
+_state = {"configured": False, "tracer": None}
+_lock = threading.Lock()
+
+
+def _get_tracer():
+    # Modul ini tetap di sys.modules antar rerun, jadi provider dibuat sekali
+    if _state["configured"]:
+        return _state["tracer"]
+    with _lock:
+        if not _state["configured"]:
+            _state["tracer"] = _create_tracer() if TRACING_ENABLED else None
+            _state["configured"] = True
+    return _state["tracer"]
+
+
+def _create_tracer():
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        print("⚠️ TRACING_ENABLED tapi paket opentelemetry belum terpasang.")
+        return None
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": OTEL_SERVICE_NAME})
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    print(f"✅ Tracing aktif ({OTEL_SERVICE_NAME})")
+    return provider.get_tracer(__name__)
+
+
+def begin_page(name):
+    """Panggil di awal script halaman; span ditutup ``end_page()``."""
+    # Run sebelumnya tidak sampai end_page (st.stop / rerun di tengah jalan)
+    end_page(interrupted=True)
+    tracer = _get_tracer()
+    if tracer is None:
+        return
+    st.session_state[_PAGE_KEY] = tracer.start_span(
+        f"page {name}", attributes={"streamlit.page": name}
+    )
+
+
+def end_page(interrupted=False):
+    page = st.session_state.pop(_PAGE_KEY, None)
+    if page is None:
+        return
+    if interrupted:
+        page.set_attribute("streamlit.interrupted", True)
+    page.end()
+
+
+def span(name, attributes=None):
+    """Span anak dari span aktif, atau dari span halaman jika belum ada."""
+    tracer = _get_tracer()
+    if tracer is None:
+        return contextlib.nullcontext()
+    from opentelemetry import trace
+
+    context = None
+    page = st.session_state.get(_PAGE_KEY)
+    if page is not None and not trace.get_current_span().get_span_context().is_valid:
+        context = trace.set_span_in_context(page)
+    return tracer.start_as_current_span(name, context=context, attributes=attributes)
+
+
+def inject_headers(headers=None):
+    """Header request + ``traceparent`` dari span aktif (untuk ``requests``)."""
+    headers = dict(headers or {})
+    if _get_tracer() is not None:
+        from opentelemetry import propagate
+
+        propagate.inject(headers)
+    return headers
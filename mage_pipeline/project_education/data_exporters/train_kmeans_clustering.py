@@ -5,7 +5,11 @@ import numpy as np
 import joblib
 import json
 import os
+import shutil
 import optuna
+from mage_ai.settings.repo import get_repo_path
+from mage_ai.io.config import ConfigFileLoader
+from mage_ai.io.postgres import Postgres
 from sklearn.cluster import KMeans
 from sklearn.metrics import silhouette_score, davies_bouldin_score
 
@@ -15,7 +19,96 @@ if "data_exporter" not in globals():
 # --- KONFIGURASI PATH ---
 ARTIFACTS_ROOT_DIR = "/home/src/artifacts"
 MODEL_PATH = os.path.join(ARTIFACTS_ROOT_DIR, "kmeans_model.pkl")
+SCALER_PATH = os.path.join(ARTIFACTS_ROOT_DIR, "standard_scaler.pkl")
+# Artefak ringkas untuk backend: dimuat hanya dengan numpy (cold start cepat)
+NUMPY_MODEL_PATH = os.path.join(ARTIFACTS_ROOT_DIR, "kmeans_model.npz")
 METADATA_PATH = os.path.join(ARTIFACTS_ROOT_DIR, "cluster_metadata.json")
+# Salinan artefak per versi registry (dipakai backend untuk routing / shadow)
+VERSIONS_DIR = os.path.join(ARTIFACTS_ROOT_DIR, "versions")
+SNAPSHOT_FILENAMES = (
+    "standard_scaler.pkl",
+    "kmeans_model.pkl",
+    "kmeans_model.npz",
+    "cluster_metadata.json",
+    "data_labeled.csv",
+)
+# Snapshot terbaru yang disimpan; backend memuat tiap versi ke memori
+MODEL_VERSIONS_KEEP = int(os.getenv("MODEL_VERSIONS_KEEP", "5"))
+# Versi kandidat shadow backend tidak ikut dihapus
+SHADOW_MODEL = os.getenv("SHADOW_MODEL", "")
+# Tabel hasil cluster per provinsi (di-query endpoint /db backend)
+RESULTS_TABLE = "education_cluster_results"
+
+
+# --- EKSPOR ARTEFAK NUMPY ---
+def export_numpy_artifact(kmeans, feature_names, cluster_mapping):
+    """
+    Simpan mean/scale scaler, centroid, urutan fitur & label cluster ke .npz
+    (tanpa pickle) supaya backend bisa melayani prediksi tanpa sklearn/joblib.
+    """
+    scaler = joblib.load(SCALER_PATH)
+    n_features = kmeans.cluster_centers_.shape[1]
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    names = getattr(scaler, "feature_names_in_", None)
+    arrays = {
+        "mean": np.zeros(n_features) if mean is None else np.asarray(mean),
+        "scale": np.ones(n_features) if scale is None else np.asarray(scale),
+        "centers": np.asarray(kmeans.cluster_centers_, dtype=np.float64),
+        "feature_names": np.array(
+            list(names) if names is not None else feature_names, dtype=str
+        ),
+        "cluster_labels": np.array(
+            [cluster_mapping[i] for i in range(len(kmeans.cluster_centers_))],
+            dtype=str,
+        ),
+    }
+    tmp_path = NUMPY_MODEL_PATH + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, NUMPY_MODEL_PATH)
+
+
+def snapshot_model_version(name):
+    """Salin artefak aktif ke versions/<name> (rename atomik dari direktori tmp)."""
+    target = os.path.join(VERSIONS_DIR, name)
+    tmp_dir = os.path.join(VERSIONS_DIR, f".{name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for filename in SNAPSHOT_FILENAMES:
+        src = os.path.join(ARTIFACTS_ROOT_DIR, filename)
+        if os.path.exists(src):
+            shutil.copy2(src, tmp_dir)
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(tmp_dir, target)
+    return target
+
+
+def prune_model_versions(keep=MODEL_VERSIONS_KEEP):
+    """Hapus snapshot v<N> lama, sisakan ``keep`` terbaru (+ SHADOW_MODEL)."""
+    snapshots = sorted(
+        (int(name[1:]), name)
+        for name in os.listdir(VERSIONS_DIR)
+        if name.startswith("v") and name[1:].isdigit()
+    )
+    stale = [name for _, name in snapshots[:-keep] if name != SHADOW_MODEL]
+    for name in stale:
+        shutil.rmtree(os.path.join(VERSIONS_DIR, name), ignore_errors=True)
+    return stale
+
+
+def export_cluster_results(df_result):
+    """Tulis provinsi + cluster ke Postgres; gagal = warning, training tetap jalan."""
+    results = df_result[["provinsi", "cluster_id", "cluster_label"]].copy()
+    results["trained_at"] = pd.Timestamp.now()
+    config_path = os.path.join(get_repo_path(), "io_config.yaml")
+    try:
+        with Postgres.with_config(ConfigFileLoader(config_path, "default")) as loader:
+            loader.export(
+                results, "public", RESULTS_TABLE, index=False, if_exists="replace"
+            )
+        print(f"✅ Hasil cluster disimpan ke tabel: public.{RESULTS_TABLE}")
+    except Exception as e:
+        print(f"⚠️ Gagal menyimpan hasil cluster ke Postgres: {e}")
 
 
 # --- FUNGSI OPTIMASI ---
@@ -90,7 +183,7 @@ def train_and_log_model(df: pd.DataFrame, *args, **kwargs):
         mlflow.log_metric("combined_score", best_score)
 
         # Log Model ke Registry
-        mlflow.sklearn.log_model(
+        model_info = mlflow.sklearn.log_model(
             kmeans_final,
             "kmeans_education_model",
             registered_model_name="education_clustering_model",
@@ -140,7 +233,11 @@ def train_and_log_model(df: pd.DataFrame, *args, **kwargs):
 
         # 6. Simpan Artifacts Fisik (Model & Metadata)
         os.makedirs(ARTIFACTS_ROOT_DIR, exist_ok=True)
-        joblib.dump(kmeans_final, MODEL_PATH)
+        # Tulis atomik (tmp + rename) karena backend memuat ulang model otomatis
+        tmp_model_path = MODEL_PATH + ".tmp"
+        joblib.dump(kmeans_final, tmp_model_path)
+        os.replace(tmp_model_path, MODEL_PATH)
+        export_numpy_artifact(kmeans_final, X.columns.tolist(), cluster_mapping)
 
         # Enhanced metadata dengan statistics
         metadata = {
@@ -157,7 +254,7 @@ def train_and_log_model(df: pd.DataFrame, *args, **kwargs):
         with open(METADATA_PATH, "w") as f:
             json.dump(metadata, f, indent=2)
 
-        print(f"✅ Model disimpan: {MODEL_PATH}")
+        print(f"✅ Model disimpan: {MODEL_PATH} (+ {NUMPY_MODEL_PATH})")
         print(f"✅ Metadata disimpan: {METADATA_PATH}")
 
     # 7. Prepare output dataframe dengan hasil prediksi
@@ -190,6 +287,17 @@ def train_and_log_model(df: pd.DataFrame, *args, **kwargs):
     LABELED_DATA_PATH = os.path.join(ARTIFACTS_ROOT_DIR, "data_labeled.csv")
     df_result.to_csv(LABELED_DATA_PATH, index=False)
     print(f"✅ Labeled Data disimpan: {LABELED_DATA_PATH}")
+    export_cluster_results(df_result)
+
+    # 10. Snapshot per versi registry: backend bisa serve / shadow versi ini
+    registered_version = getattr(model_info, "registered_model_version", None)
+    if registered_version is not None:
+        snapshot_path = snapshot_model_version(f"v{registered_version}")
+        print(f"✅ Snapshot versi model disimpan: {snapshot_path}")
+        if MODEL_VERSIONS_KEEP > 0:
+            removed = prune_model_versions()
+            if removed:
+                print(f"🧹 Snapshot versi lama dihapus: {removed}")
 
     print("\n" + "=" * 60)
     print("📊 CLUSTER SUMMARY:")
@@ -45,7 +45,11 @@ def transform_standardize(df: pd.DataFrame, *args, **kwargs):
     X_scaled = scaler.fit_transform(X[numeric_cols])
 
     # 5. Simpan Scaler untuk dipakai nanti di FastAPI (PENTING!)
-    joblib.dump(scaler, SCALER_PATH)
+    # Tulis ke file sementara lalu rename (atomik) agar backend yang
+    # melakukan hot reload tidak membaca file setengah tertulis
+    tmp_path = SCALER_PATH + ".tmp"
+    joblib.dump(scaler, tmp_path)
+    os.replace(tmp_path, SCALER_PATH)
     print(f"✅ StandardScaler disimpan di: {SCALER_PATH}")
 
     # 6. Gabungkan kembali untuk proses selanjutnya
@@ -0,0 +1,78 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from backend.app.main import FEATURE_COLUMNS, model_store
+
+
+def make_feature_frame(n_rows=60, seed=42):
+    """Data sintetis dengan 3 kelompok provinsi agar KMeans punya struktur."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(10, 90, size=(3, len(FEATURE_COLUMNS)))
+    groups = rng.integers(0, 3, size=n_rows)
+    values = centers[groups] + rng.normal(0, 5, size=(n_rows, len(FEATURE_COLUMNS)))
+    return pd.DataFrame(values, columns=FEATURE_COLUMNS)
+
+
+def train_models(df, n_clusters=3):
+    scaler = StandardScaler().fit(df)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    kmeans.fit(scaler.transform(df))
+    return kmeans, scaler
+
+
+def write_artifacts(artifacts_dir, kmeans, scaler, with_metadata=True, data=None):
+    # Urutan sama seperti pipeline Mage: scaler dulu, model, lalu metadata
+    joblib.dump(scaler, artifacts_dir / "standard_scaler.pkl")
+    joblib.dump(kmeans, artifacts_dir / "kmeans_model.pkl")
+    if with_metadata:
+        centers = kmeans.cluster_centers_
+        metadata = {
+            "n_clusters": len(centers),
+            "cluster_mapping": {str(i): f"Label {i}" for i in range(len(centers))},
+            "cluster_statistics": {
+                str(i): {"centroid": center.tolist()}
+                for i, center in enumerate(centers)
+            },
+            "feature_names": list(scaler.feature_names_in_),
+        }
+        (artifacts_dir / "cluster_metadata.json").write_text(json.dumps(metadata))
+    if data is not None:
+        # Format sama dengan data_labeled.csv: fitur ter-scale + provinsi + cluster
+        labeled = pd.DataFrame(scaler.transform(data), columns=data.columns)
+        labeled["provinsi"] = [f"Provinsi {i}" for i in range(len(data))]
+        labeled["cluster_id"] = kmeans.predict(labeled[data.columns].to_numpy())
+        labeled.to_csv(artifacts_dir / "data_labeled.csv", index=False)
+
+
+@pytest.fixture
+def trained_models():
+    df = make_feature_frame()
+    kmeans, scaler = train_models(df)
+    return {"kmeans": kmeans, "scaler": scaler, "data": df}
+
+
+@pytest.fixture
+def artifacts_dir(tmp_path, trained_models):
+    write_artifacts(
+        tmp_path,
+        trained_models["kmeans"],
+        trained_models["scaler"],
+        data=trained_models["data"],
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def loaded_models(artifacts_dir, trained_models):
+    previous_dir = model_store.artifacts_dir
+    model_store.artifacts_dir = str(artifacts_dir)
+    model_store.reload_if_changed(force=True)
+    yield trained_models
+    model_store.clear()
+    model_store.artifacts_dir = previous_dir
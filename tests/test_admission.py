@@ -0,0 +1,81 @@
+import asyncio
+
+from backend.app.admission import AdmissionControlMiddleware
+
+
+def _call(app, path):
+    messages = []
+    scope = {"type": "http", "path": path, "method": "GET", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await app(scope, receive, send)
+        start = next(m for m in messages if m["type"] == "http.response.start")
+        return start["status"], dict(start["headers"])
+
+    return run()
+
+
+def test_limits_concurrency_queues_and_sheds_with_retry_after():
+    async def scenario():
+        release = asyncio.Event()
+        served = []
+
+        async def slow_app(scope, receive, send):
+            if scope["path"] != "/health":
+                await release.wait()
+            served.append(scope["path"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        app = AdmissionControlMiddleware(
+            slow_app, max_concurrency=1, max_queue=1, queue_timeout=5, retry_after=3
+        )
+        first = asyncio.create_task(_call(app, "/predict"))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(_call(app, "/predict/batch"))
+        await asyncio.sleep(0.01)
+        assert app.in_flight == 1 and len(app._waiters) == 1
+
+        # Antrean penuh: langsung 503 + Retry-After
+        status, headers = await _call(app, "/provinces")
+        assert status == 503
+        assert headers[b"retry-after"] == b"3"
+        # Health check tidak ikut antre
+        assert (await _call(app, "/health"))[0] == 200
+
+        release.set()
+        assert (await first)[0] == 200
+        assert (await queued)[0] == 200
+        assert served == ["/health", "/predict", "/predict/batch"]
+        assert app.in_flight == 0 and not app._waiters
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_times_out_without_leaking_slots():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        app = AdmissionControlMiddleware(
+            slow_app, max_concurrency=1, max_queue=4, queue_timeout=0.05
+        )
+        first = asyncio.create_task(_call(app, "/predict"))
+        await asyncio.sleep(0.01)
+        assert (await _call(app, "/predict"))[0] == 503
+        release.set()
+        await first
+        assert app.in_flight == 0 and not app._waiters
+        assert (await _call(app, "/predict"))[0] == 200
+
+    asyncio.run(scenario())
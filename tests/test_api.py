@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 from backend.app.main import app
 
@@ -8,3 +9,459 @@ def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json()["status"] == "active"
+
+
+def test_read_root_reports_model_version(loaded_models):
+    body = client.get("/").json()
+    assert body["model_status"] == "Loaded"
+    assert len(body["model_version"]) == 12
+
+
+def test_predict_batch_keeps_order_and_reports_invalid_rows(loaded_models):
+    df = loaded_models["data"]
+    rows = df.head(3).to_dict(orient="records")
+    rows[0]["id"] = "Aceh"
+    rows[1] = {"id": "Rusak", "persen_sekolah_internet_sd": "bukan angka"}
+
+    response = client.post("/predict/batch", json={"rows": rows})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["id"] == "Aceh"
+    assert "errors" in body["results"][1]
+    assert body["n_success"] == 2 and body["n_failed"] == 1
+
+    expected = loaded_models["kmeans"].predict(
+        loaded_models["scaler"].transform(df.iloc[[0, 2]])
+    )
+    assert [body["results"][0]["cluster_id"], body["results"][2]["cluster_id"]] == [
+        int(c) for c in expected
+    ]
+
+
+def test_predict_batch_without_model_returns_503():
+    response = client.post("/predict/batch", json={"rows": []})
+    assert response.status_code == 503
+
+
+def test_predict_matches_sklearn_path(loaded_models):
+    row = loaded_models["data"].iloc[[5]]
+    response = client.post("/predict", json=row.iloc[0].to_dict())
+    assert response.status_code == 200
+
+    expected = loaded_models["kmeans"].predict(loaded_models["scaler"].transform(row))
+    assert response.json()["cluster_id"] == int(expected[0])
+
+
+def test_non_finite_features_rejected_before_scoring(loaded_models):
+    import json
+
+    row = loaded_models["data"].iloc[0].to_dict()
+    row["persen_sekolah_internet_sd"] = float("nan")
+    row["rasio_siswa_guru_sd"] = float("inf")
+
+    for path in ("/predict", "/explain", "/similar"):
+        # json.dumps menulis NaN / Infinity (httpx menolak nilai non-finite)
+        response = client.post(
+            path,
+            content=json.dumps(row),
+            headers={"content-type": "application/json"},
+        )
+        assert response.status_code == 422, path
+        assert "persen_sekolah_internet_sd" in response.json()["detail"]
+
+
+def test_predict_stream_csv_scores_in_chunks(loaded_models, monkeypatch):
+    import json
+
+    from backend.app import main
+
+    monkeypatch.setattr(main, "STREAM_CHUNK_ROWS", 7)
+    df = loaded_models["data"].copy()
+    df.insert(0, "id", [f"prov_{i}" for i in range(len(df))])
+    df.loc[3, "rasio_siswa_guru_sd"] = None
+
+    response = client.post(
+        "/predict/stream",
+        content=df.to_csv(index=False),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [line["index"] for line in lines] == list(range(len(df)))
+    assert lines[3]["id"] == "prov_3" and "error" in lines[3]
+    expected = loaded_models["kmeans"].predict(
+        loaded_models["scaler"].transform(loaded_models["data"])
+    )
+    scored = [i for i in range(len(df)) if i != 3]
+    assert [lines[i]["cluster_id"] for i in scored] == [
+        int(expected[i]) for i in scored
+    ]
+
+
+def test_predict_stream_ndjson_and_unknown_content_type(loaded_models):
+    import json
+
+    row = loaded_models["data"].iloc[0].to_dict()
+    body = json.dumps({"id": "A", **row}) + "\n{bukan json\n"
+    response = client.post(
+        "/predict/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["id"] == "A" and "cluster_id" in lines[0]
+    assert "error" in lines[1]
+
+    response = client.post(
+        "/predict/stream", content="x", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
+
+
+def test_predict_arrow_roundtrip_stream_and_parquet(loaded_models):
+    import io
+
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    df = loaded_models["data"].head(10).copy()
+    df.insert(0, "id", [f"prov_{i}" for i in range(len(df))])
+    df.loc[2, "rasio_siswa_guru_sd"] = None
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    expected = loaded_models["kmeans"].predict(
+        loaded_models["scaler"].transform(loaded_models["data"].head(10))
+    )
+
+    sink = io.BytesIO()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post(
+        "/predict/arrow",
+        content=sink.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+    )
+    assert response.status_code == 200
+    result = ipc.open_stream(pa.BufferReader(response.content)).read_all()
+    cluster_ids = result.column("cluster_id").to_pylist()
+    assert result.column("id").to_pylist() == df["id"].tolist()
+    assert cluster_ids[2] is None
+    assert [cluster_ids[i] for i in range(10) if i != 2] == [
+        int(expected[i]) for i in range(10) if i != 2
+    ]
+
+    sink = io.BytesIO()
+    pq.write_table(table, sink)
+    response = client.post(
+        "/predict/arrow",
+        content=sink.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.parquet"},
+    )
+    assert response.status_code == 200
+    result = pq.read_table(pa.BufferReader(response.content))
+    assert result.column("cluster_id").to_pylist() == cluster_ids
+
+
+def test_predict_repeated_input_hits_cache(loaded_models):
+    from prometheus_client import REGISTRY
+
+    def hits():
+        return REGISTRY.get_sample_value("prediction_cache_hits_total")
+
+    payload = loaded_models["data"].iloc[0].to_dict()
+    first = client.post("/predict", json=payload).json()
+    hits_before = hits()
+    second = client.post("/predict", json=payload).json()
+
+    assert hits() == hits_before + 1
+    assert first["cluster_id"] == second["cluster_id"]
+
+
+def test_predict_returns_distances_membership_and_metadata_label(loaded_models):
+    kmeans, scaler = loaded_models["kmeans"], loaded_models["scaler"]
+    row = loaded_models["data"].iloc[[4]]
+    body = client.post("/predict", json=row.iloc[0].to_dict()).json()
+
+    expected = kmeans.transform(scaler.transform(row))[0]
+    assert body["label"] == f"Label {body['cluster_id']}"
+    assert body["distances"] == pytest.approx(expected.tolist(), abs=1e-5)
+    assert sum(body["membership"]) == pytest.approx(1.0, abs=1e-5)
+    assert body["membership"].index(max(body["membership"])) == body["cluster_id"]
+
+    # Titik tengah dua centroid pasti ditandai boundary
+    raw_centers = scaler.inverse_transform(kmeans.cluster_centers_)
+    midpoint = dict(zip(row.columns, (raw_centers[0] + raw_centers[1]) / 2))
+    assert client.post("/predict", json=midpoint).json()["is_boundary"] is True
+
+
+def test_similar_provinces_by_name_and_by_features(loaded_models):
+    import numpy as np
+
+    df, scaler = loaded_models["data"], loaded_models["scaler"]
+    scaled = scaler.transform(df)
+    brute = np.linalg.norm(scaled - scaled[3], axis=1)
+    expected = [f"Provinsi {i}" for i in np.argsort(brute)[1:4]]
+
+    body = client.get("/similar", params={"province": "provinsi 3", "k": 3}).json()
+    assert body["provinsi"] == "Provinsi 3"
+    assert [n["provinsi"] for n in body["neighbors"]] == expected
+    assert body["neighbors"][0]["distance"] == pytest.approx(
+        np.sort(brute)[1], abs=1e-5
+    )
+
+    body = client.post("/similar?k=1", json=df.iloc[3].to_dict()).json()
+    assert body["neighbors"][0]["provinsi"] == "Provinsi 3"
+
+    assert client.get("/similar", params={"province": "Atlantis"}).status_code == 404
+
+
+def test_counterfactual_paths_reach_higher_clusters(loaded_models):
+    import numpy as np
+
+    from backend.app.counterfactual import readiness_rank
+
+    kmeans, scaler, df = (
+        loaded_models["kmeans"],
+        loaded_models["scaler"],
+        loaded_models["data"],
+    )
+    rank = readiness_rank(kmeans.cluster_centers_)
+    lowest = int(np.argmin(rank))
+    row = df[kmeans.predict(scaler.transform(df)) == lowest].iloc[0]
+
+    body = client.post(
+        "/counterfactual",
+        json={"features": row.to_dict(), "immutable_features": ["rasio_siswa_guru_sd"]},
+    ).json()
+    assert body["current_cluster_id"] == lowest
+    assert {p["target_cluster_id"] for p in body["paths"]} <= set(
+        np.flatnonzero(rank > rank[lowest]).tolist()
+    )
+    assert body["paths"]
+
+    for path in body["paths"]:
+        changed = row.copy()
+        for change in path["changes"]:
+            assert change["feature"] != "rasio_siswa_guru_sd"
+            changed[change["feature"]] = change["to"]
+        predicted = kmeans.predict(scaler.transform(changed.to_frame().T))[0]
+        assert predicted == path["target_cluster_id"]
+
+
+def test_metrics_expose_stages_cluster_counts_and_model_info(loaded_models):
+    payload = loaded_models["data"].iloc[1].to_dict()
+    cluster_id = client.post("/predict", json=payload).json()["cluster_id"]
+    version = client.get("/").json()["model_version"]
+
+    text = client.get("/metrics").text
+    for stage in ("request_parse", "feature_extraction", "postprocess"):
+        assert f'endpoint="predict",stage="{stage}"' in text
+    assert f'predictions_total{{cluster_id="{cluster_id}"' in text
+    assert f'model_artifact_info{{engine="fused",model_version="{version}"' in text
+    assert "model_age_seconds" in text
+
+
+def test_websocket_live_scoring_applies_partial_updates(loaded_models):
+    row = loaded_models["data"].iloc[0].to_dict()
+    names = list(row)
+    expected = client.post("/predict", json=row).json()
+    with client.websocket_connect("/ws/predict") as ws:
+        ws.send_json({"seq": 1, "features": {n: row[n] for n in names[:5]}})
+        first = ws.receive_json()
+        assert first["status"] == "incomplete" and first["seq"] == 1
+        assert set(first["missing"]) == set(names[5:])
+
+        ws.send_json({"seq": 2, "features": {n: row[n] for n in names[5:]}})
+        full = ws.receive_json()
+        for key in ("cluster_id", "label", "distances", "membership", "is_boundary"):
+            assert full[key] == expected[key]
+
+        # Hanya satu field berubah -> state lain tetap dipakai
+        moved = {**row, names[0]: row[names[0]] + 50}
+        ws.send_json({"seq": 3, "features": {names[0]: moved[names[0]]}})
+        update = ws.receive_json()
+        assert update["seq"] == 3
+        assert (
+            update["distances"]
+            == client.post("/predict", json=moved).json()["distances"]
+        )
+
+        # Input salah dibalas error tanpa menutup koneksi
+        ws.send_json({"seq": 4, "features": {"bukan_fitur": 1, names[1]: "x"}})
+        error = ws.receive_json()
+        assert error["unknown"] == ["bukan_fitur"] and error["invalid"] == [names[1]]
+        ws.send_text("{rusak")
+        assert "error" in ws.receive_json()
+        ws.send_json({"seq": 5, "features": {}})
+        assert ws.receive_json()["cluster_id"] == update["cluster_id"]
+
+
+def test_read_api_serves_index_with_etag(loaded_models):
+    df = loaded_models["data"]
+    provinces = client.get("/provinces")
+    assert provinces.status_code == 200
+    body = provinces.json()
+    assert body["n_provinces"] == len(df)
+    first = body["provinces"][0]
+    assert first["provinsi"] == "Provinsi 0"
+    assert first["features"]["persen_sekolah_internet_sd"] == pytest.approx(
+        df["persen_sekolah_internet_sd"].iloc[0], abs=1e-4
+    )
+
+    etag = provinces.headers["etag"]
+    cached = client.get("/provinces", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    one = client.get("/provinces/provinsi 0").json()
+    assert one["cluster_id"] == first["cluster_id"]
+    assert client.get("/provinces/Atlantis").status_code == 404
+
+    members = client.get(f"/clusters/{first['cluster_id']}/members").json()
+    assert "Provinsi 0" in [m["provinsi"] for m in members["members"]]
+    assert client.get("/clusters/99/members").status_code == 404
+
+    profile = client.get("/clusters/profile").json()
+    assert sum(c["n_members"] for c in profile["clusters"]) == len(df)
+    assert profile["metadata"]["n_clusters"] == len(profile["clusters"])
+
+
+def test_explain_decomposes_margin_per_feature(loaded_models):
+    import numpy as np
+
+    df, kmeans, scaler = (
+        loaded_models["data"],
+        loaded_models["kmeans"],
+        loaded_models["scaler"],
+    )
+    row = df.iloc[2]
+    body = client.post("/explain", json=row.to_dict()).json()
+
+    z = scaler.transform(df.iloc[[2]])[0]
+    sq = ((kmeans.cluster_centers_ - z) ** 2).sum(axis=1)
+    winner, runner_up = np.argsort(sq)[:2]
+    assert body["cluster_id"] == winner
+    assert body["runner_up_cluster_id"] == runner_up
+    assert body["margin"] == pytest.approx(sq[runner_up] - sq[winner], abs=1e-4)
+    contributions = [c["contribution"] for c in body["contributions"]]
+    assert sum(contributions) == pytest.approx(body["margin"], abs=1e-4)
+    assert contributions == sorted(contributions, reverse=True)
+
+    rows = df.iloc[:4].to_dict(orient="records") + [{"id": "bad"}]
+    batch = client.post("/explain/batch", json={"rows": rows}).json()
+    assert batch["n_success"] == 4 and batch["n_failed"] == 1
+    assert batch["results"][2]["cluster_id"] == body["cluster_id"]
+    assert len(batch["results"][2]["contributions"]) == len(batch["feature_names"])
+    assert "errors" in batch["results"][4]
+
+
+def test_predict_binary_float32_roundtrip(loaded_models):
+    import numpy as np
+
+    from backend.app import binary
+
+    df, kmeans, scaler = (
+        loaded_models["data"],
+        loaded_models["kmeans"],
+        loaded_models["scaler"],
+    )
+    # Urutan kolom sengaja dibalik: server memetakan lewat X-Feature-Order
+    columns = list(df.columns)[::-1]
+    matrix = df[columns].to_numpy().copy()
+    matrix[5, 0] = np.nan
+    response = client.post(
+        "/predict/binary?distances=true",
+        content=binary.encode_rows(matrix),
+        headers={
+            "Content-Type": binary.MEDIA_TYPE,
+            binary.FEATURE_ORDER_HEADER: ",".join(columns),
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == binary.MEDIA_TYPE
+    cluster_ids, distances = binary.decode_response(
+        response.content, len(df), kmeans.n_clusters
+    )
+
+    X = df.to_numpy(dtype=np.float32).astype(np.float64)
+    expected = kmeans.predict(scaler.transform(X))
+    assert cluster_ids[5] == binary.INVALID_CLUSTER_ID
+    assert np.isnan(distances[5]).all()
+    keep = np.arange(len(df)) != 5
+    assert np.array_equal(cluster_ids[keep], expected[keep])
+    assert np.isfinite(distances[keep]).all()
+
+    bad = client.post(
+        "/predict/binary",
+        content=b"\x00" * 7,
+        headers={"Content-Type": binary.MEDIA_TYPE},
+    )
+    assert bad.status_code == 400
+    assert client.post("/predict/binary", json={}).status_code == 415
+
+
+def test_db_endpoints_paginate_by_keyset(monkeypatch):
+    from backend.app.main import database
+
+    calls = []
+
+    async def fake_list(cluster_id, province, after, limit):
+        calls.append((cluster_id, province, after, limit))
+        names = ["Aceh", "Bali", "Banten"]
+        rows = [
+            {"provinsi": n, "cluster_id": 1} for n in names if not after or n > after
+        ]
+        return rows[:limit]
+
+    monkeypatch.setattr(database, "list_features", fake_list)
+    first = client.get("/db/provinces", params={"cluster_id": 1, "limit": 2}).json()
+    assert [r["provinsi"] for r in first["rows"]] == ["Aceh", "Bali"]
+    assert first["next_after"] == "Bali"
+    second = client.get(
+        "/db/provinces", params={"cluster_id": 1, "limit": 2, "after": "Bali"}
+    ).json()
+    assert [r["provinsi"] for r in second["rows"]] == ["Banten"]
+    assert second["next_after"] is None
+    assert calls[1] == (1, None, "Bali", 2)
+
+
+def test_db_endpoints_without_connection_string_return_503(monkeypatch):
+    from backend.app.main import database
+
+    monkeypatch.setattr(database, "dsn", "")
+    assert client.get("/db/clusters/aggregate").status_code == 503
+
+
+def test_db_feature_columns_and_province_filter_are_safe(monkeypatch):
+    import asyncio
+
+    from backend.app.database import Database
+
+    db = Database(dsn="postgresql://unused")
+    calls = []
+    found = []
+
+    async def fake_fetch(query_name, sql, *args):
+        calls.append((query_name, sql, args))
+        return [{"column_name": name} for name in found]
+
+    monkeypatch.setattr(db, "fetch", fake_fetch)
+    allowed = ["persen_sekolah_internet_sd", "rasio_siswa_guru_sd"]
+
+    async def scenario():
+        # Tabel belum ada: hasil kosong tidak di-cache
+        assert await db.feature_columns(allowed) == []
+        found.append("rasio_siswa_guru_sd")
+        assert await db.feature_columns(allowed) == ["rasio_siswa_guru_sd"]
+        found.clear()
+        assert await db.feature_columns(allowed) == ["rasio_siswa_guru_sd"]
+        await db.list_features(province="50%_x")
+
+    asyncio.run(scenario())
+    assert [c[0] for c in calls] == ["feature_columns"] * 2 + ["list_features"]
+    _, sql, args = calls[-1]
+    assert "ESCAPE" in sql
+    assert args[1] == "%50\\%\\_x%"
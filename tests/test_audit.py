@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.audit import AuditLog, encode_records, make_records
+
+
+def test_buffer_flushes_in_bulk_applies_backpressure_and_drains_on_stop():
+    written = []
+    release = None
+
+    async def slow_writer(batch):
+        await release.wait()
+        written.append(len(batch))
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        audit = AuditLog(
+            enabled=True,
+            capacity=4,
+            flush_rows=2,
+            flush_interval=60,
+            put_timeout=0.05,
+            writer=slow_writer,
+        )
+        audit.start()
+        assert await audit.record([("a",), ("b",)])
+        await asyncio.sleep(0.01)
+        # Batch pertama sedang ditulis (writer tertahan), buffer terisi lagi
+        assert await audit.record([("c",), ("d",), ("e",), ("f",)])
+        # Buffer penuh: menunggu lalu dibuang setelah put_timeout
+        assert not await audit.record([("g",)])
+        release.set()
+        await audit.stop()
+
+    asyncio.run(scenario())
+    assert written == [2, 4]
+
+
+def test_predictions_are_logged_and_flushed_on_shutdown(loaded_models, monkeypatch):
+    batches = []
+
+    async def writer(batch):
+        batches.append(encode_records(batch))
+
+    audit = AuditLog(enabled=True, flush_rows=1000, flush_interval=60, writer=writer)
+    monkeypatch.setattr(main, "audit_log", audit)
+    rows = loaded_models["data"].to_dict(orient="records")
+    with TestClient(main.app) as client:
+        single = client.post("/predict", json=rows[0]).json()
+        client.post("/predict/batch", json={"rows": rows[:5]})
+        # Route bulk juga tercatat (per chunk / tabel)
+        client.post(
+            "/predict/stream",
+            content=loaded_models["data"].head(3).to_csv(index=False),
+            headers={"Content-Type": "text/csv"},
+        )
+        client.post("/explain", json=rows[1])
+
+    records = [record for batch in batches for record in batch]
+    assert [r[1] for r in records] == (
+        ["predict"] + ["predict_batch"] * 5 + ["predict_stream"] * 3 + ["explain"]
+    )
+    first = records[0]
+    assert first[2] == single["model_version"]
+    assert first[3] == single["cluster_id"]
+    assert first[5] is not None and first[5] >= 0
+    assert json.loads(first[6]) == rows[0]
+
+
+def test_non_finite_rows_are_not_buffered(loaded_models):
+    bundle = main.model_store.current
+    matrix = (
+        loaded_models["data"][bundle.engine.feature_names].head(3).to_numpy(copy=True)
+    )
+    matrix[1, 0] = float("nan")
+
+    records = make_records("predict_batch", bundle, matrix, [0, 1, 2])
+    assert [r[3] for r in records] == [0, 2]
+    # Semua baris bisa di-encode sebagai JSON valid untuk JSONB
+    for record in encode_records(records):
+        assert "NaN" not in record[-1]
+
+
+def test_disabled_audit_does_not_build_records(loaded_models, monkeypatch):
+    from backend.app import audit
+
+    def fail(*args, **kwargs):
+        raise AssertionError("make_records dipanggil padahal audit mati")
+
+    monkeypatch.setattr(audit, "make_records", fail)
+    disabled = AuditLog(enabled=False)
+    monkeypatch.setattr(main, "audit_log", disabled)
+    bundle = main.model_store.current
+    matrix = loaded_models["data"][bundle.engine.feature_names].head(3).to_numpy()
+
+    assert not asyncio.run(disabled.record_scored("predict", bundle, matrix, [0, 1, 2]))
+    assert not disabled.record_scored_threadsafe("explain", bundle, matrix, [0, 1, 2])
+    rows = loaded_models["data"].to_dict(orient="records")
+    response = TestClient(main.app).post("/predict/batch", json={"rows": rows[:3]})
+    assert response.status_code == 200
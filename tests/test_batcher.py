@@ -0,0 +1,45 @@
+import asyncio
+
+import numpy as np
+
+from backend.app.batcher import MicroBatcher
+from backend.app.engine import build_engine
+from backend.app.main import FEATURE_COLUMNS
+
+
+class _Bundle:
+    def __init__(self, engine):
+        self.engine = engine
+
+
+class _CountingEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.calls = []
+
+    def assign(self, X):
+        self.calls.append(len(X))
+        return self.engine.assign(X)
+
+
+def test_concurrent_requests_share_one_engine_call(trained_models):
+    engine = build_engine(
+        trained_models["kmeans"], trained_models["scaler"], FEATURE_COLUMNS
+    )
+    counting = _CountingEngine(engine)
+    bundle = _Bundle(counting)
+    X = trained_models["data"].to_numpy()[:10]
+
+    async def scenario():
+        batcher = MicroBatcher(max_batch=64, window_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(bundle, row.tolist()) for row in X)
+            )
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(scenario())
+    assert counting.calls == [10]
+    np.testing.assert_array_equal([r[0] for r in results], engine.predict(X))
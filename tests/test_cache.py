@@ -0,0 +1,47 @@
+from backend.app.cache import PredictionCache
+
+
+def test_lru_eviction_and_quantization():
+    cache = PredictionCache(maxsize=2, quantum=1e-3)
+    a = cache.make_key("v1", [1.0, 2.0])
+    b = cache.make_key("v1", [3.0, 4.0])
+    c = cache.make_key("v1", [5.0, 6.0])
+
+    cache.put(a, 0)
+    cache.put(b, 1)
+    assert cache.get(a) == 0  # a jadi yang paling baru dipakai
+    cache.put(c, 2)  # b dibuang
+    assert cache.get(b) is None
+    assert cache.get(c) == 2
+
+    # Nilai dalam bucket kuantisasi yang sama memakai entry yang sama
+    assert cache.get(cache.make_key("v1", [1.0001, 2.0])) == 0
+
+
+def test_versions_coexist_and_unloaded_versions_are_evicted():
+    cache = PredictionCache(maxsize=8, quantum=1e-3)
+    active = cache.make_key("v1", [1.0, 2.0])
+    other = cache.make_key("v2", [1.0, 2.0])
+
+    # Traffic bergantian antar versi tetap hit (key sudah memuat versi)
+    cache.put(active, 0)
+    cache.put(other, 1)
+    for _ in range(3):
+        assert cache.get(active) == 0
+        assert cache.get(other) == 1
+
+    cache.retain({"v1", "v2"})
+    assert len(cache) == 2
+    # v2 dilepas dari registry: hanya entry v2 yang dibuang
+    cache.retain({"v1"})
+    assert cache.get(other) is None
+    assert cache.get(active) == 0
+    assert len(cache) == 1
+
+
+def test_large_feature_values_get_distinct_keys():
+    cache = PredictionCache()
+    # Di luar rentang int64 setelah dibagi quantum default 1e-6
+    keys = {cache.make_key("v1", [value, 1.0]) for value in (1e13, -5e13, 2e13)}
+    assert len(keys) == 3
+    assert cache.make_key("v1", [-0.0]) == cache.make_key("v1", [0.0])
@@ -0,0 +1,58 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from backend.app.drift import FeatureReference, FeatureStats
+from backend.app.main import app, drift_monitor, model_store
+
+client = TestClient(app)
+
+
+def test_streaming_stats_match_numpy_and_flag_shift(loaded_models):
+    bundle = model_store.current
+    X = loaded_models["data"][bundle.engine.feature_names].to_numpy()
+    stats = FeatureStats(FeatureReference.from_bundle(bundle), window=0)
+    for chunk in np.array_split(X, 7):
+        stats.update(chunk)
+    np.testing.assert_allclose(stats.mean, X.mean(axis=0))
+    np.testing.assert_allclose(stats.std, X.std(axis=0))
+    # Data training sendiri: tidak ada drift
+    assert stats.scores()["psi"].max() < 0.05
+
+    shifted = FeatureStats(FeatureReference.from_bundle(bundle))
+    shifted.update(X + 3 * X.std(axis=0))
+    scores = shifted.scores()
+    assert scores["psi"].min() > 1.0
+    np.testing.assert_allclose(scores["mean_shift"], 3.0, rtol=1e-6)
+
+
+def test_predict_traffic_exports_drift_gauges(loaded_models, monkeypatch):
+    monkeypatch.setattr(drift_monitor, "min_samples", 10)
+    monkeypatch.setattr(drift_monitor, "publish_interval", 0)
+    drift_monitor.clear()
+    try:
+        rows = loaded_models["data"].to_dict(orient="records")
+        assert client.post("/predict", json=rows[0]).status_code == 200
+        client.post("/predict/batch", json={"rows": rows})
+        # Live scoring WebSocket (sumber utama input dashboard) ikut dipantau
+        with client.websocket_connect("/ws/predict") as ws:
+            ws.send_json({"features": rows[1]})
+            assert "cluster_id" in ws.receive_json()
+        # Baris non-finite tidak boleh merusak statistik berjalan
+        names = model_store.current.engine.feature_names
+        bad = np.array([[rows[2][name] for name in names]], dtype=np.float64)
+        bad[0, 0] = np.nan
+        drift_monitor.observe(model_store.current, bad)
+
+        drift = client.get("/drift").json()
+        assert drift["model_version"] == model_store.current.version
+        assert drift["n_observations"] == len(rows) + 2
+        feature = model_store.current.engine.feature_names[0]
+        assert drift["features"][feature]["psi"] < 0.1
+        assert drift["features"][feature]["live_mean"] is not None
+        value = REGISTRY.get_sample_value(
+            "feature_drift_score", {"feature": feature, "method": "psi"}
+        )
+        assert value == drift["features"][feature]["psi"]
+    finally:
+        drift_monitor.clear()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from backend.app.engine import (
+    FusedKMeansEngine,
+    SklearnEngine,
+    build_engine,
+)
+from backend.app.main import FEATURE_COLUMNS
+
+
+def test_fused_engine_matches_sklearn_labels(trained_models):
+    kmeans, scaler = trained_models["kmeans"], trained_models["scaler"]
+    fused = build_engine(kmeans, scaler, FEATURE_COLUMNS, mode="fused")
+    reference = build_engine(kmeans, scaler, FEATURE_COLUMNS, mode="sklearn")
+    assert isinstance(fused, FusedKMeansEngine)
+    assert isinstance(reference, SklearnEngine)
+
+    rng = np.random.default_rng(0)
+    data = trained_models["data"].to_numpy()
+    random_rows = rng.uniform(data.min(), data.max(), size=(500, data.shape[1]))
+
+    # Titik tengah antar centroid (ruang data mentah) = kasus hampir seri
+    raw_centers = scaler.inverse_transform(kmeans.cluster_centers_)
+    midpoints = (raw_centers[:, None, :] + raw_centers[None, :, :]) / 2
+    midpoints = midpoints.reshape(-1, data.shape[1])
+
+    X = np.vstack([data, random_rows, midpoints])
+    np.testing.assert_array_equal(fused.predict(X), reference.predict(X))
+    assert fused.predict_one(X[0]) == reference.predict_one(X[0])
+
+    # Tanpa objek sklearn (artefak .npz): kasus seri diselesaikan dengan numpy
+    numpy_only = FusedKMeansEngine(
+        kmeans.cluster_centers_, scaler.mean_, scaler.scale_, fused.feature_names
+    )
+    np.testing.assert_array_equal(numpy_only.predict(X), reference.predict(X))
+
+
+def test_build_engine_rejects_unknown_mode(trained_models):
+    with pytest.raises(ValueError):
+        build_engine(
+            trained_models["kmeans"],
+            trained_models["scaler"],
+            FEATURE_COLUMNS,
+            mode="gpu",
+        )
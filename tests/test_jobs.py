@@ -0,0 +1,139 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app, job_manager
+
+
+@pytest.fixture
+def jobs_client(loaded_models, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_manager, "jobs_dir", str(tmp_path / "jobs"))
+    monkeypatch.setattr(job_manager, "max_workers", 2)
+    monkeypatch.setattr(job_manager, "chunk_rows", 16)
+    with TestClient(app) as client:
+        yield client
+
+
+def _wait(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError("job tidak selesai")
+
+
+def _csv(df):
+    data = df.copy()
+    data.insert(0, "id", [f"row-{i}" for i in range(len(data))])
+    return data.to_csv(index=False)
+
+
+def test_score_job_runs_in_chunks_and_caches_result(
+    jobs_client, loaded_models, monkeypatch
+):
+    audited = []
+
+    async def on_scored(endpoint, bundle, matrix, cluster_ids):
+        audited.append((endpoint, len(matrix), len(cluster_ids)))
+
+    monkeypatch.setattr(job_manager, "on_scored", on_scored)
+    df = loaded_models["data"]
+    body = _csv(df) + "1,2,3\n"
+    headers = {"Content-Type": "text/csv"}
+
+    submitted = jobs_client.post("/jobs", content=body, headers=headers)
+    assert submitted.status_code == 202
+    status = _wait(jobs_client, submitted.json()["job_id"])
+    assert status["status"] == "done"
+    assert status["progress"] == 1.0
+    assert (status["n_rows"], status["n_failed"]) == (len(df) + 1, 1)
+
+    result = jobs_client.get(status["result_url"])
+    rows = [json.loads(line) for line in result.text.splitlines()]
+    assert [r["index"] for r in rows] == list(range(len(df) + 1))
+    expected = loaded_models["kmeans"].predict(loaded_models["scaler"].transform(df))
+    np.testing.assert_array_equal([r["cluster_id"] for r in rows[:-1]], expected)
+    assert rows[0]["id"] == "row-0" and "error" in rows[-1]
+    # Tiap chunk yang selesai dicatat audit log (baris gagal tidak ikut)
+    assert {endpoint for endpoint, _, _ in audited} == {"job_score"}
+    assert sum(n for _, n, _ in audited) == len(df)
+
+    again = jobs_client.post("/jobs", content=body, headers=headers).json()
+    assert again["cached"] and again["job_id"] == status["job_id"]
+
+
+def test_stability_job_reports_bootstrap_agreement(jobs_client, loaded_models):
+    submitted = jobs_client.post(
+        "/jobs?kind=stability&n_bootstrap=8",
+        content=_csv(loaded_models["data"]),
+        headers={"Content-Type": "text/csv"},
+    )
+    status = _wait(jobs_client, submitted.json()["job_id"])
+    assert status["status"] == "done"
+    assert status["summary"]["n_bootstrap"] == 8
+
+    rows = [
+        json.loads(line)
+        for line in jobs_client.get(status["result_url"]).text.splitlines()
+    ]
+    stability = np.array([r["stability"] for r in rows])
+    assert ((stability >= 0) & (stability <= 1)).all()
+    # Data sintetis terpisah jelas -> hampir semua baris stabil
+    assert stability.mean() > 0.9
+
+
+def test_expired_job_results_are_removed(jobs_client, loaded_models, monkeypatch):
+    submitted = jobs_client.post(
+        "/jobs",
+        content=_csv(loaded_models["data"]),
+        headers={"Content-Type": "text/csv"},
+    )
+    job_id = submitted.json()["job_id"]
+    _wait(jobs_client, job_id)
+    assert jobs_client.get(f"/jobs/{job_id}/result").status_code == 200
+
+    monkeypatch.setattr(job_manager, "ttl", 0)
+    job_manager.expire()
+    assert jobs_client.get(f"/jobs/{job_id}").status_code == 404
+
+
+def test_job_state_is_shared_through_disk(jobs_client, loaded_models):
+    from backend.app.jobs import JobManager
+
+    submitted = jobs_client.post(
+        "/jobs",
+        content=_csv(loaded_models["data"]),
+        headers={"Content-Type": "text/csv"},
+    )
+    status = _wait(jobs_client, submitted.json()["job_id"])
+
+    # Worker uvicorn lain (instance JobManager terpisah, direktori sama)
+    other = JobManager(jobs_dir=job_manager.jobs_dir)
+    job = other.get(status["job_id"])
+    assert job["status"] == "done" and job["n_rows"] == status["n_rows"]
+    assert other._cached_job(job["cache_key"])["job_id"] == status["job_id"]
+    assert other.get("../etc") is None
+
+    # Job yang tidak pernah selesai (worker mati) dibersihkan janitor
+    orphan = "0" * 32
+    os.makedirs(os.path.join(other.jobs_dir, orphan))
+    with open(os.path.join(other.jobs_dir, orphan, "job.json"), "w") as f:
+        json.dump(
+            {
+                "job_id": orphan,
+                "status": "running",
+                "finished_at": None,
+                "created_at": 0,
+                "updated_at": 0,
+            },
+            f,
+        )
+    other.expire()
+    assert not os.path.exists(os.path.join(other.jobs_dir, orphan))
+    assert other.get(status["job_id"]) is not None
@@ -0,0 +1,99 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from backend.app.main import FEATURE_COLUMNS, app, model_registry
+from backend.app.model_registry import ModelRegistry, ShadowScorer
+from backend.app.model_store import ModelStore
+
+from .conftest import make_feature_frame, train_models, write_artifacts
+
+client = TestClient(app)
+
+
+def test_requests_are_routed_by_header_or_query(loaded_models, artifacts_dir):
+    candidate_dir = artifacts_dir / "versions" / "v2"
+    candidate_dir.mkdir(parents=True)
+    kmeans, scaler = train_models(make_feature_frame(seed=7), n_clusters=4)
+    write_artifacts(candidate_dir, kmeans, scaler)
+    model_registry.discover()
+    try:
+        candidate = model_registry.resolve("v2")
+        assert candidate.engine.n_clusters == 4
+        payload = loaded_models["data"].iloc[0].to_dict()
+
+        active = client.post("/predict", json=payload).json()
+        by_header = client.post(
+            "/predict", json=payload, headers={"X-Model-Version": "v2"}
+        ).json()
+        by_query = client.post("/predict?model_version=v2", json=payload).json()
+        assert by_header["model_version"] == candidate.version
+        assert by_query["model_version"] == candidate.version
+        assert active["model_version"] != candidate.version
+        assert len(by_header["distances"]) == 4
+
+        models = client.get("/models").json()
+        assert models["versions"]["v2"]["model_version"] == candidate.version
+        missing = client.post("/predict?model_version=v9", json=payload)
+        assert missing.status_code == 404
+    finally:
+        model_registry.clear()
+
+
+def test_discover_only_loads_allowed_versions(artifacts_dir, trained_models):
+    for name in ("v1", "v2", "v3"):
+        version_dir = artifacts_dir / "versions" / name
+        version_dir.mkdir(parents=True)
+        write_artifacts(version_dir, trained_models["kmeans"], trained_models["scaler"])
+    store = ModelStore(
+        FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir), publish_metrics=False
+    )
+    store.reload_if_changed(force=True)
+
+    registry = ModelRegistry(store, allowed=["v3", "v9"])
+    registry.discover()
+    assert registry.names == ["v3"]
+    assert registry.resolve("v1") is None
+
+    everything = ModelRegistry(store, allowed=[])
+    everything.discover()
+    assert everything.names == ["v1", "v2", "v3"]
+
+
+def test_shadow_scoring_exports_agreement(artifacts_dir, trained_models):
+    # Model kandidat identik, artefak berbeda (tanpa data berlabel) -> versi beda
+    candidate_dir = artifacts_dir / "versions" / "candidate"
+    candidate_dir.mkdir(parents=True)
+    write_artifacts(candidate_dir, trained_models["kmeans"], trained_models["scaler"])
+    store = ModelStore(
+        FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir), publish_metrics=False
+    )
+    store.reload_if_changed(force=True)
+    registry = ModelRegistry(store)
+    registry.discover()
+    active, shadow = store.current, registry.resolve("candidate")
+    assert active.version != shadow.version
+
+    X = trained_models["data"][active.engine.feature_names].to_numpy()
+    cluster_ids = active.engine.predict(X)
+
+    async def scenario():
+        scorer = ShadowScorer(registry, "candidate")
+        scorer.start()
+        scorer.submit(active, X[:30], cluster_ids[:30])
+        scorer.submit(active, X[30:], cluster_ids[30:])
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if scorer._queue.empty() and scorer._totals:
+                break
+        await scorer.stop()
+        return scorer
+
+    scorer = asyncio.run(scenario())
+    labels = {"active_version": active.version, "shadow_version": shadow.version}
+    assert scorer._totals[(active.version, shadow.version)] == (len(X), len(X))
+    assert REGISTRY.get_sample_value("shadow_agreement_ratio", labels) == 1.0
+    assert REGISTRY.get_sample_value(
+        "shadow_predictions_total", {**labels, "agree": "true"}
+    ) == len(X)
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+
+from backend.app.main import FEATURE_COLUMNS
+from backend.app.model_store import ModelStore, export_numpy_artifact, load_bundle
+
+from .conftest import make_feature_frame, train_models, write_artifacts
+
+
+def test_hot_reload_swaps_model_after_artifacts_settle(artifacts_dir):
+    store = ModelStore(FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir))
+    assert store.reload_if_changed(force=True)
+    old = store.current
+
+    kmeans, scaler = train_models(make_feature_frame(seed=7), n_clusters=4)
+    write_artifacts(artifacts_dir, kmeans, scaler)
+    model_path = artifacts_dir / "kmeans_model.pkl"
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    # Polling pertama hanya mencatat perubahan, polling kedua baru memuat
+    assert not store.reload_if_changed()
+    assert store.current is old
+    assert store.reload_if_changed()
+    assert store.current.version != old.version
+    assert store.current.engine.n_clusters == 4
+
+
+def test_invalid_artifacts_keep_previous_model(artifacts_dir):
+    store = ModelStore(FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir))
+    store.reload_if_changed(force=True)
+    old = store.current
+
+    (artifacts_dir / "kmeans_model.pkl").write_bytes(b"bukan pickle")
+    assert not store.reload_if_changed(force=True)
+    assert store.current is old
+
+
+def test_stale_metadata_falls_back_to_default_labels(artifacts_dir):
+    kmeans, scaler = train_models(make_feature_frame(seed=3))
+    old_metadata = (artifacts_dir / "cluster_metadata.json").read_text()
+    write_artifacts(artifacts_dir, kmeans, scaler, with_metadata=False)
+    (artifacts_dir / "cluster_metadata.json").write_text(old_metadata)
+
+    store = ModelStore(FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir))
+    store.reload_if_changed(force=True)
+    assert store.current.label(0) == "Rendah (Low Readiness)"
+
+
+def test_numpy_artifact_matches_pickle_without_sklearn_objects(artifacts_dir):
+    pickle_bundle = load_bundle(str(artifacts_dir), FEATURE_COLUMNS)
+    export_numpy_artifact(str(artifacts_dir), FEATURE_COLUMNS)
+
+    store = ModelStore(FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir))
+    assert store.reload_if_changed(force=True)
+    bundle = store.current
+    assert bundle.model_format == "npz"
+    assert bundle.kmeans is None and bundle.scaler is None
+    assert bundle.labels == pickle_bundle.labels
+
+    X = make_feature_frame(n_rows=200, seed=11)[FEATURE_COLUMNS].to_numpy()
+    np.testing.assert_array_equal(
+        bundle.engine.predict(X), pickle_bundle.engine.predict(X)
+    )
+    np.testing.assert_array_equal(
+        bundle.peers.cluster_ids, pickle_bundle.peers.cluster_ids
+    )
+
+
+def test_shared_arrays_are_published_once_and_memory_mapped(artifacts_dir):
+    private = load_bundle(str(artifacts_dir), FEATURE_COLUMNS)
+    workers = [
+        ModelStore(FEATURE_COLUMNS, artifacts_dir=str(artifacts_dir), shared=True)
+        for _ in range(2)
+    ]
+    for store in workers:
+        assert store.reload_if_changed(force=True)
+    first, second = (store.current for store in workers)
+
+    assert first.shared_path == second.shared_path
+    assert first.shared_path.endswith(first.version)
+    for bundle in (first, second):
+        assert isinstance(bundle.engine.weights, np.memmap)
+        assert not bundle.engine.weights.flags.writeable
+        assert bundle.peers.matrix.base is not None
+    assert first.engine.weights.filename == second.engine.weights.filename
+
+    X = make_feature_frame(n_rows=100, seed=5)[FEATURE_COLUMNS].to_numpy()
+    np.testing.assert_array_equal(first.engine.predict(X), private.engine.predict(X))
+    assert first.peers.query(first.peers.matrix[0], k=2, exclude=0)
+
+    # Artefak baru -> versi baru dipetakan ulang dari direktori lain
+    kmeans, scaler = train_models(make_feature_frame(seed=7), n_clusters=4)
+    write_artifacts(artifacts_dir, kmeans, scaler)
+    assert workers[0].reload_if_changed(force=True)
+    assert workers[0].current.shared_path != first.shared_path
+    assert workers[0].current.engine.n_clusters == 4
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+
+from backend.app import tracing  # noqa: E402
+from backend.app.main import app  # noqa: E402
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    tracing.configure(exporter=exporter, service_name="test", batch=False)
+    yield exporter
+    tracing.shutdown()
+
+
+def test_predict_continues_traceparent_with_stage_spans(loaded_models, exporter):
+    from backend.app import main
+
+    # Tahap inference hanya ada jika bukan cache hit dari test lain
+    main.prediction_cache.clear()
+    row = loaded_models["data"].iloc[0].to_dict()
+    response = TestClient(app).post(
+        "/predict",
+        json=row,
+        headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"},
+    )
+    assert response.status_code == 200
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    server = spans["POST /predict"]
+    assert format(server.context.trace_id, "032x") == TRACE_ID
+    assert format(server.parent.span_id, "016x") == PARENT_ID
+    assert server.attributes["http.response.status_code"] == 200
+
+    # Tahap inference (termasuk yang jalan di threadpool) anak dari span server
+    for stage in ("request_parse", "feature_extraction", "inference", "postprocess"):
+        child = spans[f"predict.{stage}"]
+        assert child.parent.span_id == server.context.span_id
+        assert child.attributes["inference.stage"] == stage
+
+
+def test_ws_message_traceparent_parents_inference_span(loaded_models, exporter):
+    row = loaded_models["data"].iloc[0].to_dict()
+    with TestClient(app).websocket_connect("/ws/predict") as websocket:
+        websocket.send_text(
+            json.dumps(
+                {"features": row, "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+            )
+        )
+        assert "cluster_id" in websocket.receive_json()
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    server = spans["WS /ws/predict"]
+    assert format(server.context.trace_id, "032x") == TRACE_ID
+    assert format(server.parent.span_id, "016x") == PARENT_ID
+    assert spans["predict_ws.inference"].parent.span_id == server.context.span_id
+
+
+def test_file_exporter_writes_otlp_json_lines(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(
+        exporter=tracing.FileSpanExporter(str(path)), service_name="test", batch=False
+    )
+    try:
+        with tracing.span("outer"):
+            tracing.record_span("inner", 0.01)
+    finally:
+        tracing.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    names = [
+        span["name"]
+        for line in lines
+        for resource in line["resourceSpans"]
+        for scope in resource["scopeSpans"]
+        for span in scope["spans"]
+    ]
+    assert names == ["inner", "outer"]
+    assert not tracing.enabled()